@@ -0,0 +1,24 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+#
+# Copyright 2016-2022 European Commission (JRC);
+# Licensed under the EUPL (the 'Licence');
+# You may not use this work except in compliance with the Licence.
+# You may obtain a copy of the Licence at: http://ec.europa.eu/idabc/eupl
+
+"""
+Performance benchmarks of formulas.
+
+The suite follows the `asv <https://asv.readthedocs.io>`_ conventions (i.e.,
+`Time*` classes with `params`, `setup`, and `time_*` methods), hence it can be
+run and compared between commits with::
+
+    $ asv run
+    $ asv compare <commit-1> <commit-2>
+
+Without asv, it can be run with the minimal runner of this package, which
+stores the results in `benchmarks/results/<commit>.json`::
+
+    $ python -m benchmarks -b excel
+    $ python -m benchmarks --compare <commit>
+"""
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+#
+# Copyright 2016-2022 European Commission (JRC);
+# Licensed under the EUPL (the 'Licence');
+# You may not use this work except in compliance with the Licence.
+# You may obtain a copy of the Licence at: http://ec.europa.eu/idabc/eupl
+
+"""
+Minimal runner of the asv benchmarks.
+
+Each benchmark is timed as the minimum of `repeat` samples, `setup` is called
+before each sample. A sample is the mean of `number` calls, if not defined
+the calls are repeated for at least `min_time` seconds. The results are stored
+in `benchmarks/results/<commit>.json`.
+"""
+import os
+import re
+import sys
+import json
+import time
+import inspect
+import argparse
+import itertools
+import importlib
+import subprocess
+import os.path as osp
+
+RESULTS = osp.join(osp.dirname(__file__), 'results')
+MODULES = 'bench_excel', 'bench_parser'
+
+
+def _commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], text=True,
+            cwd=osp.dirname(__file__), stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def benchmarks(pattern=None):
+    """
+    Yields the benchmarks as `(name, class, method, params)`.
+    """
+    for name in MODULES:
+        mdl = importlib.import_module('.%s' % name, __package__)
+        for cls_name, cls in inspect.getmembers(mdl, inspect.isclass):
+            if not cls_name.startswith('Time') or cls.__module__ != \
+                    mdl.__name__:
+                continue
+            params = getattr(cls, 'params', [])
+            params = list(itertools.product(*params)) if params else [()]
+            for meth in sorted(dir(cls)):
+                if not meth.startswith('time_'):
+                    continue
+                for p in params:
+                    key = '%s.%s.%s(%s)' % (
+                        name, cls_name, meth, ', '.join(map(repr, p))
+                    )
+                    if pattern is None or re.search(pattern, key):
+                        yield key, cls, meth, p
+
+
+def run(cls, meth, params, min_time=.1):
+    times = []
+    for _ in range(getattr(cls, 'repeat', 3)):
+        bench = cls()
+        getattr(bench, 'setup', lambda *a: None)(*params)
+        try:
+            func, number, n = getattr(bench, meth), getattr(
+                cls, 'number', 0
+            ), 0
+            start = time.perf_counter()
+            while True:
+                func(*params)
+                n += 1
+                elapsed = time.perf_counter() - start
+                if n == number or not number and elapsed >= min_time:
+                    break
+            times.append(elapsed / n)
+        finally:
+            getattr(bench, 'teardown', lambda *a: None)(*params)
+    return min(times)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks')
+    parser.add_argument('-b', '--bench', help='Regex of benchmark names.')
+    parser.add_argument('--compare', help='Commit of the reference results.')
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args(argv)
+
+    reference = {}
+    if args.compare:
+        with open(osp.join(RESULTS, '%s.json' % args.compare)) as f:
+            reference = json.load(f)['results']
+    results = {}
+    for key, cls, meth, params in benchmarks(args.bench):
+        results[key] = t = run(cls, meth, params)
+        msg = '%-70s %10.4fs' % (key, t)
+        if key in reference:
+            msg += ' %6.2fx' % (t / reference[key])
+        print(msg, flush=True)
+
+    if not args.no_save:
+        os.makedirs(RESULTS, exist_ok=True)
+        commit = _commit()
+        with open(osp.join(RESULTS, '%s.json' % commit), 'w') as f:
+            json.dump({
+                'commit': commit, 'python': sys.version.split()[0],
+                'results': results
+            }, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
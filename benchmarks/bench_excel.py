@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+#
+# Copyright 2016-2022 European Commission (JRC);
+# Licensed under the EUPL (the 'Licence');
+# You may not use this work except in compliance with the Licence.
+# You may obtain a copy of the Licence at: http://ec.europa.eu/idabc/eupl
+
+"""
+Benchmarks of the excel model life cycle.
+"""
+import tempfile
+from .common import Workbook, synthetic_workbook
+
+#: Row counts of the synthetic workbooks.
+ROWS = [500, 2000]
+
+#: Row counts of the scaling curves (about 1k to 1M cells).
+SCALING_ROWS = [100, 1000, 10000, 100000]
+
+
+class TimeLoads(Workbook):
+    def time_loads(self, workbook):
+        self.model(finish=False)
+
+
+class TimeParallelLoads(Workbook):
+    """
+    Loads of the synthetic workbooks with the cells compiled by the main
+    process (0) or by a pool of processes.
+    """
+    params = [ROWS, [0, 2, 4]]
+    param_names = ['rows', 'processes']
+
+    def setup(self, rows, processes):
+        super(TimeParallelLoads, self).setup(rows)
+
+    def teardown(self, rows, processes):
+        super(TimeParallelLoads, self).teardown(rows)
+
+    def time_loads(self, rows, processes):
+        from formulas import ExcelModel
+        ExcelModel().loads(self.fpath, processes=processes or None)
+
+
+class TimeFinish(Workbook):
+    def setup(self, workbook):
+        super(TimeFinish, self).setup(workbook)
+        self.xl_model = self.model(finish=False)
+
+    def time_finish(self, workbook):
+        self.xl_model.finish(**self.options)
+
+
+class TimeCalculate(Workbook):
+    def setup(self, workbook):
+        super(TimeCalculate, self).setup(workbook)
+        self.xl_model = self.model()
+
+    def time_calculate(self, workbook):
+        self.xl_model.calculate()
+
+
+class TimeWrite(Workbook):
+    def setup(self, workbook):
+        super(TimeWrite, self).setup(workbook)
+        self.xl_model = self.model(calculate=True)
+
+    def time_write(self, workbook):
+        self.xl_model.write(dirpath=tempfile.mkdtemp(dir=self.tmpdir))
+
+
+class TimeCompile(Workbook):
+    params = [ROWS]
+    param_names = ['rows']
+
+    def setup(self, rows):
+        super(TimeCompile, self).setup(rows)
+        self.xl_model = self.model()
+        self.inputs = ["'[synthetic-%d.xlsx]DATA1'!A1" % rows]
+        self.outputs = ["'[synthetic-%d.xlsx]SUMMARY'!B1" % rows]
+        self.func = self.xl_model.compile(self.inputs, self.outputs)
+
+    def time_compile(self, rows):
+        self.xl_model.compile(self.inputs, self.outputs)
+
+    def time_compiled_call(self, rows):
+        self.func(50)
+
+
+class TimeSyntheticLoads(TimeLoads):
+    params = [ROWS]
+    param_names = ['rows']
+
+
+class TimeSyntheticFinish(TimeFinish):
+    params = [ROWS]
+    param_names = ['rows']
+
+
+class TimeSyntheticCalculate(TimeCalculate):
+    params = [ROWS]
+    param_names = ['rows']
+
+
+class TimeSyntheticWrite(TimeWrite):
+    params = [ROWS]
+    param_names = ['rows']
+
+
+class TimeScaling:
+    """
+    Scaling curves of the model built from a synthetic dictionary (i.e.,
+    without the xlsx parsing) with two data sheets and external links.
+    """
+    params = [SCALING_ROWS]
+    param_names = ['rows']
+    number, repeat, warmup_time, timeout = 1, 1, 0, 3600
+
+    def setup(self, rows):
+        self.data = synthetic_workbook(
+            rows, sheets=2, circular=10, external_rows=100
+        ).to_dict()
+        self.xl_model = self.model()
+
+    def model(self):
+        from formulas import ExcelModel
+        return ExcelModel().from_dict(self.data).finish(
+            complete=False, iterative=True
+        )
+
+    def time_build(self, rows):
+        self.model()
+
+    def time_calculate(self, rows):
+        self.xl_model.calculate()
+
+    def time_calculate_threads(self, rows):
+        self.xl_model.calculate(threads=4)
+
+    def peakmem_calculate(self, rows):
+        self.xl_model.calculate()
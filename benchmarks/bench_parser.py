@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+#
+# Copyright 2016-2022 European Commission (JRC);
+# Licensed under the EUPL (the 'Licence');
+# You may not use this work except in compliance with the Licence.
+# You may obtain a copy of the Licence at: http://ec.europa.eu/idabc/eupl
+
+"""
+Benchmarks of the formula parser and of the Excel functions.
+"""
+import numpy as np
+from formulas import Parser, Ranges
+
+#: Formulas to be parsed.
+FORMULAS = {
+    'arithmetic': '=(A1 + B1) * 2 - C1 / 4 ^ 2',
+    'nested': '=IF(AND(A1>0,B1<>""),ROUND(SUM(A1:A10)/COUNT(A1:A10),2),'
+              'IFERROR(VLOOKUP(B1,Sheet2!A:B,2,FALSE),"n/a"))',
+    'references': "='[book.xlsx]Sheet 1'!A1:B10 + Sheet2!$C$3 + _NAME",
+}
+
+
+class TimeParser:
+    params = [list(FORMULAS)]
+    param_names = ['formula']
+
+    def setup(self, formula):
+        self.formula = FORMULAS[formula]
+        Parser().ast(self.formula)[1].compile()  # Load the functions.
+
+    def time_ast(self, formula):
+        Parser().ast(self.formula)
+
+    def time_ast_compile(self, formula):
+        Parser().ast(self.formula)[1].compile()
+
+
+#: Formulas of the function benchmarks (`n` is the size of the inputs).
+FUNCTIONS = {
+    'SUM': '=SUM(A1:A{n})',
+    'SUMIF': '=SUMIF(A1:A{n},">50",B1:B{n})',
+    'VLOOKUP': '=VLOOKUP(C1:C100,A1:B{n},2,FALSE)',
+    'operators': '=(A1:A{n} + B1:B{n}) * 2 - A1:A{n} / 4'
+}
+
+
+class TimeFunctions:
+    params = [list(FUNCTIONS), [100, 10000]]
+    param_names = ['function', 'n']
+
+    def setup(self, function, n):
+        func = Parser().ast(FUNCTIONS[function].format(n=n))[1].compile()
+        rnd = np.random.RandomState(0)
+        self.args = []
+        for ref in func.inputs:
+            r = Ranges().push(ref).ranges[0]
+            shape = r.r2 - r.r1 + 1, r.n2 - r.n1 + 1
+            value = rnd.randint(0, 100, shape).astype(object)
+            if shape[1] == 2:  # Lookup table with sorted unique keys.
+                value[:, 0] = np.arange(shape[0])
+            self.args.append(Ranges().push(ref, value))
+        self.func = func
+
+    def time_function(self, function, n):
+        self.func(*self.args)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+#
+# Copyright 2016-2022 European Commission (JRC);
+# Licensed under the EUPL (the 'Licence');
+# You may not use this work except in compliance with the Licence.
+# You may obtain a copy of the Licence at: http://ec.europa.eu/idabc/eupl
+
+"""
+It provides the workbooks of the benchmarks.
+"""
+import shutil
+import tempfile
+import os.path as osp
+
+#: Directory of the test workbooks.
+TEST_FILES = osp.join(osp.dirname(osp.dirname(__file__)), 'test', 'test_files')
+
+#: Test workbooks and their finish options.
+WORKBOOKS = {
+    'test.xlsx': {},
+    'excel.xlsx': {},
+    'circular.xlsx': {'circular': True}
+}
+
+
+def workbook_path(fname):
+    return osp.join(TEST_FILES, fname)
+
+
+def synthetic_workbook(rows, **kwargs):
+    """
+    Returns a synthetic workbook (see
+    :class:`~formulas.excel.synthetic.SyntheticWorkbook`).
+
+    :param rows:
+        Number of rows of each data sheet.
+    :type rows: int
+
+    :return:
+        Synthetic workbook.
+    :rtype: formulas.excel.synthetic.SyntheticWorkbook
+    """
+    from formulas.excel.synthetic import SyntheticWorkbook
+    kwargs.setdefault('name', 'synthetic-%d' % rows)
+    return SyntheticWorkbook(rows=rows, **kwargs)
+
+
+class Workbook:
+    """
+    Base benchmark with a workbook (`params` are file names or row counts).
+    """
+    params = [list(WORKBOOKS)]
+    param_names = ['workbook']
+    number, repeat, warmup_time, timeout = 1, 3, 0, 600
+
+    def setup(self, workbook):
+        self.tmpdir = tempfile.mkdtemp()
+        if isinstance(workbook, int):
+            self.fpath = synthetic_workbook(workbook).write(self.tmpdir)
+            self.options = {}
+        else:
+            self.fpath = workbook_path(workbook)
+            self.options = WORKBOOKS[workbook]
+
+    def teardown(self, workbook):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def model(self, finish=True, calculate=False):
+        from formulas import ExcelModel
+        xl_model = ExcelModel().loads(self.fpath)
+        if finish:
+            xl_model.finish(**self.options)
+        if calculate:
+            xl_model.calculate()
+        return xl_model
+
@@ -102,6 +102,33 @@ class AstBuilder:
         for token in list(self.missing_operands):
             self.get_node_id(token)
 
+    def prune(self, solution):
+        """
+        Removes the branches that are not selected by compile-time constants
+        (e.g., `IF(TRUE, x, y)` -> `IF(TRUE, x, x)`).
+
+        :return:
+            If some branches have been removed.
+        :rtype: bool
+        """
+        dsp, pruned = self.dsp, False
+        for k, node in list(dsp.function_nodes.items()):
+            prune, out = node.get('prune'), node['outputs'][0]
+            if prune is None or out in solution:
+                continue
+            res = prune(node['function'], *(
+                solution.get(i, sh.NONE) for i in node['inputs']
+            ))
+            if res is not None:
+                func, inputs = res
+                dsp.dmap.remove_node(k)
+                dsp.add_function(
+                    k, func, [node['inputs'][i] for i in inputs] or None,
+                    node['outputs']
+                )
+                pruned = True
+        return pruned
+
     def compile(self, references=None, context=None, **inputs):
         dsp, inp = self.dsp, inputs.copy()
         for k, ref in (references or {}).items():
@@ -112,6 +139,8 @@ class AstBuilder:
                     inp[k] = Ranges().push(ref)
         inp[COMPILING] = True
         res, o = dsp(inp), self.get_node_id(self[-1])
+        while self.prune(res):
+            res = dsp(inp)
         dsp = dsp.get_sub_dsp_from_workflow(
             [o], graph=dsp.dmap, reverse=True, blockers=res,
             wildcard=False
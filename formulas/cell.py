@@ -10,15 +10,106 @@
 It provides Cell class.
 """
 import copy
+import regex
+import bisect
 import collections
 import functools
 import numpy as np
 import schedula as sh
 from .parser import Parser
-from .ranges import Ranges, _assemble_values, _shape, _get_indices_intersection
-from .tokens.operand import Error, XlError, range2parts, _re_ref, _index2col
+from .ranges import (
+    Ranges, RangeRecord, _assemble_values, _shape, _get_indices_intersection,
+    _bound_range, _split
+)
+from .functions import Array, pad_empty
+from .errors import InvalidRangeName
+from .tokens.operand import (
+    Error, XlError, range2parts, _re_ref, _index2col, _col2index, maxrow, maxcol
+)
 
 CELL = sh.Token('Cell')
+_re_template = regex.compile(r'''
+    (?P<string>"(?>""|[^"])*")
+    |
+    (?P<sheet>'(?>''|[^'])*')
+    |
+    (?<![\w\.\$])
+    (?>
+        (?P<c1>\$?[A-Z]{1,3})(?P<r1>\$?[1-9]\d*)
+    |
+        (?P<c2>\$?[A-Z]{1,3}):(?P<c3>\$?[A-Z]{1,3})
+    |
+        (?P<r2>\$?[1-9]\d*):(?P<r3>\$?[1-9]\d*)
+    )(?![\w\.\(!\[])
+''', regex.IGNORECASE | regex.X)
+_re_no_template = regex.compile(
+    r'INDIRECT|(?<![\w\$])(?>[RC]\[|R[1-9]\d*C[1-9])', regex.IGNORECASE
+)
+
+
+def _template_key(formula, row, col):
+    if _re_no_template.search(formula):
+        return None, None
+    base = {'r': int(row), 'c': col}
+    coords = {'r': (set(), set()), 'c': (set(), set())}
+
+    def _encode(axis, v):
+        is_abs, v = v.startswith('$'), v.strip('$')
+        n = int(v) if axis == 'r' else _col2index(v)
+        coords[axis][is_abs].add(n)
+        if is_abs:
+            return '$%s%d' % (axis, n)
+        return '%s[%d]' % (axis, n - base[axis])
+
+    def _sub(match):
+        d = match.groupdict()
+        if d['c1']:
+            return _encode('c', d['c1']) + _encode('r', d['r1'])
+        elif d['c2']:
+            return '%s:%s' % (_encode('c', d['c2']), _encode('c', d['c3']))
+        elif d['r2']:
+            return '%s:%s' % (_encode('r', d['r2']), _encode('r', d['r3']))
+        return match.group()
+
+    return _re_template.sub(_sub, formula), coords
+
+
+def _shift_coord(coords, delta, axis, value):
+    if delta:
+        rel, absolute = coords[axis]
+        if value in rel and value not in absolute:
+            return value + delta
+        elif value not in absolute or value in rel:
+            raise ValueError  # Ambiguous or derived coordinate.
+    return value
+
+
+def _shift_range(rng, coords, dr, dc):
+    r, c = _shape(rng)
+    dr, dc = 0 if r == maxrow else dr, 0 if c == maxcol else dc
+    if not (dr or dc):
+        return rng
+    shift = functools.partial(_shift_coord, coords)
+    return RangeRecord(
+        rng.sheet_id, shift(dc, 'c', rng.n1), shift(dr, 'r', rng.r1),
+        shift(dc, 'c', rng.n2), shift(dr, 'r', rng.r2)
+    )
+
+
+def _template_names(inputs, references):
+    names = []
+    for k, rng in inputs.items():
+        if not (k in references or rng is None):
+            if len(rng.ranges) != 1 or rng.ranges[0].name != k:
+                raise ValueError  # Derived range.
+            names.append(k)
+    pattern = '|'.join(
+        map(regex.escape, sorted(names, key=len, reverse=True))
+    ) or '(?!)'
+    return names, regex.compile(
+        r'"(?>""|[^"])*"|(?<![\w\.\$!\'\]])(?P<name>%s)(?![\w\.\(!\[])'
+        % pattern
+    )
 
 
 class CellWrapper(sh.add_args):
@@ -60,6 +151,19 @@ def wrap_cell_func(func, parse_args=lambda *a: a, parse_kwargs=lambda **kw: kw):
     return functools.update_wrapper(wrapper, func)
 
 
+def parse_cell_args(inputs, links, args):
+    inputs = inputs.copy()  # Shallow, the bound ranges are copied on write.
+    for keys, v in zip(links, args):
+        for k in keys:
+            try:
+                values = v.values
+                rng = inputs[k] = copy.copy(inputs[k])
+                rng.values.update(values)
+            except AttributeError:  # Reference.
+                inputs[k] = v
+    return inputs.values()
+
+
 def format_output(rng, value):
     return Ranges().set_value(rng, value)
 
@@ -68,20 +172,22 @@ class Cell:
     parser = Parser()
 
     def __init__(self, reference, value, context=None, check_formula=True,
-                 replace_missing_ref=True):
+                 replace_missing_ref=True, templates=None):
         self.func = self.range = self.inputs = self.output = None
+        self.template = None
         self.replace_missing_ref = replace_missing_ref
         if reference is not None:
             self.range = Ranges().push(reference, context=context)
             r = self.range.ranges[0]
             context = sh.combine_dicts(context or {}, base={
-                'cr': r['r1'], 'cc': r['n1']
+                'cr': str(r.r1), 'cc': r.n1
             })
-            self.output = r['name']
+            self.output = r.name
         self.builder, self.value = None, sh.EMPTY
         prs = self.parser
         if check_formula and isinstance(value, str) and prs.is_formula(value):
-            self.builder = prs.ast(value, context=context)[1]
+            if templates is None or not self._bind(value, context, templates):
+                self.builder = prs.ast(value, context=context)[1]
         elif value is not None:
             self.value = value
 
@@ -91,14 +197,60 @@ class Cell:
             return self.func.__name__
         return self.output
 
+    def _bind(self, formula, context, templates):
+        r = self.range.ranges[0]
+        key, coords = _template_key(formula, r.r1, r.n1)
+        if key is None:
+            return False
+        key = key, _shape(r), tuple(sorted(
+            (k, v) for k, v in context.items()
+            if k not in ('cr', 'cc') and isinstance(v, str)
+        ))
+        if key not in templates:
+            self.template = templates, key, coords
+            return False
+        cell, coords, references, names, pattern = templates[key]
+        base = cell.range.ranges[0]
+        dr, dc = r.r1 - base.r1, r.n1 - base.n1
+        inputs, func = collections.OrderedDict(), cell.func
+        try:
+            for k, rng in func.inputs.items():
+                if k in names:
+                    rng = Ranges((_shift_range(
+                        rng.ranges[0], coords, dr, dc
+                    ),))
+                inputs[k] = rng
+        except ValueError:  # Not a shiftable template.
+            return False
+        new = {k: inputs[k].ranges[0].name for k in names}
+        if len(set(new.values())) != len(names):
+            return False
+        self.func = wrap_cell_func(func.__wrapped__, self._args)
+        self.func.inputs = inputs
+        self.func.__name__ = pattern.sub(
+            lambda m: new.get(m.group('name'), m.group()), func.__name__
+        )
+        self.update_inputs(references=references)
+        return True
+
     def compile(self, references=None, context=None):
         if not self.func and self.builder:
+            shareable = CELL not in self.builder.dsp.nodes
             func = self.builder.compile(
                 references=references, context=context, **{CELL: self.range}
             )
             self.func = wrap_cell_func(func, self._args)
             self.update_inputs(references=references)
             self.builder = None
+            if self.template and shareable:
+                templates, key, coords = self.template
+                references = references or {}
+                try:
+                    templates[key] = (self, coords, references) + \
+                                     _template_names(func.inputs, references)
+                except ValueError:
+                    pass
+        self.template = None
         return self
 
     def _missing_ref(self, inp, k):
@@ -118,20 +270,13 @@ class Cell:
             else:
                 try:
                     for r in rng.ranges:
-                        get(inp, r['name'], default=list).append(k)
+                        get(inp, r.name, default=list).append(k)
                 except AttributeError:
                     self._missing_ref(inp, k)
 
     def _args(self, *args):
         assert len(args) == len(self.inputs)
-        inputs = copy.deepcopy(self.func.inputs)
-        for links, v in zip(self.inputs.values(), args):
-            for k in links:
-                try:
-                    inputs[k].values.update(v.values)
-                except AttributeError:  # Reference.
-                    inputs[k] = v
-        return inputs.values()
+        return parse_cell_args(self.func.inputs, self.inputs.values(), args)
 
     def _output_filters(self):
         return functools.partial(format_output, self.range.ranges[0]),
@@ -191,55 +336,235 @@ class Ref(Cell):
         return self
 
 
+@functools.lru_cache(4096)
+def _cell_index(name):
+    try:
+        rng = Ranges().push(name).ranges[0]
+    except (AttributeError, InvalidRangeName):
+        return None
+    if rng.n1 == rng.n2 and rng.r1 == rng.r2:
+        return rng.sheet_id, rng.n1, rng.r1
+
+
+def _cells_count(ranges):
+    return sum((r.n2 - r.n1 + 1) * (r.r2 - r.r1 + 1) for r in ranges)
+
+
+def _merge_runs(sheet_id, runs):
+    # Runs are `(r1, r2, n1, n2)`, equal row spans of adjacent columns merge.
+    blocks = []
+    for r1, r2, n1, n2 in sorted(runs):
+        b = blocks and blocks[-1]
+        if b and b[0] == r1 and b[1] == r2 and b[3] + 1 == n1:
+            b[3] = n2
+        else:
+            blocks.append([r1, r2, n1, n2])
+    return [RangeRecord(sheet_id, n1, r1, n2, r2) for r1, r2, n1, n2 in blocks]
+
+
+def _uncovered(rng, covered):
+    # Rectangles of `rng` not covered by the sorted `{column: rows}`.
+    runs, n0 = [], rng.n1
+    for n in sorted(covered):
+        if n > n0:
+            runs.append((rng.r1, rng.r2, n0, n - 1))
+        r = rng.r1
+        for i in covered[n]:
+            if i > r:
+                runs.append((r, i - 1, n, n))
+            r = i + 1
+        if r <= rng.r2:
+            runs.append((r, rng.r2, n, n))
+        n0 = n + 1
+    if n0 <= rng.n2:
+        runs.append((rng.r1, rng.r2, n0, rng.n2))
+    return _merge_runs(rng.sheet_id, runs)
+
+
+_re_cell = regex.compile(r'^([A-Z]+)([1-9][0-9]*)$')
+
+
+class _MissingCells:
+    """
+    Cells of a :class:`RangesAssembler` that are read from the solution.
+
+    They are kept as rectangles, the names are parsed only when looked up.
+    """
+
+    def __init__(self, base, ranges):
+        self.base, self.ranges = base, ranges
+        sheet_id = base.sheet_id
+        self.prefix = f'{sheet_id}!' if sheet_id else ''
+
+    def __len__(self):
+        return _cells_count(self.ranges)
+
+    def coordinates(self, name):
+        if isinstance(name, str) and name.startswith(self.prefix):
+            match = _re_cell.match(name[len(self.prefix):])
+            if match:
+                n, r = _col2index(match.group(1)), int(match.group(2))
+                for rng in self.ranges:
+                    if rng.n1 <= n <= rng.n2 and rng.r1 <= r <= rng.r2:
+                        return n, r
+
+    def get(self, name, default=None):
+        i = self.coordinates(name)
+        if i is None:
+            return default
+        n, r = i
+        r0, c0 = self.base.r1 or 1, self.base.n1 or 1
+        return slice(r - r0, r - r0 + 1), slice(n - c0, n - c0 + 1)
+
+    def __contains__(self, name):
+        return self.coordinates(name) is not None
+
+    def items(self):
+        for rng in self.ranges:
+            for r in range(rng.r1, rng.r2 + 1):
+                for n in range(rng.n1, rng.n2 + 1):
+                    ist = RangeRecord(self.base.sheet_id, n, r, n, r)
+                    yield ist.name, ist
+
+    def found(self, sol):
+        # Missing cells are not dispatcher nodes, they can be just inputs.
+        for k in getattr(sol, 'inputs', sol):
+            v = self.get(k)
+            if v is not None:
+                yield k, v
+
+
 class RangesAssembler:
+    #: Above this number of missing cells, they are not enumerated.
+    max_enumerated = 65536
+
     @staticmethod
-    def _range_indices(rng):
-        return {
-            (j, i)
-            for r in rng.ranges
-            for i in range(int(r['r1']), int(r['r2']) + 1)
-            for j in range(r['n1'], r['n2'] + 1)
-        }
-
-    def __init__(self, ref, context=None, compact=1):
+    def index_cells(cells):
+        """
+        Indexes the single cells of a sheet by column.
+
+        :param cells:
+            Cell outputs by `(column, row)`.
+        :type cells: dict
+
+        :return:
+            Sorted rows and outputs by column.
+        :rtype: dict
+        """
+        index = {}
+        for (n, r), out in sorted(cells.items()):
+            rows, outs = index.setdefault(n, ([], []))
+            rows.append(r)
+            outs.append(out)
+        return index
+
+    def __init__(self, ref, context=None, compact=1, limits=None):
         self.range = Ranges().push(ref, context=context)
-        self.missing = self._range_indices(self.range)
+        self.base = rng = self.range.ranges[0]
+        if limits is not None:  # Bound full-column and full-row ranges.
+            self.base = _bound_range(rng, *limits.get(rng.sheet_id, (1, 1)))
+        self.missing = [self.base]  # Disjoint rectangles.
         self.inputs = collections.OrderedDict()
         self.compact = compact or 1
 
+    @property
+    def bounded(self):
+        return _shape(self.base) != _shape(self.range.ranges[0])
+
+    def _push_inputs(self, out, sol):
+        # Inputs of cells beyond the used range.
+        rng, known = self.range.ranges[0], self.inputs[sh.SELF]
+        r0, c0, items = self.base.r1, self.base.n1, []
+        for k, v in getattr(sol, 'inputs', {}).items():
+            if not isinstance(k, str) or k in known or k in self.inputs:
+                continue
+            i = _cell_index(k)
+            if i and i[0] == rng.sheet_id and rng.n1 <= i[1] <= rng.n2 and \
+                    (rng.r1 or 1) <= i[2] <= rng.r2:
+                items.append((i[2] - r0, i[1] - c0, v))
+        if items:
+            shape = tuple(np.max([out.shape] + [
+                (r + 1, c + 1) for r, c, _ in items
+            ], 0))
+            if shape != out.shape:
+                out = pad_empty(out, shape)
+            for r, c, v in items:
+                out[r:r + 1, c:c + 1] = v.value if isinstance(v, Ranges) else v
+        return out
+
     @property
     def output(self):
-        return self.range.ranges[0]['name']
+        return self.range.ranges[0].name
 
-    def push(self, indices, output=None):
-        it = {i for i in self.missing if i in indices}
+    def push(self, ranges, output):
+        missing, it = self.missing, []
+        for rng in ranges:
+            missing = [x for m in missing for x in _split(rng, m, it)]
         if it:
-            self.missing.difference_update(it)
-            it = (indices[i] for i in it) if output is None else (output,)
-            self.inputs.update(dict.fromkeys(it, None))
+            self.missing = missing
+            self.inputs[output] = None
+        return self.missing
+
+    def _cover(self, index):
+        # Missing rectangles minus the indexed cells, and the covering ones.
+        missing, covering = [], []
+        for m in self.missing:
+            covered, cols = {}, range(m.n1, m.n2 + 1)
+            if len(cols) > len(index):
+                cols = sorted(n for n in index if m.n1 <= n <= m.n2)
+            for n in cols:
+                if n in index:
+                    rows, values = index[n]
+                    i = bisect.bisect_left(rows, m.r1)
+                    j = bisect.bisect_right(rows, m.r2, i)
+                    if i < j:
+                        covered[n] = rows[i:j]
+                        covering.extend(values[i:j])
+            missing.extend(_uncovered(m, covered) if covered else (m,))
+        return missing, covering
+
+    def push_cells(self, index):
+        missing, outputs = self._cover(index)
+        if outputs:
+            self.missing = missing
+            self.inputs.update(dict.fromkeys(outputs))
         return self.missing
 
     def add(self, dsp):
-        base = self.range.ranges[0]
-        sheet_id = base['sheet_id']
-        ists = {}
+        base = self.base
+        sheet_id = base.sheet_id
         nodes = dsp.default_values
-        _name = f'{sheet_id}!%s' if sheet_id else '%s'
-        for n, r in tuple(self.missing):
-            c = _index2col(n)
-            ref = '{}{}'.format(c, r)
-            name = _name % ref
-            ist = {
-                'r1': r, 'r2': r, 'c1': c, 'c2': c, 'n1': n, 'n2': n,
-                'ref': ref, 'name': name, 'sheet_id': sheet_id
-            }
-            if name in nodes:
-                self.inputs[name] = _get_indices_intersection(base, ist)
-                self.missing.remove((n, r))
-            else:
-                ists[name] = ist
+        if _cells_count(self.missing) > self.max_enumerated:
+            ists, known = _MissingCells(base, self.missing), {}
+            for k in nodes:
+                i = ists.coordinates(k)
+                if i:
+                    known[i] = k
+            self.missing, names = self._cover(self.index_cells(known))
+            for k in names:
+                self.inputs[k] = ists.get(k)
+            ists.ranges = self.missing
+        else:
+            ists, missing = {}, []
+            _name = f'{sheet_id}!%s' if sheet_id else '%s'
+            for m in self.missing:
+                covered = {}
+                for r in range(m.r1, m.r2 + 1):
+                    for n in range(m.n1, m.n2 + 1):
+                        ref = '{}{}'.format(_index2col(n), r)
+                        name = _name % ref
+                        ist = RangeRecord(sheet_id, n, r, n, r, ref, name)
+                        if name in nodes:
+                            self.inputs[name] = _get_indices_intersection(
+                                base, ist
+                            )
+                            covered.setdefault(n, []).append(r)
+                        else:
+                            ists[name] = ist
+                missing.extend(_uncovered(m, covered) if covered else (m,))
+            self.missing = missing
 
-        if len(ists) <= self.compact:
+        if len(ists) <= self.compact and not self.bounded:
             for k, ist in ists.items():
                 self.inputs[k] = _get_indices_intersection(base, ist)
                 f = functools.partial(format_output, ist),
@@ -256,27 +581,38 @@ class RangesAssembler:
         return '=%s' % self.output
 
     def __call__(self, *cells):
-        base = self.range.ranges[0]
+        base = self.base
         if sh.SELF in self.inputs:
-            out = np.empty(_shape(**base), object)
+            out = np.empty(_shape(base), object)
             out[:] = sh.EMPTY
             ists = self.inputs[sh.SELF]
             sol = cells[-1].solution
             cells = cells[:-1]
-            for n, v in ists.items():
-                if n in sol:
-                    if isinstance(v, dict):
-                        v = ists[n] = _get_indices_intersection(base, v)
-                    i, j = v
+            if isinstance(ists, _MissingCells):
+                for n, (i, j) in ists.found(sol):
                     v = sol[n]
-                    if isinstance(sol[n], Ranges):
-                        v = v.value
-                    out[i, j] = v
+                    out[i, j] = v.value if isinstance(v, Ranges) else v
+            else:
+                for n, v in ists.items():
+                    if n in sol:
+                        if isinstance(v, RangeRecord):
+                            v = ists[n] = _get_indices_intersection(base, v)
+                        i, j = v
+                        v = sol[n]
+                        if isinstance(sol[n], Ranges):
+                            v = v.value
+                        out[i, j] = v
+            if self.bounded:
+                out = self._push_inputs(out, sol)
         else:
-            out = np.empty(_shape(**base), object)
+            out = np.empty(_shape(base), object)
         for c, ind in zip(cells, self.inputs.values()):
             if ind:
                 out[ind[0], ind[1]] = c.value
             else:
                 _assemble_values(base, c.values, out)
+        shape = _shape(self.range.ranges[0])
+        if out.shape != shape:  # Implicit empty tail.
+            out = out.view(Array)
+            out._full_shape = shape
         return out
@@ -17,7 +17,15 @@ Sub-Modules:
     :nosignatures:
     :toctree: excel/
 
+    ~cache
+    ~cse
     ~cycle
+    ~iterative
+    ~levels
+    ~parallel
+    ~plan
+    ~profiler
+    ~synthetic
     ~xlreader
 """
 import os
@@ -26,10 +34,10 @@ import functools
 import numpy as np
 import os.path as osp
 import schedula as sh
-from ..ranges import Ranges
+from ..ranges import Ranges, _shape
 from ..functions import flatten
 from ..errors import InvalidRangeName
-from ..cell import Cell, RangesAssembler, Ref, CellWrapper
+from ..cell import Cell, RangesAssembler, Ref, CellWrapper, _cells_count
 from ..tokens.operand import XlError, _re_sheet_id, _re_build_id
 
 log = logging.getLogger(__name__)
@@ -55,6 +63,35 @@ def _get_name(name, names):
     return name
 
 
+def _flat_value(value):
+    if isinstance(value, Ranges):
+        value = value.value
+    return np.asarray(value, object).ravel().tolist()
+
+
+def _has_changed(old, new):
+    try:
+        old, new = _flat_value(old), _flat_value(new)
+    except Exception:  # Missing or invalid value.
+        return True
+    return len(old) != len(new) or not all(
+        type(i) is type(j) and i == j for i, j in zip(old, new)
+    )
+
+
+def _get_dirty_nodes(dsp, inputs):
+    succ, dirty = dsp.dmap.succ, set()
+    stack = [k for k in inputs if k in dsp.nodes]
+    if sh.SELF in dsp.nodes and any(k not in dsp.nodes for k in inputs):
+        stack.append(sh.SELF)  # Values read by `RangesAssembler` from SELF.
+    while stack:
+        n_id = stack.pop()
+        if n_id not in dirty:
+            dirty.add(n_id)
+            stack.extend(succ[n_id])
+    return dirty
+
+
 def _encode_path(path):
     return path.replace('\\', '/')
 
@@ -72,11 +109,65 @@ class ExcelModel:
         self.books = {}
         self.basedir = None
 
-    def calculate(self, *args, **kwargs):
+    def calculate(self, *args, threads=None, **kwargs):
+        """
+        Calculates the model (see :meth:`schedula.Dispatcher.dispatch`).
+
+        If `threads` is given, the independent cells are evaluated in parallel
+        with :func:`~formulas.excel.levels.calculate` (only `inputs` and
+        `outputs` are supported).
+        """
+        if threads:
+            from .levels import calculate
+            return calculate(self, *args, threads=threads, **kwargs)
         return self.dsp.dispatch(*args, **kwargs)
 
+    def recalculate(self, inputs=None):
+        """
+        Updates the last solution re-evaluating only the cells that depend on
+        the changed inputs. Inputs imposed by previous calls are kept.
+        """
+        dsp, inputs = self.dsp, inputs or {}
+        sol = dsp.solution
+        if not sol:
+            return self.calculate(inputs)
+        imposed = {
+            k: v for k, v in sol.inputs.items()
+            if k not in dsp.default_values or
+               v is not dsp.default_values[k]['value']
+        }
+        changed = {
+            k for k, v in inputs.items()
+            if k not in imposed or _has_changed(sol.get(k, sh.NONE), v)
+        }
+        imposed.update(inputs)
+        sol.inputs.update(inputs)
+        sol.update({k: v for k, v in inputs.items() if k not in dsp.nodes})
+        dirty = _get_dirty_nodes(dsp, changed)
+        if not dirty:
+            return sol
+
+        pred, f_nodes = dsp.dmap.pred, dsp.function_nodes
+        nodes = dirty.union(*(pred[k] for k in dirty if k in f_nodes))
+        sub_dsp = dsp.get_sub_dsp(nodes)
+        for k in dirty.difference(sub_dsp.nodes):  # Isolated nodes.
+            sub_dsp.dmap.add_node(k, **dsp.nodes[k])
+        sub_inputs = {k: sol[k] for k in nodes - dirty if k in sol}
+        sub_inputs.update({
+            k: v for k, v in imposed.items() if k in sub_dsp.nodes
+        })
+        res = sub_dsp.dispatch(sub_inputs)
+
+        for k in dirty.intersection(dsp.data_nodes):
+            sol.pop(k, None)
+            if k in res:
+                sol[k] = res[k]
+        return sol
+
     def __getstate__(self):
-        return {'dsp': self.dsp, 'cells': {}, 'books': {}}
+        return {
+            'dsp': self.dsp, 'cells': {}, 'books': {}, 'basedir': self.basedir
+        }
 
     def _update_refs(self, nodes, refs):
         if nodes:
@@ -103,25 +194,40 @@ class ExcelModel:
         self._update_refs(nodes, refs)
         return refs
 
-    def loads(self, *file_names):
+    def loads(self, *file_names, stream=False, processes=None):
         for filename in file_names:
-            self.load(filename)
+            self.load(filename, stream=stream, processes=processes)
         return self
 
-    def load(self, filename):
-        book, context = self.add_book(filename)
-        self.pushes(*book.worksheets, context=context)
+    def load(self, filename, stream=False, processes=None):
+        """
+        Loads all cells of a workbook.
+
+        With `stream=True` the workbook is opened in read-only mode and the
+        cells are compiled as the rows are parsed, without keeping the
+        openpyxl cells in memory. Hence, its books cannot be used by
+        :meth:`write`.
+
+        With `processes` the formulas are compiled by a pool of processes
+        (see :mod:`~formulas.excel.parallel`).
+        """
+        book, context = self.add_book(filename, read_only=stream)
+        try:
+            self.pushes(*book.worksheets, context=context, processes=processes)
+        finally:
+            if book.read_only:  # Releases the file, the cells are loaded.
+                book.close()
         return self
 
     def from_ranges(self, *ranges):
         return self.complete(ranges)
 
-    def pushes(self, *worksheets, context=None):
+    def pushes(self, *worksheets, context=None, processes=None):
         for ws in worksheets:
-            self.push(ws, context=context)
+            self.push(ws, context=context, processes=processes)
         return self
 
-    def push(self, worksheet, context):
+    def push(self, worksheet, context, processes=None):
         worksheet, context = self.add_sheet(worksheet, context)
         references = self.references
         formula_references = self.formula_references(context)
@@ -129,19 +235,54 @@ class ExcelModel:
         external_links = self.external_links(context)
         ctx = {'external_links': external_links}
         ctx.update(context)
-        cells = []
-        for row in worksheet.iter_rows():
-            for c in row:
-                if hasattr(c, 'value'):
-                    cells.append(self.compile_cell(
-                        c, ctx, references, formula_references
-                    ))
+        stream = getattr(worksheet.parent, 'read_only', False)
+        if stream:
+            cells = self._stream_cells(
+                worksheet, context, formula_references, formula_ranges
+            )
+        else:
+            cells = (
+                c for row in worksheet.iter_rows() for c in row
+                if hasattr(c, 'value')
+            )
+        if processes:
+            from .parallel import compile_cells
+            cells = compile_cells(
+                self, cells, ctx, references, formula_references, processes
+            )
+        else:
+            templates = {}
+            cells = (self.compile_cell(
+                c, ctx, references, formula_references, templates
+            ) for c in cells)
+            if not stream:
+                cells = list(cells)
         for cell in cells:
             # noinspection PyTypeChecker
             self.add_cell(sh.await_result(cell), ctx, formula_ranges)
+        if stream:
+            sh.get_nested_dicts(
+                self.books, context['excel'], SHEETS, context['sheet']
+            )['streamed'] = True
         return self
 
-    def add_book(self, book=None, context=None, data_only=False):
+    @staticmethod
+    def _stream_cells(worksheet, context, formula_references, formula_ranges):
+        from .xlreader import iter_cells
+        attributes = {}
+        for c in iter_cells(worksheet, attributes):
+            if attributes:  # Array formulas of the current row.
+                for k, v in attributes.items():
+                    if v.get('t') == 'array' and 'ref' in v:
+                        formula_references[k] = v['ref']
+                        formula_ranges.add(
+                            Ranges().push(v['ref'], context=context)
+                        )
+                attributes.clear()
+            yield c
+
+    def add_book(self, book=None, context=None, data_only=False,
+                 read_only=False):
         ctx = (context or {}).copy()
         are_in, get_in = sh.are_in_nested_dicts, sh.get_nested_dicts
         if isinstance(book, str):
@@ -165,7 +306,8 @@ class ExcelModel:
         if not book:
             from .xlreader import load_workbook
             data[BOOK] = book = load_workbook(
-                osp.join(self.basedir, fpath), data_only=data_only
+                osp.join(self.basedir, fpath), data_only=data_only,
+                read_only=read_only
             )
 
         if 'external_links' not in data:
@@ -201,7 +343,9 @@ class ExcelModel:
         d = get_in(self.books, ctx['excel'], SHEETS, ctx['sheet'])
         if 'formula_references' not in d:
             d['formula_references'] = formula_references = {
-                k: v['ref'] for k, v in worksheet.formula_attributes.items()
+                k: v['ref'] for k, v in getattr(
+                    worksheet, 'formula_attributes', {}
+                ).items()
                 if v.get('t') == 'array' and 'ref' in v
             }
         else:
@@ -234,18 +378,25 @@ class ExcelModel:
         return sh.get_nested_dicts(self.books, ctx['excel'], 'external_links')
 
     @staticmethod
-    def _compile_cell(crd, val, context, check_formula, references):
-        cell = Cell(crd, val, context=context, check_formula=check_formula)
+    def _compile_cell(crd, val, context, check_formula, references,
+                      templates=None):
+        cell = Cell(
+            crd, val, context=context, check_formula=check_formula,
+            templates=templates
+        )
         cell.compile(references=references, context=context)
         return cell
 
-    def compile_cell(self, cell, context, references, formula_references):
+    def compile_cell(self, cell, context, references, formula_references,
+                     templates=None):
         crd = cell.coordinate
         crd = formula_references.get(crd, crd)
         val = cell.value
         val = cell.data_type == 'f' and val[:2] == '==' and val[1:] or val
         check_formula = cell.data_type != 's'
-        return self._compile_cell(crd, val, context, check_formula, references)
+        return self._compile_cell(
+            crd, val, context, check_formula, references, templates
+        )
 
     def add_cell(self, cell, context, formula_ranges):
         if cell.output in self.cells:
@@ -264,7 +415,7 @@ class ExcelModel:
             stack = {k for k in self.dsp.data_nodes if k not in self.references}
             stack = stack.difference(done)
         stack = sorted(stack)
-        sheet_limits = {}
+        sheet_limits, templates = {}, {}
         while stack:
             n_id = stack.pop()
             if isinstance(n_id, sh.Token) or n_id in done:
@@ -274,7 +425,7 @@ class ExcelModel:
                 stack.extend(self.cells[n_id].inputs or ())
                 continue
             try:
-                rng = Ranges().push(n_id).ranges[0]
+                rng = Ranges.get_parts(n_id, {})
             except InvalidRangeName:  # Missing Reference.
                 log.warning('Missing Reference `{}`!'.format(n_id))
                 Ref(n_id, '=#REF!').compile().add(self.dsp)
@@ -292,6 +443,10 @@ class ExcelModel:
                 Cell(n_id, '=#REF!').compile().add(self.dsp)
                 self.books.pop(book, None)
                 continue
+            if sh.get_nested_dicts(
+                    self.books, context['excel'], SHEETS, context['sheet']
+            ).get('streamed'):  # All cells are already loaded.
+                continue
 
             references = self.references
             formula_references = self.formula_references(context)
@@ -317,7 +472,7 @@ class ExcelModel:
                     continue
                 elif hasattr(c, 'value'):
                     cells.append(self.compile_cell(
-                        c, ctx, references, formula_references
+                        c, ctx, references, formula_references, templates
                     ))
             for cell in cells:
                 # noinspection PyTypeChecker
@@ -326,7 +481,7 @@ class ExcelModel:
                     stack.extend(cell.inputs or ())
         return self
 
-    def _assemble_ranges(self, cells, nodes=None, compact=1):
+    def _assemble_ranges(self, cells, nodes=None, compact=1, limits=None):
         get, dsp = sh.get_nested_dicts, self.dsp
         pred = dsp.dmap.pred
         if nodes is None:
@@ -335,37 +490,43 @@ class ExcelModel:
             k for k in nodes
             if not pred[k] and not isinstance(k, sh.Token)
         )
-        ranges = []
+        ranges, index = [], {}
         for n_id in it:
             try:
-                ra = RangesAssembler(n_id, compact=compact)
+                ra = RangesAssembler(n_id, compact=compact, limits=limits)
             except ValueError:
                 continue
-            rng = ra.range.ranges[0]
-            for out, idx in get(cells, 'range', rng['sheet_id'], default=list):
-                if not ra.push(idx, out):
+            sheet_id = ra.range.ranges[0].sheet_id
+            for out, rng in get(cells, 'range', sheet_id, default=list):
+                if not ra.push(rng, out):
                     break
-            ra.push(get(cells, 'cell', rng['sheet_id']))
+            else:
+                if sheet_id not in index:
+                    index[sheet_id] = ra.index_cells(
+                        get(cells, 'cell', sheet_id)
+                    )
+                ra.push_cells(index[sheet_id])
             ranges.append(ra)
 
-        for ra in sorted(ranges, key=lambda x: len(x.missing)):
+        for ra in sorted(ranges, key=lambda x: _cells_count(x.missing)):
             ra.add(dsp)
 
     def assemble(self, compact=1):
-        cells, get = {}, sh.get_nested_dicts
+        cells, get, limits = {}, sh.get_nested_dicts, {}
         for c in self.cells.values():
             if isinstance(c, Ref):
                 continue
             rng = c.range.ranges[0]
-            indices = RangesAssembler._range_indices(c.range)
-            if len(indices) == 1:
-                get(cells, 'cell', rng['sheet_id'])[list(indices)[0]] = c.output
+            if len(c.range.ranges) == 1 and _shape(rng) == (1, 1):
+                get(cells, 'cell', rng.sheet_id)[rng.n1, rng.r1] = c.output
             else:
-                get(cells, 'range', rng['sheet_id'], default=list).append(
-                    (c.output, indices)
+                get(cells, 'range', rng.sheet_id, default=list).append(
+                    (c.output, c.range.ranges)
                 )
+            row, col = limits.get(rng.sheet_id, (1, 1))
+            limits[rng.sheet_id] = max(row, rng.r2), max(col, rng.n2)
 
-        self._assemble_ranges(cells, compact=compact)
+        self._assemble_ranges(cells, compact=compact, limits=limits)
         return self
 
     def inverse_references(self):
@@ -389,16 +550,24 @@ class ExcelModel:
                                 d, 'filters', default=list
                             ).extend(nodes[out]['filters'])
 
-    def finish(self, complete=True, circular=False, assemble=True):
+    def finish(self, complete=True, circular=False, assemble=True,
+               iterative=False, cse=False):
         if complete:
             self.complete()
         if assemble:
             self.assemble()
-        if circular:
-            self.solve_circular()
+        if circular or iterative:
+            self.solve_circular(iterative=iterative)
+        if cse:
+            self.eliminate_common_subexpressions()
         self.inverse_references()
         return self
 
+    def eliminate_common_subexpressions(self):
+        from .cse import eliminate_common_subexpressions
+        eliminate_common_subexpressions(self.dsp)
+        return self
+
     def to_dict(self):
         nodes = {
             k: d['value']
@@ -412,7 +581,10 @@ class ExcelModel:
         for d in self.dsp.function_nodes.values():
             fun = d['function']
             if isinstance(fun, CellWrapper):
-                nodes.update(dict.fromkeys(d['outputs'], fun.__name__))
+                nodes.update({
+                    k: fun.__name__ for k in d['outputs']
+                    if not isinstance(k, sh.Token)  # Hoisted expressions.
+                })
         return nodes
 
     def from_dict(self, adict, context=None, assemble=True, ref=True):
@@ -442,17 +614,15 @@ class ExcelModel:
         for k, r in solution.items():
             if isinstance(k, sh.Token):
                 continue
-            if isinstance(r, Ranges):
+            try:
+                if not isinstance(r, Ranges):
+                    r = Ranges().push(k, r)
                 rng = {k: v for k, v in _re_sheet_id.match(
-                    r.ranges[0]['sheet_id']
+                    r.ranges[0].sheet_id
                 ).groupdict().items() if v is not None}
                 rng.update(r.ranges[0])
-            else:
-                try:
-                    r = Ranges().push(k, r)
-                    rng = r.ranges[0]
-                except ValueError:  # Reference.
-                    rng = {'sheet': ''}
+            except ValueError:  # Reference.
+                rng = {'sheet': ''}
             fpath = _encode_path(osp.join(
                 _decode_path(rng.get('directory', '')), rng.get('filename', '')
             ))
@@ -526,7 +696,10 @@ class ExcelModel:
 
         return func
 
-    def solve_circular(self):
+    def solve_circular(self, iterative=False, max_iterations=100,
+                       max_change=.001):
+        if iterative:
+            return self._solve_iterative(max_iterations, max_change)
         from .cycle import simple_cycles
         from collections import Counter
         mod, dsp = {}, self.dsp
@@ -556,6 +729,54 @@ class ExcelModel:
 
         return self
 
+    def _solve_iterative(self, max_iterations=100, max_change=.001):
+        from .cycle import strongly_connected_components
+        from .iterative import IterativeSolver
+        dsp = self.dsp
+        f_nodes, dmap = dsp.function_nodes, dsp.dmap
+        for scc in list(strongly_connected_components(dmap.succ)):
+            if len(scc) < 2:
+                continue
+            scc = set(scc)
+            functions = _iteration_order(dmap, scc.intersection(f_nodes))
+            outputs = sorted(scc.difference(functions))
+            inputs = sorted({
+                i for k in functions for i in f_nodes[k]['inputs']
+                if i not in scc
+            }, key=str)
+            solver = IterativeSolver(
+                dsp, functions, inputs, outputs, max_iterations, max_change
+            )
+            for k in functions:
+                dmap.remove_node(k)
+            dsp.add_function(None, solver, inputs or None, outputs)
+        return self
+
+
+def _iteration_order(dmap, functions):
+    # Reverse post-order of the functions of a strongly connected component.
+    succ, visited, order = dmap.succ, set(), []
+    for root in sorted(functions):
+        if root in visited:
+            continue
+        visited.add(root)
+        stack = [(root, iter(sorted(
+            j for i in succ[root] for j in succ[i] if j in functions
+        )))]
+        while stack:
+            node, it = stack[-1]
+            for j in it:
+                if j not in visited:
+                    visited.add(j)
+                    stack.append((j, iter(sorted(
+                        k for i in succ[j] for k in succ[i] if k in functions
+                    ))))
+                    break
+            else:
+                stack.pop()
+                order.append(node)
+    return order[::-1]
+
 
 def _check_range_all_cycles(nodes, active_nodes, j):
     if isinstance(nodes[j]['function'], RangesAssembler):
@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+#
+# Copyright 2016-2022 European Commission (JRC);
+# Licensed under the EUPL (the 'Licence');
+# You may not use this work except in compliance with the Licence.
+# You may obtain a copy of the Licence at: http://ec.europa.eu/idabc/eupl
+
+"""
+It provides a persistent on-disk cache of finished excel models.
+
+The models are stored with `dill` and keyed by the hash of the workbooks'
+bytes, the finish options, and the library version. The workbooks that are
+loaded indirectly (i.e., external links) are validated on load, hence any
+change of the files invalidates the cache.
+
+Example::
+
+    >>> from formulas.excel.cache import load_model
+    >>> xl_model = load_model('excel.xlsx', circular=True)  # doctest: +SKIP
+"""
+import os
+import hashlib
+import logging
+import os.path as osp
+from .._version import __version__
+
+log = logging.getLogger(__name__)
+
+#: Environment variable to customize the default cache directory.
+CACHE_DIR_ENV = 'FORMULAS_CACHE_DIR'
+
+
+def default_cache_dir():
+    """
+    Returns the default cache directory.
+
+    :return:
+        `$FORMULAS_CACHE_DIR` or `~/.cache/formulas`.
+    :rtype: str
+    """
+    return os.environ.get(CACHE_DIR_ENV) or osp.join(
+        osp.expanduser('~'), '.cache', 'formulas'
+    )
+
+
+def file_hash(fpath, chunk_size=1 << 20):
+    """
+    Returns the sha256 hex digest of the file's bytes.
+
+    :param fpath:
+        File path.
+    :type fpath: str
+
+    :return:
+        Hex digest.
+    :rtype: str
+    """
+    h = hashlib.sha256()
+    with open(fpath, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def model_key(*file_names, **options):
+    """
+    Returns the cache key of a model.
+
+    :param file_names:
+        Workbooks' file paths.
+    :type file_names: str
+
+    :param options:
+        Options to finish the model.
+    :type options: object
+
+    :return:
+        Hex digest.
+    :rtype: str
+    """
+    h = hashlib.sha256()
+    h.update(('formulas-%s' % __version__).encode())
+    h.update(repr(sorted(options.items())).encode())
+    for fpath in file_names:
+        h.update(osp.basename(fpath).encode())
+        h.update(file_hash(fpath).encode())
+    return h.hexdigest()
+
+
+def _find_file(basedir, path):
+    # Book keys are upper case, hence the file is searched case-insensitively.
+    fpath = basedir
+    for name in path.split('/'):
+        if name in ('', '.', '..'):
+            fpath = osp.join(fpath, name)
+            continue
+        try:
+            fpath = osp.join(fpath, next(
+                n for n in os.listdir(fpath) if n.upper() == name.upper()
+            ))
+        except (OSError, StopIteration):
+            return None
+    return fpath
+
+
+def _dependencies(xl_model, file_names):
+    from . import _decode_path
+    files = {osp.abspath(f) for f in file_names}
+    for excel, data in xl_model.books.items():
+        fpath = _find_file(xl_model.basedir, excel)
+        if fpath:  # Books loaded also by references (e.g., `[ext.xlsx]`).
+            files.add(osp.abspath(fpath))
+        for d, f in data.get('external_links', {}).values():
+            files.add(osp.abspath(osp.join(
+                xl_model.basedir, _decode_path(d), f
+            )))
+    return {f: file_hash(f) for f in sorted(files) if osp.isfile(f)}
+
+
+def _is_valid(dependencies):
+    try:
+        return all(file_hash(k) == v for k, v in dependencies.items())
+    except OSError:  # Missing dependency.
+        return False
+
+
+def load_model(*file_names, cache_dir=None, **options):
+    """
+    Loads the finished excel model from the cache, or builds and caches it.
+
+    :param file_names:
+        Workbooks' file paths.
+    :type file_names: str
+
+    :param cache_dir:
+        Cache directory (default: :func:`default_cache_dir`).
+    :type cache_dir: str
+
+    :param options:
+        Options of :meth:`ExcelModel.finish`.
+    :type options: object
+
+    :return:
+        Finished excel model.
+    :rtype: formulas.excel.ExcelModel
+    """
+    import dill
+    from . import ExcelModel
+    cache_dir = default_cache_dir() if cache_dir is None else cache_dir
+    key = model_key(*file_names, **options)
+    fpath = osp.join(cache_dir, '%s.dill' % key)
+    if osp.isfile(fpath):
+        try:
+            with open(fpath, 'rb') as f:
+                dependencies, xl_model = dill.load(f)
+            if _is_valid(dependencies):
+                log.debug('Loaded excel model from cache `%s`.', fpath)
+                return xl_model
+        except Exception as ex:  # Corrupted or incompatible cache.
+            log.warning('Invalid excel model cache `%s`: %r', fpath, ex)
+
+    xl_model = ExcelModel().loads(*file_names).finish(**options)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        data = dill.dumps((_dependencies(xl_model, file_names), xl_model))
+        tmp = '%s.%d.tmp' % (fpath, os.getpid())
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, fpath)
+    except Exception as ex:  # Best effort.
+        log.warning('Cannot cache excel model `%s`: %r', fpath, ex)
+    return xl_model
@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+#
+# Copyright 2016-2022 European Commission (JRC);
+# Licensed under the EUPL (the 'Licence');
+# You may not use this work except in compliance with the Licence.
+# You may obtain a copy of the Licence at: http://ec.europa.eu/idabc/eupl
+
+"""
+It provides the workbook-wide common subexpression elimination.
+
+The inner nodes of the compiled cells are hashed by structure (i.e., called
+function, constants, and workbook references of the inputs), hence the same
+subexpression is recognized also in different formulas (e.g., `SUM(A:A)` in
+`=SUM(A:A) + 1` and `=SUM(A:A) * 2`) and in cells bound to a shared template.
+The shared subexpressions that call at least one function (i.e., not only
+operators) are hoisted into single nodes of the top-level dispatcher.
+
+Example::
+
+    >>> import formulas
+    >>> xl_model = formulas.ExcelModel().loads(
+    ...     'excel.xlsx'
+    ... ).finish(cse=True)  # doctest: +SKIP
+"""
+import collections
+import schedula as sh
+from ..cell import Cell, CellWrapper, wrap_cell_func, parse_cell_args
+
+
+class CellArgs:
+    """
+    Parses the arguments of a rewired cell function.
+
+    The first arguments are the cell inputs that are still needed, the
+    remaining ones are the values of the hoisted subexpressions.
+    """
+
+    def __init__(self, inputs, links):
+        self.inputs, self.links = inputs, links
+
+    def __call__(self, *args):
+        n = len(self.links)
+        res = list(parse_cell_args(self.inputs, self.links, args[:n]))
+        return res + list(args[n:])
+
+
+def _cell(node):
+    func = node['function']
+    if not (isinstance(func, CellWrapper) and
+            isinstance(func.func, sh.DispatchPipe)):
+        return None
+    cell = getattr(func.parse_args, '__self__', None)
+    if not isinstance(cell, Cell) or \
+            list(cell.inputs or ()) != list(node['inputs'] or ()):
+        return None  # E.g., rewired by `solve_circular`.
+    return func, cell
+
+
+#: Functions that return a different value at each evaluation.
+VOLATILE = {'NOW', 'RAND', 'RANDARRAY', 'RANDBETWEEN', 'TODAY'}
+
+
+def _function_name(function_id):
+    return str(function_id).split('<', 1)[0].upper()  # E.g., `SUM<0>`.
+
+
+def _is_operator(name):
+    return not (name[:1].isalpha() or name[:1] == '_')
+
+
+def _structural_keys(func, cell):
+    dsp, output = func.func.dsp, func.func.outputs[0]
+    nodes, pred, defaults = dsp.nodes, dsp.dmap.pred, dsp.default_values
+    refs = collections.defaultdict(list)
+    for name, links in cell.inputs.items():
+        for k in links:
+            refs[k].append(name)
+    keys, named = {}, {}
+
+    def _key(k):
+        if k in keys:
+            return keys[k]
+        key, calls = None, False
+        if k in func.inputs:
+            key = k in refs and ('ref', tuple(refs[k])) or None
+        elif not pred[k]:
+            if k in defaults:
+                v = defaults[k]['value']
+                r = repr(v)
+                key = '...' not in r and ('value', type(v).__name__, r) or None
+        elif len(pred[k]) == 1 and (k == output or not nodes[k].get(
+                'filters')):
+            fid = next(iter(pred[k]))
+            node, name = nodes[fid], _function_name(fid)
+            inputs = node['inputs']
+            if len(node['outputs']) == 1 and name not in VOLATILE and \
+                    not any(isinstance(i, sh.Token) for i in inputs):
+                args = tuple(map(_key, inputs))
+                if None not in args:
+                    key = 'call', node['function'], args
+                    calls = not _is_operator(name) or any(
+                        named[i] for i in inputs
+                    )
+        keys[k], named[k] = key, calls
+        return key
+
+    _key(output)
+    return {
+        k: v for k, v in keys.items()
+        if v is not None and named[k] and k != output
+    }
+
+
+def _maximal(func, keys, shared):
+    dsp, visited, res = func.func.dsp, set(), []
+    pred, nodes, stack = dsp.dmap.pred, dsp.nodes, [func.func.outputs[0]]
+    while stack:
+        k = stack.pop()
+        if k in visited:
+            continue
+        visited.add(k)
+        if keys.get(k) in shared:
+            res.append(k)
+        else:
+            for fid in pred[k]:
+                stack.extend(nodes[fid]['inputs'])
+    return sorted(res)
+
+
+def _rebuild(func, cell, blockers, outputs, hoisted=()):
+    pipe = func.func
+    dsp = pipe.dsp.get_sub_dsp_from_workflow(
+        outputs, graph=pipe.dsp.dmap, reverse=True, blockers=blockers,
+        wildcard=False
+    )
+    dsp.raises = pipe.dsp.raises
+    inputs = collections.OrderedDict(
+        (k, v) for k, v in func.inputs.items() if k in dsp.nodes
+    )
+    names, links = [], []
+    for name, keys in cell.inputs.items():
+        keys = [k for k in keys if k in inputs]
+        if keys:
+            names.append(name)
+            links.append(keys)
+    pipe_inputs = collections.OrderedDict(inputs)
+    pipe_inputs.update(dict.fromkeys(hoisted))
+    new = type(pipe)(
+        dsp, pipe.__name__, pipe_inputs, outputs, wildcard=False,
+        shrink=False
+    )
+    new = wrap_cell_func(new, CellArgs(inputs, links), func.parse_kwargs)
+    return new, names
+
+
+def eliminate_common_subexpressions(dsp):
+    """
+    Hoists the subexpressions shared by cell functions into single nodes of
+    the dispatcher.
+
+    :param dsp:
+        Top-level dispatcher of the excel model.
+    :type dsp: schedula.Dispatcher
+
+    :return:
+        Number of hoisted subexpressions.
+    :rtype: int
+    """
+    cells, counter, representatives = {}, collections.Counter(), {}
+    for fid, node in list(dsp.function_nodes.items()):
+        cell = _cell(node)
+        if cell:
+            keys = _structural_keys(*cell)
+            cells[fid] = cell + (keys,)
+            counter.update(set(keys.values()))
+            template = cell[0].inputs is not cell[0].func.inputs
+            for k, key in keys.items():
+                if key not in representatives or (
+                        not template and representatives[key][-1]):
+                    representatives[key] = fid, k, template
+    shared = {k for k, v in counter.items() if v > 1}
+
+    hoisted = {}
+    for fid, (func, cell, keys) in cells.items():
+        selected = _maximal(func, keys, shared)
+        if not selected:
+            continue
+        for k in selected:
+            key = keys[k]
+            if key not in hoisted:
+                r_id, r_k, _ = representatives[key]
+                r_func, r_cell = cells[r_id][:2]
+                h_func, names = _rebuild(r_func, r_cell, set(), [r_k])
+                h_func.__name__ = '=%s' % r_k
+                hoisted[key] = h_id = sh.Token(r_k)
+                dsp.add_function(h_func.__name__, h_func, names, [h_id])
+        node = dsp.nodes[fid]
+        new, names = _rebuild(
+            func, cell, set(selected), list(func.func.outputs), selected
+        )
+        new.__name__ = func.__name__
+        outputs = node['outputs']
+        dsp.dmap.remove_node(fid)
+        dsp.add_function(
+            fid, new, names + [hoisted[keys[k]] for k in selected], outputs
+        )
+    return len(hoisted)
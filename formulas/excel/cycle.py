@@ -7,47 +7,79 @@
 # You may obtain a copy of the Licence at: http://ec.europa.eu/idabc/eupl
 
 """
-A dependency-free version of networkx's implementation of `simple_cycles`.
+A dependency-free version of networkx's implementation of `simple_cycles` and
+`strongly_connected_components`.
 """
 
 from collections import defaultdict
 
 
-def _strong_connect(node, graph, counter, stack, result, lowlink, index):
-    index[node] = lowlink[node] = counter[0]
-    counter[0] += 1
-    stack.append(node)
-
-    for s in graph[node]:
-        if s not in index:
-            _strong_connect(s, graph, counter, stack, result, lowlink, index)
-            lowlink[node] = min(lowlink[node], lowlink[s])
-        elif s in stack:
-            lowlink[node] = min(lowlink[node], index[s])
-
-    if lowlink[node] == index[node]:
-        connected_component = []
-
-        while True:
-            s = stack.pop()
-            connected_component.append(s)
-            if s == node:
-                break
-        result.append(connected_component[:])
-
-
-def _strongly_connected_components(graph):
-    # Tarjan's algorithm for finding SCC's
-    # Robert Tarjan. "Depth-first search and linear graph algorithms."
-    # SIAM journal on computing. 1972.
-    # Code by Dries Verdegem, November 2012
-    # Downloaded from http://www.logarithmic.net/pfh/blog/01208083168
-
-    counter, stack, result, lowlink, index = [0], [], [], {}, {}
-    for node in graph:
-        if node not in index:
-            _strong_connect(node, graph, counter, stack, result, lowlink, index)
-    return result
+def strongly_connected_components(graph):
+    """
+    Yields the strongly connected components of a graph.
+
+    It is the Tarjan's algorithm with an explicit stack, hence it does not
+    hit the recursion limit on long dependency chains. The components are
+    yielded in reverse topological order.
+
+    :param graph:
+        Adjacency mapping (i.e., node -> successors).
+    :type graph: dict
+
+    :return:
+        Strongly connected components.
+    :rtype: collections.Iterable[list]
+    """
+    index, lowlink, stack, on_stack = {}, {}, [], set()
+    for root in graph:
+        if root in index:
+            continue
+        index[root] = lowlink[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(graph[root]))]
+        while work:
+            node, nbrs = work[-1]
+            for nbr in nbrs:
+                if nbr not in index:
+                    index[nbr] = lowlink[nbr] = len(index)
+                    stack.append(nbr)
+                    on_stack.add(nbr)
+                    work.append((nbr, iter(graph[nbr])))
+                    break
+                elif nbr in on_stack:
+                    lowlink[node] = min(lowlink[node], index[nbr])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    scc = []
+                    while True:
+                        nbr = stack.pop()
+                        on_stack.discard(nbr)
+                        scc.append(nbr)
+                        if nbr == node:
+                            break
+                    yield scc
+
+
+def cyclic_components(graph):
+    """
+    Yields the strongly connected components of a graph that contain a cycle.
+
+    :param graph:
+        Adjacency mapping (i.e., node -> successors).
+    :type graph: dict
+
+    :return:
+        Strongly connected components with more than one node or a self-loop.
+    :rtype: collections.Iterable[list]
+    """
+    for scc in strongly_connected_components(graph):
+        if len(scc) > 1 or scc[0] in graph[scc[0]]:
+            yield scc
 
 
 def _remove_node(graph, target):
@@ -74,41 +106,65 @@ def _unblock(thisnode, blocked, no_circuit):
             no_circuit[node].clear()
 
 
+def _circuits(graph, startnode):
+    # Elementary cycles through `startnode` of a strongly connected graph.
+    path, blocked, closed = [startnode], {startnode}, set()
+    no_circuit = defaultdict(set)
+    stack = [(startnode, list(graph[startnode]))]
+    while stack:
+        thisnode, nbrs = stack[-1]
+        if nbrs:
+            # noinspection PyUnresolvedReferences
+            nextnode = nbrs.pop()
+            if nextnode == startnode:
+                yield path[:]
+                closed.update(path)
+            elif nextnode not in blocked:
+                path.append(nextnode)
+                stack.append((nextnode, list(graph[nextnode])))
+                closed.discard(nextnode)
+                blocked.add(nextnode)
+                continue
+        if not nbrs:
+            if thisnode in closed:
+                _unblock(thisnode, blocked, no_circuit)
+            else:
+                for nbr in graph[thisnode]:
+                    if thisnode not in no_circuit[nbr]:
+                        no_circuit[nbr].add(thisnode)
+            stack.pop()
+            path.pop()
+
+
 def simple_cycles(graph, copy=True):
-    # Yield every elementary cycle in python graph G exactly once
-    # Expects a dictionary mapping from vertices to iterables of vertices
+    """
+    Yields every elementary cycle of a graph exactly once (Johnson's method).
+
+    The search runs on the subgraph of one cyclic component at a time, hence
+    the acyclic part of the graph is visited once. The cycles are generated
+    lazily, so the search stops when the consumer does.
+
+    :param graph:
+        Adjacency mapping (i.e., node -> successors).
+    :type graph: dict
+
+    :param copy:
+        Convert the successors into sets. If False they have to be sets.
+    :type copy: bool
 
+    :return:
+        Elementary cycles.
+    :rtype: collections.Iterable[list]
+    """
     if copy:
         graph = {v: set(nbrs) for v, nbrs in graph.items()}
-    sccs = _strongly_connected_components(graph)
-    while sccs:
-        scc = sccs.pop()
-        startnode = scc.pop()
-        path, blocked, closed = [startnode], {startnode}, set()
-        no_circuit = defaultdict(set)
-        stack = [(startnode, list(graph[startnode]))]
-        while stack:
-            thisnode, nbrs = stack[-1]
-            if nbrs:
-                # noinspection PyUnresolvedReferences
-                nextnode = nbrs.pop()
-                if nextnode == startnode:
-                    yield path[:]
-                    closed.update(path)
-                elif nextnode not in blocked:
-                    path.append(nextnode)
-                    stack.append((nextnode, list(graph[nextnode])))
-                    closed.discard(nextnode)
-                    blocked.add(nextnode)
-                    continue
-            if not nbrs:
-                if thisnode in closed:
-                    _unblock(thisnode, blocked, no_circuit)
-                else:
-                    for nbr in graph[thisnode]:
-                        if thisnode not in no_circuit[nbr]:
-                            no_circuit[nbr].add(thisnode)
-                stack.pop()
-                path.pop()
-        _remove_node(graph, startnode)
-        sccs.extend(_strongly_connected_components(_subgraph(graph, set(scc))))
+    for scc in cyclic_components(graph):
+        subgraphs = [_subgraph(graph, set(scc))]
+        while subgraphs:
+            sub = subgraphs.pop()
+            startnode = next(iter(sub))
+            yield from _circuits(sub, startnode)
+            _remove_node(sub, startnode)
+            subgraphs.extend(
+                _subgraph(sub, set(c)) for c in cyclic_components(sub)
+            )
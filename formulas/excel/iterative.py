@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+#
+# Copyright 2016-2022 European Commission (JRC);
+# Licensed under the EUPL (the 'Licence');
+# You may not use this work except in compliance with the Licence.
+# You may obtain a copy of the Licence at: http://ec.europa.eu/idabc/eupl
+
+"""
+It provides the iterative calculation of circular references (Excel's
+`Enable iterative calculation` option).
+"""
+import numpy as np
+import schedula as sh
+from . import _flat_value
+from .plan import _apply_filters
+
+
+def _is_number(value):
+    return isinstance(value, (int, float, np.number)) and \
+           not isinstance(value, (bool, np.bool_))
+
+
+def _change(old, new):
+    try:
+        old, new = _flat_value(old), _flat_value(new)
+    except Exception:  # Missing or invalid value.
+        return float('inf')
+    if len(old) != len(new):
+        return float('inf')
+    change = 0
+    for i, j in zip(old, new):
+        if _is_number(i) and _is_number(j):
+            change = max(change, abs(float(j) - float(i)))
+        elif type(i) is not type(j) or i != j:
+            return float('inf')
+    return change
+
+
+class IterativeSolver:
+    """
+    Solves a strongly connected component of the model by fixed-point
+    iteration, as Excel does when iterative calculation is enabled.
+
+    Each iteration evaluates once the functions of the component in the given
+    order, using the latest available values (Gauss-Seidel). It stops when
+    the maximum change of the numeric values is less or equal to
+    `max_change` or after `max_iterations` iterations. Cells of the component
+    start from zero.
+    """
+
+    def __init__(self, dsp, functions, inputs, outputs, max_iterations=100,
+                 max_change=.001):
+        nodes = dsp.nodes
+        self.inputs, self.outputs = tuple(inputs), tuple(outputs)
+        self.max_iterations, self.max_change = max_iterations, max_change
+        self.steps = [(
+            nodes[k]['function'], tuple(nodes[k]['inputs']),
+            tuple(nodes[k]['outputs']), tuple(
+                tuple(nodes[o].get('filters', ())) for o in nodes[k]['outputs']
+            )
+        ) for k in functions]
+        self.initial = {
+            k: _apply_filters(nodes[k].get('filters', ()), 0)
+            for k in self.outputs
+        }
+
+    @property
+    def __name__(self):
+        return '=ITERATE(%s)' % ', '.join(map(str, self.outputs))
+
+    @property
+    def reentrant(self):
+        from .plan import _is_reentrant
+        return all(_is_reentrant(s[0]) for s in self.steps)
+
+    def __call__(self, *args):
+        values = dict(self.initial)
+        values.update(zip(self.inputs, args))
+        for _ in range(self.max_iterations):
+            change = 0
+            for func, inputs, outputs, filters in self.steps:
+                res = func(*(values[k] for k in inputs))
+                if len(outputs) == 1:
+                    res = res,
+                for k, f, v in zip(outputs, filters, res):
+                    v = _apply_filters(f, v)
+                    if k in values:
+                        change = max(change, _change(values[k], v))
+                    values[k] = v
+            if change <= self.max_change:
+                break
+        res = [values[k] for k in self.outputs]
+        return res[0] if len(res) == 1 else res
@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+#
+# Copyright 2016-2022 European Commission (JRC);
+# Licensed under the EUPL (the 'Licence');
+# You may not use this work except in compliance with the Licence.
+# You may obtain a copy of the Licence at: http://ec.europa.eu/idabc/eupl
+
+"""
+It provides the level-parallel evaluation of excel models.
+
+The steps of an :class:`~formulas.excel.plan.ExecutionPlan` are partitioned in
+topological levels, i.e. the steps of a level depend only on the steps of the
+previous levels. The heavy steps of a level (i.e., the ones on large ranges,
+where NumPy releases the GIL) are evaluated by a pool of threads, while the
+others are evaluated by the main thread. Each step writes its own slot, hence
+the results are identical to the serial evaluation. The steps that are not
+re-entrant (e.g., the cells that are not compiled into plans or that call the
+engineering functions) are evaluated by the main thread.
+
+Example::
+
+    >>> import formulas
+    >>> xl_model = formulas.ExcelModel().loads('excel.xlsx').finish()
+    ... # doctest: +SKIP
+    >>> sol = xl_model.calculate(threads=4)  # doctest: +SKIP
+"""
+import operator
+import numpy as np
+import schedula as sh
+from concurrent.futures import ThreadPoolExecutor
+from .plan import ExecutionPlan, _Solution, _apply_filters, _is_reentrant
+from ..ranges import _shape
+from ..cell import RangesAssembler
+
+
+def _range_size(func):
+    if isinstance(func, RangesAssembler):
+        return int(np.prod(_shape(func.base)))
+    return 1
+
+
+class LevelPlan(ExecutionPlan):
+    """
+    Execution plan that evaluates the independent steps of each topological
+    level with a pool of threads.
+
+    It can be used as `ExcelModel.compile_class` (e.g., with
+    `functools.partial(LevelPlan, threads=4)`).
+
+    :param threads:
+        Maximum number of threads (default of
+        :class:`concurrent.futures.ThreadPoolExecutor` if None).
+    :type threads: int
+    """
+    #: Minimum number of range cells read by a step to run it in a thread.
+    min_size = 1024
+
+    threads = _parent = None
+
+    def __init__(self, dsp, function_id=None, inputs=None, outputs=None,
+                 threads=None, **kwargs):
+        self.threads, self._parent = threads, dsp
+        super(LevelPlan, self).__init__(
+            dsp, function_id, inputs, outputs, **kwargs
+        )
+
+    def _compile(self, pipe, memo=None):
+        super(LevelPlan, self)._compile(pipe, memo)
+        nodes = self.dsp.nodes
+        self._data = [
+            (k, self._slots[k]) for (_, _, (k, _)), _, _ in pipe.pipe
+            if nodes[k]['type'] == 'data'
+        ]
+        self._order = {s[2]: n for n, s in enumerate(self._steps)}
+        levels, sizes, res = {}, {}, []
+        for step in self._steps:
+            func, inputs, i, _ = step
+            level = levels[i] = max(
+                (levels.get(j, -1) for j in inputs), default=-1
+            ) + 1
+            sizes[i] = size = _range_size(func)
+            if level == len(res):
+                res.append(([], []))
+            heavy = size + sum(sizes.get(j, 0) for j in inputs)
+            heavy = heavy >= self.min_size and _is_reentrant(func)
+            res[level][heavy].append(step)
+        self._levels = tuple(
+            (tuple(l), tuple(h)) if len(h) > 1 or l and h else
+            (tuple(l + h), ()) for l, h in res
+        )
+
+    def _run(self, values, pool):
+        evaluate, order = self._evaluate, self._order
+        for light, heavy in self._levels:
+            futures = [(i, pool.submit(
+                evaluate, func, [values[j] for j in inputs], f
+            )) for func, inputs, i, f in heavy]
+            errors = []
+            for func, inputs, i, f in light:
+                try:
+                    values[i] = evaluate(func, [values[j] for j in inputs], f)
+                except Exception as ex:
+                    errors.append((order[i], ex))
+                    break
+            for i, fut in futures:
+                try:
+                    values[i] = fut.result()
+                except Exception as ex:
+                    errors.append((order[i], ex))
+            if errors:  # Raise the first error in the serial order.
+                raise min(errors, key=lambda x: x[0])[1]
+
+    def evaluate(self, *args):
+        """
+        Evaluates all the slots of the plan.
+
+        :param args:
+            Input values.
+        :type args: object
+
+        :return:
+            Values of the slots.
+        :rtype: list
+        """
+        if len(args) != len(self._inputs):
+            raise TypeError('%s() takes %d positional arguments but %d were '
+                            'given' % (self.__name__, len(self._inputs),
+                                       len(args)))
+        values = self._values.copy()
+        for (i, filters), v in zip(self._inputs, args):
+            values[i] = _apply_filters(filters, v)
+        if self._self is not None:
+            values[self._self] = _Solution(self._slots, values)
+        if any(h for _, h in self._levels):
+            with ThreadPoolExecutor(self.threads) as pool:
+                self._run(values, pool)
+            return values
+        for func, inputs, i, filters in self._steps:
+            values[i] = self._evaluate(
+                func, [values[j] for j in inputs], filters
+            )
+        return values
+
+    def __call__(self, *args):
+        values = self.evaluate(*args)
+        res = [values[i] for i in self._outputs]
+        if any(v is sh.NONE for v in res):
+            raise sh.DispatcherError('The pipe is not respected.')
+        return res[0] if len(res) == 1 else res
+
+    def solution(self, *args):
+        """
+        Evaluates the plan and returns the solution of the dispatcher.
+
+        :param args:
+            Input values.
+        :type args: object
+
+        :return:
+            Solution with the same values and order of the serial dispatch.
+        :rtype: schedula.Solution
+        """
+        values = self.evaluate(*args)
+        dsp = self.dsp if self._parent is None else self._parent
+        sol = dsp.solution.__class__(
+            dsp, dict(zip(self.inputs or (), args)), self.outputs
+        )
+        for k, i in self._data:
+            v = values[i]
+            if k is sh.SELF:
+                v = dsp
+            if v is not sh.NONE:
+                sol[k] = v
+        dsp.solution = sol
+        return sol
+
+
+def _signature(dsp):
+    # The plans freeze the nodes and the default values, which are replaced
+    # (not updated) by the dispatcher's methods.
+    return tuple(dsp.nodes.values()) + tuple(dsp.default_values.values())
+
+
+def calculate(xl_model, inputs=None, outputs=None, threads=None):
+    """
+    Calculates the excel model with the level-parallel evaluation.
+
+    The plans are cached in the model by inputs, outputs, and threads, and
+    they are rebuilt when the nodes or the default values of the model change.
+    Models that are not static (e.g., with circular references) are calculated
+    serially.
+
+    :param xl_model:
+        Excel model.
+    :type xl_model: formulas.excel.ExcelModel
+
+    :param inputs:
+        Input values.
+    :type inputs: dict
+
+    :param outputs:
+        Output nodes.
+    :type outputs: list
+
+    :param threads:
+        Maximum number of threads.
+    :type threads: int
+
+    :return:
+        Solution.
+    :rtype: schedula.Solution
+    """
+    dsp, inputs = xl_model.dsp, inputs or {}
+    plans = xl_model.__dict__.setdefault('_level_plans', {})
+    key = tuple(inputs), outputs and tuple(outputs), threads
+    nodes, plan = plans.get(key, ((), None))
+    signature = _signature(dsp)
+    if len(nodes) != len(signature) or not all(map(
+            operator.is_, nodes, signature)):
+        try:
+            plan = LevelPlan(
+                dsp, dsp.name, list(inputs), outputs, threads=threads
+            )
+        except ValueError:  # Not a static model.
+            plan = None
+        plans[key] = signature, plan
+    if plan is None:
+        return dsp.dispatch(inputs, outputs)
+    return plan.solution(*inputs.values())
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+#
+# Copyright 2016-2022 European Commission (JRC);
+# Licensed under the EUPL (the 'Licence');
+# You may not use this work except in compliance with the Licence.
+# You may obtain a copy of the Licence at: http://ec.europa.eu/idabc/eupl
+
+"""
+It provides the parallel compilation of the cells of a worksheet.
+
+The cells are split in blocks of consecutive cells that are parsed and
+compiled by a pool of processes. The compiled cells are serialized with
+`dill` and added to the dispatcher by the main process in the original order.
+
+Example::
+
+    >>> import formulas
+    >>> xl_model = formulas.ExcelModel().loads(
+    ...     'excel.xlsx', processes=8
+    ... ).finish()  # doctest: +SKIP
+
+.. note:: It requires `dill` (i.e., `pip install formulas[parallel]`).
+
+.. note::
+    The main process still deserializes all the compiled cells, hence the
+    gain depends on the workbook and on the available cores. Compare it with
+    the serial load by `python -m benchmarks -b TimeParallelLoads`.
+"""
+import collections
+import schedula as sh
+from .xlreader import StreamCell
+
+_worker = {}
+
+
+def _init_worker(payload):
+    import dill
+    model_class, context, references = dill.loads(payload)
+    _worker.update(
+        model=model_class(), context=context, references=references
+    )
+
+
+def _compile_block(cells, formula_references):
+    import dill
+    model, ctx, refs = _worker['model'], _worker['context'], \
+                       _worker['references']
+    templates = {}
+    return dill.dumps([sh.await_result(model.compile_cell(
+        c, ctx, refs, formula_references, templates
+    )) for c in cells])
+
+
+def _blocks(cells, formula_references, chunksize):
+    block = []
+    for c in cells:
+        if c.value is None:  # Empty cell.
+            continue
+        block.append(StreamCell(c.coordinate, c.value, c.data_type))
+        if len(block) >= chunksize:
+            yield block, _block_references(block, formula_references)
+            block = []
+    if block:
+        yield block, _block_references(block, formula_references)
+
+
+def _block_references(block, formula_references):
+    return {
+        c.coordinate: formula_references[c.coordinate] for c in block
+        if c.coordinate in formula_references
+    }
+
+
+def compile_cells(model, cells, context, references, formula_references,
+                  processes, chunksize=1000):
+    """
+    Compiles the cells of a worksheet with a pool of processes.
+
+    :param model:
+        Excel model.
+    :type model: formulas.excel.ExcelModel
+
+    :param cells:
+        Worksheet cells (i.e., with `coordinate`, `value`, and `data_type`).
+    :type cells: collections.Iterable
+
+    :param context:
+        Sheet context.
+    :type context: dict
+
+    :param references:
+        Defined names.
+    :type references: dict
+
+    :param formula_references:
+        Array formula references. It can be updated while `cells` are
+        consumed.
+    :type formula_references: dict
+
+    :param processes:
+        Number of worker processes.
+    :type processes: int
+
+    :param chunksize:
+        Number of cells compiled by each task.
+    :type chunksize: int
+
+    :return:
+        Compiled cells, in the input order.
+    :rtype: collections.Iterable[formulas.cell.Cell]
+    """
+    try:
+        import dill
+    except ImportError as ex:
+        raise ImportError(
+            'The parallel compilation requires `dill`, install it with '
+            '`pip install formulas[parallel]`.'
+        ) from ex
+    return _compile_cells(
+        dill.dumps((type(model), context, references)), cells,
+        formula_references, processes, chunksize
+    )
+
+
+def _compile_cells(payload, cells, formula_references, processes, chunksize):
+    import dill
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(
+            processes, initializer=_init_worker, initargs=(payload,)
+    ) as executor:
+        pending = collections.deque()
+        for block, refs in _blocks(cells, formula_references, chunksize):
+            pending.append(executor.submit(_compile_block, block, refs))
+            while len(pending) > 2 * processes:  # Bound the memory.
+                yield from dill.loads(pending.popleft().result())
+        while pending:
+            yield from dill.loads(pending.popleft().result())
@@ -0,0 +1,381 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+#
+# Copyright 2016-2022 European Commission (JRC);
+# Licensed under the EUPL (the 'Licence');
+# You may not use this work except in compliance with the Licence.
+# You may obtain a copy of the Licence at: http://ec.europa.eu/idabc/eupl
+
+"""
+It provides a static execution plan to evaluate compiled excel models.
+"""
+import copy
+import functools
+import numpy as np
+import schedula as sh
+from ..ranges import Ranges, _shape
+from ..cell import CellWrapper, format_output
+
+
+class _Solution:
+    __slots__ = 'slots', 'values'
+
+    def __init__(self, slots, values):
+        self.slots, self.values = slots, values
+
+    @property
+    def solution(self):
+        return self
+
+    def __contains__(self, key):
+        i = self.slots.get(key)
+        return i is not None and self.values[i] is not sh.NONE
+
+    def __getitem__(self, key):
+        return self.values[self.slots[key]]
+
+
+def _apply_filters(filters, value):
+    for f in filters:
+        value = f(value)
+    return value
+
+
+def _is_elementwise(func):
+    return func is sh.bypass or getattr(func, 'elementwise', False)
+
+
+def _is_reentrant(func):
+    if isinstance(func, CellWrapper):
+        func = func.func
+    if isinstance(func, ExecutionPlan):
+        return func._reentrant
+    # The pipes store the solution of the last call.
+    return not isinstance(func, sh.SubDispatch) and getattr(
+        func, 'reentrant', True
+    )
+
+
+def _get_item(index, value):
+    return value[index]
+
+
+def _is_cell_filters(filters):
+    return all(
+        isinstance(f, functools.partial) and f.func is format_output and
+        _shape(f.args[0]) == (1, 1) for f in filters
+    )
+
+
+def _vector_map(func):
+    cell = getattr(getattr(func, 'parse_args', None), '__self__', None)
+    plan, rng = getattr(func, 'func', None), getattr(cell, 'range', None)
+    if not (isinstance(plan, ExecutionPlan) and plan._elementwise and rng):
+        return None
+    if _shape(rng.ranges[0]) != (1, 1):
+        return None
+    links = {}
+    for i, keys in enumerate(cell.inputs.values()):
+        for k in keys:
+            links.setdefault(k, []).append(i)
+    res = []
+    for k, rng in plan.inputs.items():
+        if len(links.get(k, ())) != 1 or not isinstance(rng, Ranges) or \
+                len(rng.ranges) != 1 or _shape(rng.ranges[0]) != (1, 1):
+            return None
+        res.append(links[k][0])
+    return tuple(res)
+
+
+def _stack(values):
+    values = [
+        np.asarray(v.value if isinstance(v, Ranges) else [[v]], object)
+        for v in values
+    ]
+    try:
+        return np.stack(values)
+    except ValueError:  # Different shapes.
+        res = np.empty(len(values), object)
+        res[:] = values
+        return res
+
+
+class _Scenarios:
+    def __init__(self, n, values):
+        self.n, self.values, self.filters = n, values, {}
+        self.vectors, self.lists = {}, {}
+
+    def is_batch(self, i):
+        return i in self.vectors or i in self.lists
+
+    def vector(self, i):
+        if i in self.vectors:
+            return self.vectors[i]
+        values = self.lists.get(i, (self.values[i],))
+        if not all(isinstance(v, Ranges) and v.value.shape == (1, 1)
+                   for v in values):
+            return None
+        values = np.asarray([v.value[0, 0] for v in values], object)
+        if i in self.lists:
+            self.vectors[i] = values
+        return values
+
+    def list(self, i):
+        if i not in self.lists:
+            f = self.filters.get(i, ())
+            self.lists[i] = [
+                _apply_filters(f, np.asarray([[v]], object))
+                for v in self.vectors[i]
+            ]
+        return self.lists[i]
+
+    def item(self, i, s):
+        return self.list(i)[s] if self.is_batch(i) else self.values[i]
+
+    def output(self, i):
+        if i in self.vectors:
+            return self.vectors[i].reshape(self.n, 1, 1)
+        elif i in self.lists:
+            return _stack(self.lists[i])
+        return _stack([self.values[i]] * self.n)
+
+
+class _Scenario:
+    __slots__ = 'scenarios', 'index'
+
+    def __init__(self, scenarios, index):
+        self.scenarios, self.index = scenarios, index
+
+    def __getitem__(self, i):
+        return self.scenarios.item(i, self.index)
+
+
+class ExecutionPlan:
+    """
+    It converts a :class:`~schedula.dispatcher.Dispatcher` into a flat list of
+    steps that are executed over a preallocated array of slots.
+
+    It has the same signature of :class:`~schedula.utils.dsp.DispatchPipe`, so
+    it can be used as `ExcelModel.compile_class`. The dispatch order is
+    resolved once at compile time and the compiled formulas of the cells are
+    inlined, hence the call does not involve any dispatch.
+
+    .. note::
+        The plan does not support sub-dispatchers. The results of the
+        functions with multiple outputs are split by item steps.
+    """
+
+    def __init__(self, dsp, function_id=None, inputs=None, outputs=None,
+                 **kwargs):
+        self._compile(sh.DispatchPipe(
+            dsp, function_id, inputs, outputs, **kwargs
+        ))
+
+    @classmethod
+    def from_pipe(cls, pipe, memo=None):
+        """
+        Builds the execution plan of a compiled dispatch pipe.
+
+        :param pipe:
+            Dispatch pipe.
+        :type pipe: schedula.utils.dsp.DispatchPipe
+
+        :param memo:
+            Plans already compiled, used to inline the cell functions.
+        :type memo: dict
+
+        :return:
+            Execution plan.
+        :rtype: ExecutionPlan
+        """
+        plan = cls.__new__(cls)
+        plan._compile(pipe, memo)
+        return plan
+
+    def _inline(self, func, memo):
+        if isinstance(func, CellWrapper):
+            pipe = func.func
+            if isinstance(pipe, sh.DispatchPipe):
+                if id(pipe) not in memo:
+                    try:
+                        memo[id(pipe)] = self.from_pipe(pipe, memo)
+                    except ValueError:  # Not a static pipe.
+                        memo[id(pipe)] = pipe
+                func = copy.copy(func)
+                func.func = memo[id(pipe)]
+        return func
+
+    def _compile(self, pipe, memo=None):
+        memo = {} if memo is None else memo
+        self.__name__ = pipe.__name__
+        self.dsp, self.inputs, self.outputs = pipe.dsp, pipe.inputs, \
+                                              pipe.outputs
+        sol, nodes, defaults = pipe._sol, self.dsp.nodes, \
+                               self.dsp.default_values
+        slots, values, steps, funcs = {}, [], [], {}
+        self._self = None
+
+        def _slot(key):
+            if key not in slots:
+                slots[key] = len(values)
+                values.append(sh.NONE)
+            return slots[key]
+
+        inputs = [_slot(k) for k in self.inputs or ()]
+        for (_, _, (node_id, s)), _, nxt_dsp in pipe.pipe:
+            node = nodes[node_id]
+            if s is not sol or nxt_dsp or node['type'] not in (
+                    'data', 'function'):
+                raise ValueError('Sub-dispatchers are not supported.')
+            if node['type'] == 'function':
+                funcs[node_id] = step = [
+                    self._inline(node['function'], memo),
+                    tuple(
+                        _slot(k) for k in node['inputs'] if k is not sh.START
+                    ), None,
+                    tuple(node.get('filters', ()))
+                ]
+                if len(node['outputs']) != 1:  # Results split by items.
+                    step[2] = _slot((node_id,))
+                steps.append(step)
+                continue
+            if 'function' in node or node.get('wait_inputs'):
+                raise ValueError('Data node functions are not supported.')
+            pred, i = tuple(sol.workflow.pred[node_id]), _slot(node_id)
+            filters = tuple(node.get('filters', ()))
+            if pred == (sh.START,):
+                if i in inputs:
+                    inputs[inputs.index(i)] = i, filters
+                elif node_id is sh.SELF:
+                    self._self = i
+                else:
+                    values[i] = _apply_filters(
+                        filters, defaults[node_id]['value']
+                    )
+            elif len(pred) == 1 and pred[0] in funcs:
+                step, outputs = funcs[pred[0]], nodes[pred[0]]['outputs']
+                if len(outputs) != 1:
+                    steps.append([functools.partial(
+                        _get_item, outputs.index(node_id)
+                    ), (step[2],), i, filters])
+                else:
+                    step[2], step[3] = i, step[3] + filters
+            else:
+                raise ValueError('Ambiguous estimation of `%s`.' % node_id)
+        self._inputs = [i if isinstance(i, tuple) else (i, ()) for i in inputs]
+        self._steps = tuple(tuple(s) for s in steps if s[2] is not None)
+        self._slots, self._values = slots, values
+        self._outputs = tuple(map(_slot, self.outputs or ()))
+        self._elementwise = len(self._outputs) == 1 and all(
+            _is_elementwise(s[0]) for s in self._steps
+        )
+        self._reentrant = all(_is_reentrant(s[0]) for s in self._steps)
+        self._vector_maps = tuple(_vector_map(s[0]) for s in self._steps)
+
+    def _evaluate(self, func, args, filters):
+        try:
+            v = func(*args)
+            for f in filters:
+                v = f(v)
+            return v
+        except sh.DispatcherError as ex:
+            raise ex
+        except Exception as ex:
+            raise sh.DispatcherError(
+                'Failed DISPATCHING of `%s`.' % self.__name__, ex=ex
+            )
+
+    def __call__(self, *args):
+        if len(args) != len(self._inputs):
+            raise TypeError('%s() takes %d positional arguments but %d were '
+                            'given' % (self.__name__, len(self._inputs),
+                                       len(args)))
+        values = self._values.copy()
+        for (i, filters), v in zip(self._inputs, args):
+            values[i] = _apply_filters(filters, v)
+        if self._self is not None:
+            values[self._self] = _Solution(self._slots, values)
+        for func, inputs, i, filters in self._steps:
+            values[i] = self._evaluate(
+                func, [values[j] for j in inputs], filters
+            )
+        res = [values[i] for i in self._outputs]
+        if any(v is sh.NONE for v in res):
+            raise sh.DispatcherError('The pipe is not respected.')
+        return res[0] if len(res) == 1 else res
+
+    def batch(self, *args):
+        """
+        Evaluates the plan over many scenarios at once.
+
+        The cells made only of element-wise functions (e.g., operators and
+        math functions) are evaluated once with NumPy broadcasting across the
+        scenarios, while the others are evaluated per scenario.
+
+        :param args:
+            Input values. Sequences (e.g., 1-D arrays) of N values are
+            scenarios, scalars are shared by all scenarios.
+        :type args: list | numpy.ndarray | object
+
+        :return:
+            Output values with a leading scenario axis, i.e. arrays of shape
+            (N, rows, cols).
+        :rtype: numpy.ndarray | list[numpy.ndarray]
+        """
+        if len(args) != len(self._inputs):
+            raise TypeError('%s() takes %d positional arguments but %d were '
+                            'given' % (self.__name__, len(self._inputs),
+                                       len(args)))
+        sizes = {len(v) for v in args if np.ndim(v)}
+        if len(sizes) > 1:
+            raise ValueError('Inconsistent number of scenarios.')
+        values = self._values.copy()
+        sc = _Scenarios(sizes.pop() if sizes else 1, values)
+        for (i, filters), v in zip(self._inputs, args):
+            if not np.ndim(v):
+                values[i] = _apply_filters(filters, v)
+            elif np.ndim(v) == 1 and _is_cell_filters(filters):
+                sc.vectors[i], sc.filters[i] = np.asarray(v, object), filters
+            else:
+                sc.lists[i] = [_apply_filters(filters, x) for x in v]
+        batch = sc.is_batch
+        if self._self is not None:
+            batch = lambda j: j == self._self or sc.is_batch(j)
+        it = zip(self._steps, self._vector_maps)
+        for (func, inputs, i, filters), vector_map in it:
+            if not any(map(batch, inputs)):
+                values[i] = self._evaluate(
+                    func, [values[j] for j in inputs], filters
+                )
+                continue
+            sc.filters[i] = filters
+            if vector_map is not None:
+                res = self._vectorize(sc, func.func, inputs, vector_map)
+                if res is not None:
+                    sc.vectors[i] = res
+                    continue
+            res = sc.lists[i] = []
+            for s in range(sc.n):
+                if self._self is not None:
+                    values[self._self] = _Solution(
+                        self._slots, _Scenario(sc, s)
+                    )
+                res.append(self._evaluate(
+                    func, [sc.item(j, s) for j in inputs], filters
+                ))
+        res = [sc.output(i) for i in self._outputs]
+        return res[0] if len(res) == 1 else res
+
+    @staticmethod
+    def _vectorize(scenarios, func, inputs, vector_map):
+        args = [scenarios.vector(inputs[i]) for i in vector_map]
+        if any(v is None for v in args):
+            return None
+        try:
+            with np.errstate(all='ignore'):
+                res = np.asarray(func(*(v.reshape(-1, 1) for v in args)))
+        except sh.DispatcherError:  # Evaluate per scenario.
+            return None
+        if res.shape != (scenarios.n, 1):
+            return None
+        return res[:, 0].astype(object)
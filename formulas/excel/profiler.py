@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+#
+# Copyright 2016-2022 European Commission (JRC);
+# Licensed under the EUPL (the 'Licence');
+# You may not use this work except in compliance with the Licence.
+# You may obtain a copy of the Licence at: http://ec.europa.eu/idabc/eupl
+
+"""
+It provides an opt-in profiler of the model evaluation.
+
+While it is active, the cells, the range assemblers, and the Excel functions
+(i.e., the ones of :func:`~formulas.functions.get_functions`) of the model are
+wrapped to record call counts, cumulative and self times, and output sizes.
+
+Example::
+
+    >>> import formulas
+    >>> from formulas.excel.profiler import Profiler
+    >>> xl_model = formulas.ExcelModel().loads(
+    ...     'excel.xlsx'
+    ... ).finish()  # doctest: +SKIP
+    >>> with Profiler(xl_model) as profiler:
+    ...     xl_model.calculate()  # doctest: +SKIP
+    >>> profiler.report(top=10)  # doctest: +SKIP
+"""
+import json
+import time
+import numpy as np
+import schedula as sh
+from ..ranges import Ranges, _shape
+from ..cell import CellWrapper, RangesAssembler
+from ..functions import get_functions
+
+
+def _sheet(name):
+    return name.rsplit('!', 1)[0] if '!' in name else ''
+
+
+def _size(value):
+    if isinstance(value, Ranges):
+        return sum(int(np.prod(_shape(r))) for r in value.ranges)
+    if isinstance(value, np.ndarray):
+        return int(value.size)
+    return 1
+
+
+class Record:
+    """
+    Statistics of a profiled cell, range, or function.
+    """
+    __slots__ = (
+        'name', 'kind', 'sheet', 'calls', 'cumulative', 'self_time', 'size'
+    )
+
+    def __init__(self, name, kind, sheet=''):
+        self.name, self.kind, self.sheet = name, kind, sheet
+        self.calls, self.cumulative, self.self_time, self.size = 0, .0, .0, 0
+
+    def to_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
+
+class _Probe:
+    def __init__(self, profiler, func, record):
+        self.profiler, self.func, self.record = profiler, func, record
+
+    def __getattr__(self, item):
+        return getattr(self.func, item)
+
+    def __call__(self, *args, **kwargs):
+        return self.profiler._call(self.record, self.func, args, kwargs)
+
+
+class Profiler:
+    """
+    Profiles the evaluation of an excel model.
+
+    It is a context manager, the model is restored on exit. It is not thread
+    safe.
+
+    :param model:
+        Excel model, dispatcher, or dispatch pipe (e.g., the compiled model).
+    :type model: formulas.excel.ExcelModel | schedula.Dispatcher
+    """
+
+    def __init__(self, model):
+        self.dsp = model if isinstance(model, sh.Dispatcher) else model.dsp
+        self.cells, self.functions, self.total = {}, {}, .0
+        self._patched, self._stack = [], []
+
+    def _call(self, record, func, args, kwargs):
+        stack, children = self._stack, [.0]
+        stack.append(children)
+        start = time.perf_counter()
+        try:
+            res = func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            stack.pop()
+            record.calls += 1
+            record.cumulative += elapsed
+            record.self_time += elapsed - children[0]
+            if stack:
+                stack[-1][0] += elapsed
+            else:
+                self.total += elapsed
+        record.size += _size(res)
+        return res
+
+    def _record(self, name, kind):
+        records = self.functions if kind == 'function' else self.cells
+        if name not in records:
+            records[name] = Record(name, kind, _sheet(name))
+        return records[name]
+
+    def start(self):
+        """
+        Wraps the functions of the model.
+
+        :return:
+            Profiler.
+        :rtype: Profiler
+        """
+        functions = {}
+        for k, v in get_functions().items():
+            functions.setdefault(id(v), k)
+        visited, stack = set(), [self.dsp]
+        while stack:
+            dsp = stack.pop()
+            if id(dsp) in visited:
+                continue
+            visited.add(id(dsp))
+            for node in dsp.function_nodes.values():
+                func, record = node['function'], None
+                if isinstance(func, _Probe):
+                    continue
+                if isinstance(func, (CellWrapper, RangesAssembler)):
+                    out = node['outputs'][0]
+                    if not isinstance(out, sh.Token):
+                        record = self._record(out, (
+                            'range' if isinstance(func, RangesAssembler)
+                            else 'cell'
+                        ))
+                elif id(func) in functions:
+                    record = self._record(functions[id(func)], 'function')
+                sub = getattr(getattr(func, 'func', func), 'dsp', None)
+                if isinstance(sub, sh.Dispatcher):
+                    stack.append(sub)
+                if record is not None:
+                    self._patched.append((node, func))
+                    node['function'] = _Probe(self, func, record)
+        return self
+
+    def stop(self):
+        """
+        Restores the functions of the model.
+
+        :return:
+            Profiler.
+        :rtype: Profiler
+        """
+        while self._patched:
+            node, func = self._patched.pop()
+            node['function'] = func
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def report(self, top=None):
+        """
+        Returns the profiling report.
+
+        :param top:
+            Number of cells and functions to report (by cumulative time).
+        :type top: int
+
+        :return:
+            Total time, top cells, top functions, and totals per sheet.
+        :rtype: dict
+        """
+        def _top(records):
+            it = sorted(
+                records.values(), key=lambda r: (-r.cumulative, r.name)
+            )
+            return [r.to_dict() for r in it[:top]]
+
+        sheets = {}
+        for r in self.cells.values():
+            d = sheets.setdefault(r.sheet, {
+                'cells': 0, 'calls': 0, 'cumulative': .0, 'self_time': .0
+            })
+            d['cells'] += 1
+            d['calls'] += r.calls
+            d['cumulative'] += r.cumulative
+            d['self_time'] += r.self_time
+        return {
+            'total': self.total,
+            'cells': _top(self.cells),
+            'functions': _top(self.functions),
+            'sheets': sheets
+        }
+
+    def to_json(self, fpath=None, top=None, **kwargs):
+        """
+        Exports the profiling report to JSON.
+
+        :param fpath:
+            Output file path. If None, the JSON string is returned.
+        :type fpath: str
+
+        :param top:
+            Number of cells and functions to report.
+        :type top: int
+
+        :return:
+            JSON string.
+        :rtype: str
+        """
+        kwargs.setdefault('indent', 2)
+        res = json.dumps(self.report(top), **kwargs)
+        if fpath is not None:
+            with open(fpath, 'w') as f:
+                f.write(res)
+        return res
@@ -0,0 +1,254 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+#
+# Copyright 2016-2022 European Commission (JRC);
+# Licensed under the EUPL (the 'Licence');
+# You may not use this work except in compliance with the Licence.
+# You may obtain a copy of the Licence at: http://ec.europa.eu/idabc/eupl
+
+"""
+It provides a generator of synthetic workbooks for scale testing.
+
+The workbooks reproduce the common shapes of production models: copied-down
+formulas with a running balance, lookup tables, cross-sheet references,
+full-column aggregates, circular blocks, and external links. They are
+deterministic by seed and can be emitted as xlsx files or as dictionaries for
+:meth:`~formulas.excel.ExcelModel.from_dict`.
+
+Example::
+
+    >>> import formulas
+    >>> from formulas.excel.synthetic import SyntheticWorkbook
+    >>> wb = SyntheticWorkbook(rows=10, sheets=2, seed=1)
+    >>> xl_model = formulas.ExcelModel().from_dict(wb.to_dict())
+    >>> xl_model.finish(complete=False).calculate()  # doctest: +SKIP
+    >>> fpath = wb.write('.')  # doctest: +SKIP
+"""
+import random
+import os.path as osp
+from ..tokens.operand import _index2col
+
+
+class SyntheticWorkbook:
+    """
+    Synthetic workbook.
+
+    The sheets `DATA1`, ..., `DATA<sheets>` have the columns:
+
+    - A: random values,
+    - B: arithmetic on A,
+    - C: running balance of B,
+    - D: lookup on the sheet `TABLE` (if `lookup_rows`),
+    - E: reference to the previous data sheet (from `DATA2`),
+    - F: reference to the external workbook (`DATA1`, if `external_rows`).
+
+    The sheet `SUMMARY` has full-column aggregates of each data sheet and the
+    sheet `CIRCULAR` has blocks of two cells that refer each other.
+
+    :param rows:
+        Number of rows of each data sheet.
+    :type rows: int
+
+    :param sheets:
+        Number of data sheets.
+    :type sheets: int
+
+    :param lookup_rows:
+        Number of rows of the lookup table.
+    :type lookup_rows: int
+
+    :param aggregates:
+        Add the sheet of full-column aggregates?
+    :type aggregates: bool
+
+    :param circular:
+        Number of circular blocks (see `circular` and `iterative` of
+        :meth:`~formulas.excel.ExcelModel.finish`).
+    :type circular: int
+
+    :param external_rows:
+        Number of rows of the external workbook.
+    :type external_rows: int
+
+    :param seed:
+        Seed of the random values.
+    :type seed: int
+
+    :param name:
+        Name of the workbook file (without extension).
+    :type name: str
+    """
+
+    def __init__(self, rows=1000, sheets=1, lookup_rows=50, aggregates=True,
+                 circular=0, external_rows=0, seed=0, name='synthetic'):
+        self.rows, self.sheets, self.lookup_rows = rows, sheets, lookup_rows
+        self.aggregates, self.circular = aggregates, circular
+        self.external_rows, self.seed, self.name = external_rows, seed, name
+
+    @property
+    def filename(self):
+        return '%s.xlsx' % self.name
+
+    @property
+    def external_filename(self):
+        return '%s-ext.xlsx' % self.name
+
+    def _data(self, k, rnd):
+        rows, lookup, ext = self.rows, self.lookup_rows, self.external_rows
+        for i in range(1, rows + 1):
+            row = [
+                rnd.randint(0, 999), '={S}A%d*2+1' % i,
+                '={S}C%d+{S}B%d' % (i - 1, i) if i > 1 else '={S}B1', None,
+                None, None
+            ]
+            if lookup:
+                row[3] = '=VLOOKUP(MOD({S}A%d,%d)+1,{TABLE}$A$1:$B$%d,2,' \
+                         'FALSE)' % (i, lookup, lookup)
+            if k > 1:
+                row[4] = '={DATA%d}C%d+{S}B%d' % (k - 1, i, i)
+            elif ext:
+                row[5] = '={EXT}A%d*{S}A%d' % ((i - 1) % ext + 1, i)
+            yield row
+
+    def books(self):
+        """
+        Returns the workbooks with the formula templates.
+
+        The formulas refer to the sheets with placeholders (e.g., `{S}` is the
+        own sheet and `{TABLE}` the lookup table, see :meth:`prefixes`).
+
+        :return:
+            Rows of each sheet of each workbook.
+        :rtype: dict[str, dict[str, list]]
+        """
+        rnd, book = random.Random(self.seed), {}
+        for k in range(1, self.sheets + 1):
+            book['DATA%d' % k] = list(self._data(k, rnd))
+        if self.lookup_rows:
+            book['TABLE'] = [
+                [j, rnd.randint(0, 999)]
+                for j in range(1, self.lookup_rows + 1)
+            ]
+        if self.aggregates:
+            book['SUMMARY'] = [[
+                '=SUM({DATA%d}C:C)' % k,
+                '=SUMIF({DATA%d}A:A,">500",{DATA%d}B:B)' % (k, k),
+                '=COUNTIF({DATA%d}A:A,"<100")' % k,
+                '=AVERAGE({DATA%d}B:B)' % k,
+                '=MAX({DATA%d}D:D)' % k if self.lookup_rows else None
+            ] for k in range(1, self.sheets + 1)]
+        if self.circular:
+            book['CIRCULAR'] = [
+                ['={S}B%d/2+%d' % (j, rnd.randint(1, 99)), '={S}A%d/2' % j]
+                for j in range(1, self.circular + 1)
+            ]
+        books = {self.filename: book}
+        if self.external_rows:
+            books[self.external_filename] = {'DATA': [
+                [rnd.randint(0, 999)] for _ in range(self.external_rows)
+            ]}
+        return books
+
+    def prefixes(self, filename, sheet, qualified=False):
+        """
+        Returns the reference prefixes of the placeholders.
+
+        :param filename:
+            Workbook of the formula.
+        :type filename: str
+
+        :param sheet:
+            Sheet of the formula.
+        :type sheet: str
+
+        :param qualified:
+            Qualify also the references to the own workbook?
+        :type qualified: bool
+
+        :return:
+            Reference prefix of each placeholder.
+        :rtype: dict
+        """
+        names = ['TABLE'] + ['DATA%d' % k for k in range(1, self.sheets + 1)]
+        if qualified:
+            res = {k: "'[%s]%s'!" % (filename, k) for k in names}
+            res['S'] = "'[%s]%s'!" % (filename, sheet)
+        else:
+            res = {k: '%s!' % k for k in names}
+            res['S'] = ''
+        res['EXT'] = "'[%s]DATA'!" % self.external_filename
+        return res
+
+    def cells(self, qualified=False):
+        """
+        Yields the cells of the workbooks.
+
+        :param qualified:
+            Qualify all references (i.e., as for `from_dict`)?
+        :type qualified: bool
+
+        :return:
+            Workbook, sheet, row index, and row values.
+        :rtype: collections.Iterable[tuple]
+        """
+        for filename, book in self.books().items():
+            for sheet, rows in book.items():
+                prefixes = self.prefixes(filename, sheet, qualified)
+                for i, row in enumerate(rows, 1):
+                    yield filename, sheet, i, [
+                        v.format(**prefixes) if isinstance(v, str) else v
+                        for v in row
+                    ]
+
+    def to_dict(self):
+        """
+        Returns the workbooks as input of
+        :meth:`~formulas.excel.ExcelModel.from_dict`.
+
+        :return:
+            Cell values and formulas.
+        :rtype: dict
+        """
+        res = {}
+        for filename, sheet, i, row in self.cells(qualified=True):
+            for j, v in enumerate(row, 1):
+                if v is not None:
+                    ref = "'[%s]%s'!%s%d" % (filename, sheet, _index2col(j), i)
+                    res[ref] = v
+        return res
+
+    def write(self, dirpath):
+        """
+        Writes the workbooks as xlsx files.
+
+        :param dirpath:
+            Output directory.
+        :type dirpath: str
+
+        :return:
+            File path of the main workbook.
+        :rtype: str
+        """
+        import openpyxl
+        books = {}
+        for filename, sheet, i, row in self.cells():
+            if filename not in books:
+                books[filename] = openpyxl.Workbook(write_only=True)
+            wb = books[filename]
+            if sheet not in wb.sheetnames:
+                wb.create_sheet(sheet)
+            wb[sheet].append(row)
+        for filename, wb in books.items():
+            wb.save(osp.join(dirpath, filename))
+        return osp.join(dirpath, self.filename)
+
+    @property
+    def n_cells(self):
+        """
+        Number of non-empty cells.
+
+        :rtype: int
+        """
+        return sum(
+            sum(v is not None for v in row) for *_, row in self.cells()
+        )
@@ -9,7 +9,17 @@
 """
 It provides a custom Excel Reader class.
 """
+import logging
+import collections
 from openpyxl.reader.excel import ExcelReader
+from openpyxl.utils.cell import get_column_letter
+
+log = logging.getLogger(__name__)
+
+#: Lightweight cell yielded by :func:`iter_cells`.
+StreamCell = collections.namedtuple(
+    'StreamCell', ('coordinate', 'value', 'data_type')
+)
 
 
 class XlReader(ExcelReader):
@@ -28,3 +38,68 @@ def load_workbook(filename, **kw):
     reader = XlReader(filename, **kw)
     reader.read()
     return reader.wb
+
+
+def _iter_rows(worksheet):
+    log.warning(
+        'The openpyxl parser is not available, the array formulas of the '
+        'sheet `%s` are read as single cell formulas.', worksheet.title
+    )
+    for row in worksheet.iter_rows():
+        for c in row:
+            if getattr(c, 'value', None) is not None:
+                yield StreamCell(c.coordinate, c.value, c.data_type)
+
+
+def iter_cells(worksheet, formula_attributes=None):
+    """
+    Streams the non-empty cells of a read-only worksheet.
+
+    The sheet xml is parsed incrementally, hence only the current row is kept
+    in memory.
+
+    .. note::
+        The parser is a private API of openpyxl. If it is not available, the
+        cells are read with `worksheet.iter_rows()` and the attributes of the
+        array formulas are not collected.
+
+    :param worksheet:
+        Read-only worksheet.
+    :type worksheet: openpyxl.worksheet._read_only.ReadOnlyWorksheet
+
+    :param formula_attributes:
+        Where to collect the attributes of the array formulas, updated as the
+        rows are parsed.
+    :type formula_attributes: dict
+
+    :return:
+        Non-empty cells.
+    :rtype: collections.Iterable[StreamCell]
+    """
+    try:
+        from openpyxl.worksheet._reader import WorkSheetParser
+        wb, src = worksheet.parent, worksheet._get_source()
+    except (ImportError, AttributeError):
+        yield from _iter_rows(worksheet)
+        return
+    try:
+        parser = WorkSheetParser(
+            src, worksheet._shared_strings, data_only=wb.data_only,
+            epoch=wb.epoch, date_formats=wb._date_formats
+        )
+    except (AttributeError, TypeError):
+        src.close()
+        yield from _iter_rows(worksheet)
+        return
+    if formula_attributes is not None:
+        parser.array_formulae = formula_attributes
+    try:
+        for _, row in parser.parse():
+            for c in row:
+                if c['value'] is not None:
+                    yield StreamCell(
+                        '%s%d' % (get_column_letter(c['column']), c['row']),
+                        c['value'], c['data_type']
+                    )
+    finally:
+        src.close()
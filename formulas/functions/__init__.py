@@ -34,6 +34,8 @@ import re
 import copy
 import importlib
 import functools
+import weakref
+import threading
 import collections
 import numpy as np
 import schedula as sh
@@ -59,6 +61,10 @@ class Array(np.ndarray):
 
     _collapse_value = None
 
+    _full_shape = None  # Shape including the implicit tail.
+
+    _tail = sh.EMPTY  # Value of the implicit tail.
+
     def reshape(self, shape, *shapes, order='C'):
         try:
             # noinspection PyArgumentList
@@ -81,7 +87,9 @@ class Array(np.ndarray):
         reduce = super(Array, self).__reduce__()  # Get the parent's __reduce__.
         state = {
             '_collapse_value': self._collapse_value,
-            '_default': self._default
+            '_default': self._default,
+            '_full_shape': self._full_shape,
+            '_tail': self._tail
         },  # Additional state params to pass to __setstate__.
         return reduce[0], reduce[1], reduce[2] + state
 
@@ -95,12 +103,126 @@ class Array(np.ndarray):
         obj._collapse_value = copy.deepcopy(self._collapse_value, memo)
         # noinspection PyArgumentList
         obj._default = copy.deepcopy(self._default, memo)
+        obj._full_shape = self._full_shape
+        obj._tail = self._tail
         return obj
 
     def __hash__(self):
         return hash(self.tolist())
 
 
+def full_shape(value):
+    """
+    Returns the shape of a value including the implicit empty tail of the
+    full-column and full-row ranges, that are bounded by the used range.
+
+    :param value:
+        Value.
+    :type value: Array | object
+
+    :return:
+        Shape.
+    :rtype: tuple[int]
+    """
+    return getattr(value, '_full_shape', None) or np.shape(value)
+
+
+def empty_tail(value):
+    """
+    Returns the number of implicit empty cells of a value.
+
+    :param value:
+        Value.
+    :type value: Array | object
+
+    :return:
+        Number of implicit empty cells.
+    :rtype: int
+    """
+    return int(np.prod(full_shape(value))) - np.size(value)
+
+
+def pad_empty(value, shape):
+    """
+    Pads a value with empty cells up to the given shape.
+
+    :param value:
+        Value (2D).
+    :type value: numpy.ndarray
+
+    :param shape:
+        Output shape.
+    :type shape: tuple[int]
+
+    :return:
+        Padded value.
+    :rtype: Array
+    """
+    res = np.empty(shape, object).view(Array)
+    res[:, :] = sh.EMPTY
+    r, c = np.shape(value)
+    res[:r, :c] = value
+    return res
+
+
+def align_empty_tails(values):
+    """
+    Pads the values of the same full shape (see :func:`full_shape`) to their
+    common bounded shape (e.g., full-column ranges of different sheets) with
+    their implicit tails.
+
+    :param values:
+        Values.
+    :type values: collections.Iterable
+
+    :return:
+        Aligned values.
+    :rtype: list
+    """
+    values = list(values)
+    if not any(getattr(v, '_full_shape', None) for v in values):
+        return values
+    groups = {}
+    for i, v in enumerate(values):
+        if isinstance(v, np.ndarray) and v.ndim == 2:
+            groups.setdefault(full_shape(v), []).append(i)
+    for shape, ids in groups.items():
+        bounds = tuple(map(int, np.max([values[i].shape for i in ids], 0)))
+        for i in ids:
+            if values[i].shape != bounds:
+                values[i] = _pad_tail(values[i], bounds)
+    return values
+
+
+def _pad_tail(value, shape):
+    tail = getattr(value, '_tail', sh.EMPTY)
+    res = np.empty(shape, object).view(Array)
+    res[:, :] = tail
+    r, c = value.shape
+    res[:r, :c] = value
+    if shape != value._full_shape:
+        res._full_shape, res._tail = value._full_shape, tail
+    return res
+
+
+def expand_tail(value):
+    """
+    Returns the value with its implicit tail, if it is not empty (e.g., the
+    result of `A:A=B:B`).
+
+    :param value:
+        Value.
+    :type value: Array | object
+
+    :return:
+        Value with an implicit empty tail, if any.
+    :rtype: Array | object
+    """
+    if getattr(value, '_tail', sh.EMPTY) is sh.EMPTY:
+        return value
+    return _pad_tail(value, value._full_shape)
+
+
 # noinspection PyUnusedLocal
 def not_implemented(*args, **kwargs):
     raise NotImplementedError
@@ -115,6 +237,20 @@ def replace_empty(x, empty=0):
     return x
 
 
+def static_value(value):
+    """
+    Returns the scalar value of a compile-time constant, or `sh.NONE` if it is
+    not known or not a scalar.
+    """
+    if isinstance(value, np.ndarray):
+        if value.size != 1:
+            return sh.NONE
+        value = value.ravel().tolist()[0]
+    if isinstance(value, (bool, int, float, str, np.number, np.bool_)):
+        return value
+    return sh.NONE
+
+
 def is_not_empty(v):
     return v is not sh.EMPTY
 
@@ -147,9 +283,13 @@ def wrap_func(func, ranges=False):
 
 
 def wrap_ranges_func(func, n_out=1):
+    # The element-wise functions evaluate the implicit tails.
+    parse = _ranges_values if getattr(func, 'elementwise', False) else \
+        parse_ranges
+
     def wrapper(*args, **kwargs):
         try:
-            args, kwargs = parse_ranges(*args, **kwargs)
+            args, kwargs = parse(*args, **kwargs)
             return func(*args, **kwargs)
         except RangeValueError:
             return sh.bypass(*((sh.NONE,) * n_out))
@@ -157,11 +297,16 @@ def wrap_ranges_func(func, n_out=1):
     return functools.update_wrapper(wrapper, func)
 
 
-def parse_ranges(*args, **kw):
+def _ranges_values(*args, **kw):
     from ..ranges import Ranges
     args = tuple(v.value if isinstance(v, Ranges) else v for v in args)
     kw = {k: v.value if isinstance(v, Ranges) else v for k, v in kw.items()}
-    return args, kw
+    return tuple(align_empty_tails(args)), kw
+
+
+def parse_ranges(*args, **kw):
+    args, kw = _ranges_values(*args, **kw)
+    return tuple(map(expand_tail, args)), kw
 
 
 SUBMODULES = [
@@ -261,11 +406,90 @@ def _get_single_args(*args):
 
 
 _re_condition = re.compile('(?<!~)[?*]')
+class _Indexes(dict):
+    # The shared indexes are not pickled (e.g., with the module's state).
+    def __reduce__(self):
+        return self.__class__, ()
+
+
+_INDEXES, _INDEXES_LOCK = _Indexes(), threading.Lock()
+
+
+def _memory_owner(array):
+    return array if array.base is None else array.base
+
+
+def _drop_indexes(ref, key):
+    with _INDEXES_LOCK:
+        if _INDEXES.get(key, (None,))[0] is ref:
+            del _INDEXES[key]
+
+
+def share_indexes(array):
+    """
+    Shares the indexes of an array that is not modified anymore (e.g., the
+    value of a `Ranges`) among all the functions that read it or its views.
+
+    Each call starts a new version of the indexes of the array memory (i.e.,
+    the previous indexes are discarded). The memory is referenced weakly,
+    hence the indexes are dropped with it.
+
+    :param array:
+        Shared array.
+    :type array: numpy.ndarray
+    """
+    owner = _memory_owner(array)
+    if not isinstance(owner, np.ndarray):  # Foreign memory (e.g., bytes).
+        return
+    key = id(owner)
+    ref = weakref.ref(owner, lambda r: _drop_indexes(r, key))
+    with _INDEXES_LOCK:
+        _INDEXES[key] = ref, {}
+
+
+def get_index(factory, array):
+    """
+    Returns the index of an array built by a factory.
 
+    The indexes of the arrays shared by :func:`share_indexes` (i.e., the
+    values of `Ranges`) are cached by the version of their memory and by the
+    view (i.e., offset, shape, strides, and dtype), hence all the formulas
+    that refer to the same range share the same index. The indexes of other
+    arrays are built on each call.
 
-def _xfilter(accumulator, test_range, condition, operating_range):
+    .. note:: The indexes must not refer to the array (e.g., they copy its
+       values), otherwise its memory is never released.
+
+    :param factory:
+        Index factory.
+    :type factory: callable
+
+    :param array:
+        Indexed array.
+    :type array: numpy.ndarray | object
+
+    :return:
+        Index of the array.
+    :rtype: object
+    """
+    if not isinstance(array, np.ndarray):
+        return factory(array)
+    owner = _memory_owner(array)
+    ref, indexes = _INDEXES.get(id(owner), (None, None))
+    if ref is None or ref() is not owner:
+        return factory(array)
+    key = factory, np.byte_bounds(array)[0] - np.byte_bounds(owner)[0], \
+        array.shape, array.strides, array.dtype.str
+    try:
+        return indexes[key]
+    except KeyError:
+        return indexes.setdefault(key, factory(array))
+
+
+@functools.lru_cache(1024)
+def _compile_criteria(condition_type, condition):
     from .operators import LOGIC_OPERATORS
-    operator, operating_range = '=', np.asarray(operating_range)
+    operator = '='
     if isinstance(condition, str):
         for k in LOGIC_OPERATORS:
             if condition.startswith(k) and condition != k:
@@ -279,12 +503,7 @@ def _xfilter(accumulator, test_range, condition, operating_range):
                     map(_, _re_condition.split(condition)),
                     tuple(map(lambda v: '.%s' % v, it)) + ('',)
                 ), ()))).match
-                f = lambda v: isinstance(v, str) and bool(match(v))
-                b = np.vectorize(f, otypes=[bool])(test_range['raw'])
-                try:
-                    return accumulator(operating_range[b])
-                except FoundError as ex:
-                    return ex.err
+                return 'raw', lambda v: isinstance(v, str) and bool(match(v))
             elif any(v in condition for v in ('~?', '~*')):
                 condition = condition.replace('~?', '?').replace('~*', '*')
         from ..tokens.operand import Number, Error
@@ -303,31 +522,138 @@ def _xfilter(accumulator, test_range, condition, operating_range):
     from .operators import _get_type_id
     type_id, operator = _get_type_id(condition), LOGIC_OPERATORS[operator]
 
-    @functools.lru_cache()
     def check(value):
         return _get_type_id(value) == type_id and operator(value, condition)
 
-    if is_number(condition):
-        if 'num' not in test_range:
-            test_range['num'] = text2num(test_range['raw'])
-        b = np.vectorize(check, otypes=[bool])(test_range['num'])
-    else:
-        b = np.vectorize(check, otypes=[bool])(test_range['raw'])
-    try:
-        return accumulator(operating_range[b])
-    except FoundError as ex:
-        return ex.err
-
+    return 'num' if is_number(condition) else 'raw', check
+
+
+def compile_criteria(condition):
+    """
+    Compiles an Excel criteria (e.g., `">=5"`, `"a*"`, or `3`).
+
+    :param condition:
+        Criteria.
+    :type condition: object
+
+    :return:
+        Test range column (i.e., `raw` or `num`) and predicate of its values.
+    :rtype: (str, callable)
+    """
+    return _compile_criteria(type(condition), condition)
+
+
+class CriteriaIndex:
+    """
+    Grouping index of a test range, shared by all the criteria on the range.
+
+    The cells are grouped by value, hence each criteria is evaluated once per
+    distinct value and its boolean mask is cached.
+    """
+
+    def __init__(self, test_range, maxsize=128):
+        self.shape = np.shape(test_range)
+        self.raw = np.ravel(replace_empty(test_range, '')).copy()
+        self.maxsize, self._groups = maxsize, {}
+        self._masks = collections.OrderedDict()
+
+    def _get_groups(self, column):
+        if column not in self._groups:
+            values, groups = self.raw, {}
+            if column == 'num':
+                values = text2num(values)
+            for i, v in enumerate(values):
+                groups.setdefault((v.__class__, v), (v, []))[1].append(i)
+            self._groups[column] = [(v, np.asarray(i)) for v, i in
+                                    groups.values()]
+        return self._groups[column]
+
+    def mask(self, condition):
+        """
+        Returns the boolean mask of the test range cells that satisfy the
+        criteria.
+
+        :param condition:
+            Criteria.
+        :type condition: object
+
+        :return:
+            Boolean mask with the shape of the test range.
+        :rtype: numpy.ndarray
+        """
+        criteria = compile_criteria(condition)
+        if criteria in self._masks:
+            self._masks.move_to_end(criteria)
+            return self._masks[criteria]
+        column, check = criteria
+        b = np.zeros(self.raw.size, bool)
+        for v, i in self._get_groups(column):
+            if check(v):
+                b[i] = True
+        b = self._masks[criteria] = b.reshape(self.shape)
+        while len(self._masks) > self.maxsize:
+            self._masks.popitem(last=False)
+        return b
+
+
+def xfilters(accumulator, operating_range, test_range, condition, *args):
+    """
+    Aggregates the cells of the operating range that satisfy all criteria.
+
+    :param accumulator:
+        Aggregation function (e.g., `xsum`).
+    :type accumulator: callable
+
+    :param operating_range:
+        Values to aggregate.
+    :type operating_range: numpy.ndarray
+
+    :param test_range:
+        First test range.
+    :type test_range: numpy.ndarray
+
+    :param condition:
+        First criteria, arrays are evaluated element-wise.
+    :type condition: object
+
+    :param args:
+        Other pairs of test range and criteria.
+    :type args: object
+
+    :return:
+        Aggregated values.
+    :rtype: Array
+    """
+    if len(args) % 2:
+        raise FoundError(err=Error.errors['#VALUE!'])
+    ranges, conditions = (test_range,) + args[::2], (condition,) + args[1::2]
+    shape = full_shape(operating_range)
+    if any(full_shape(r) != shape for r in ranges):
+        raise FoundError(err=Error.errors['#VALUE!'])
+    operating_range, *ranges = align_empty_tails((operating_range,) + ranges)
+    tail = empty_tail(operating_range)
+    operating_range = np.asarray(operating_range)
+    indexes = [get_index(CriteriaIndex, r) for r in ranges]
+
+    def _filter(*values):
+        b = indexes[0].mask(values[0])
+        for index, v in zip(indexes[1:], values[1:]):
+            b = b & index.mask(v)
+        try:
+            res = accumulator(operating_range[b])
+        except FoundError as ex:
+            return ex.err
+        if tail and accumulator is len and all(
+                compile_criteria(v)[1]('') for v in values):
+            res += tail  # Implicit empty cells that satisfy the criteria.
+        return res
 
-_xfilter = np.vectorize(_xfilter, otypes=[object], excluded={0, 1, 3})
+    return np.vectorize(_filter, otypes=[object])(*conditions).view(Array)
 
 
 def xfilter(accumulator, test_range, condition, operating_range=None):
     operating_range = test_range if operating_range is None else operating_range
-    # noinspection PyTypeChecker
-    test_range = {'raw': replace_empty(test_range, '')}
-    res = _xfilter(accumulator, test_range, condition, operating_range)
-    return res.view(Array)
+    return xfilters(accumulator, operating_range, test_range, condition)
 
 
 def flatten(v, check=is_number):
@@ -359,11 +685,81 @@ def convert_noshp(value):
     return value
 
 
+def _parse_floats(*args):
+    return map(float, args)
+
+
+_NUMBER_TYPES = {int, float, np.float64, np.float32, np.int64, np.int32}
+
+
+def _float_array(value):
+    value = np.asarray(value)
+    if value.dtype.kind in 'iuf':
+        return value.astype(float)
+    elif value.dtype == object and _NUMBER_TYPES.issuperset(
+            map(type, value.ravel().tolist())):
+        try:
+            return value.astype(float)
+        except OverflowError:
+            pass
+
+
+def _eval_ufunc(ufunc, safe_eval, args):
+    values = list(map(_float_array, args))
+    if not any(np.ndim(v) for v in args) or any(v is None for v in values):
+        return
+    try:
+        res = np.asarray(ufunc(*values), float)
+        args = np.broadcast_arrays(*(np.asarray(v, object) for v in args))
+    except (ValueError, TypeError, OverflowError):
+        return
+    if res.shape != args[0].shape:
+        return
+    mask, out = ~np.isfinite(res), res.astype(object)
+    if mask.any():  # Evaluate errors element-wise.
+        out[mask] = np.vectorize(safe_eval, otypes=[object])(
+            *(v[mask] for v in args)
+        )
+    return out
+
+
+def _eval_tails(evaluate, args):
+    # Evaluates the implicit tails once, when the other values are scalars,
+    # otherwise they are expanded.
+    tails = [getattr(v, '_full_shape', None) for v in args]
+    if len(set(filter(None, tails))) != 1 or any(
+            np.size(v) != 1 for v, t in zip(args, tails) if not t):
+        return evaluate(*(
+            _pad_tail(v, t) if t else v for v, t in zip(args, tails)
+        ))
+    res, parsed = evaluate(*args)
+    tail = evaluate(*(
+        np.asarray([[v._tail]], object) if t else v
+        for v, t in zip(args, tails)
+    ))[0]
+    res = np.asarray(res, object).view(Array)
+    res._full_shape, res._tail = next(filter(None, tails)), np.ravel(tail)[0]
+    return res, parsed
+
+
 def wrap_ufunc(
-        func, input_parser=lambda *a: map(float, a), check_error=get_error,
+        func, input_parser=_parse_floats, check_error=get_error,
         args_parser=lambda *a: map(replace_empty, a), otype=Array,
-        ranges=False, return_func=lambda res, *args: res, check_nan=True, **kw):
-    """Helps call a numpy universal function (ufunc)."""
+        ranges=False, return_func=lambda res, *args: res, check_nan=True,
+        ufunc=None, **kw):
+    """
+    Helps call a numpy universal function (ufunc).
+
+    When all inputs are numbers, the `ufunc` (default: `func` if it is a
+    :class:`numpy.ufunc`) is called on float64 arrays instead of evaluating
+    `func` element-wise. The non finite results are evaluated element-wise to
+    produce the Excel errors.
+    """
+    if ufunc is None and isinstance(func, np.ufunc):
+        ufunc = func
+    if input_parser is not _parse_floats or check_error is not get_error or \
+            'excluded' in kw:
+        ufunc = None
 
     def safe_eval(*vals):
         try:
@@ -377,17 +773,34 @@ def wrap_ufunc(
         return r
 
     kw['otypes'] = kw.get('otypes', [object])
+    elementwise = not (ranges or 'excluded' in kw)
+
+    def evaluate(*args):
+        args = tuple(args_parser(*args))
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            res = None
+            if ufunc is not None:
+                res = _eval_ufunc(ufunc, safe_eval, args)
+            if res is None:
+                res = np.vectorize(safe_eval, **kw)(*args)
+        return res, args
 
     # noinspection PyUnusedLocal
     def wrapper(*args, **kwargs):
         try:
-            args = tuple(args_parser(*args))
-            with np.errstate(divide='ignore', invalid='ignore'):
-                res = np.vectorize(safe_eval, **kw)(*args)
+            if elementwise and any(
+                    getattr(v, '_full_shape', None) for v in args):
+                res, args = _eval_tails(evaluate, args)
+            else:
+                res, args = evaluate(*args)
+            shape, tail = getattr(res, '_full_shape', None), Array._tail
+            tail = getattr(res, '_tail', tail)
             try:
                 res = res.view(otype)
             except AttributeError:
                 res = np.asarray([[res]], object).view(otype)
+            if shape:  # Implicit tail.
+                res._full_shape, res._tail = shape, tail
             return return_func(res, *args)
         except ValueError as ex:
             try:
@@ -396,13 +809,86 @@ def wrap_ufunc(
                 raise BroadcastError()
             raise ex
 
-    return wrap_func(functools.update_wrapper(wrapper, func), ranges=ranges)
+    wrapper = functools.update_wrapper(wrapper, func)
+    wrapper.elementwise = elementwise
+    return wrap_func(wrapper, ranges=ranges)
+
+
+def function_modules():
+    """
+    Imports all :data:`SUBMODULES` and maps each function to its submodule.
+
+    :return:
+        Submodule of each function name.
+    :rtype: dict
+    """
+    modules = {}
+    for name in SUBMODULES:
+        mdl = importlib.import_module(name, __name__)
+        modules.update(dict.fromkeys(mdl.FUNCTIONS, name))
+    return {k: modules[k] for k in sorted(modules)}
+
+
+class Functions(collections.defaultdict):
+    """
+    Excel functions by name.
+
+    A submodule of :data:`SUBMODULES` is imported on the first lookup of one of
+    its functions (see :data:`~._registry.FUNCTION_MODULES`). Unknown names
+    return the default function.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(Functions, self).__init__(*args, **kwargs)
+        self.loaded = set()
+
+    def load(self, *modules):
+        from ._registry import FUNCTION_MODULES
+        for name in modules or SUBMODULES:
+            if name not in self.loaded:
+                self.loaded.add(name)
+                mdl = importlib.import_module(name, __name__)
+                for k, v in mdl.FUNCTIONS.items():
+                    if FUNCTION_MODULES.get(k, name) == name:
+                        self.setdefault(k, v)  # Keep user overrides.
+        return self
+
+    def _load_key(self, key):
+        from ._registry import FUNCTION_MODULES
+        name = FUNCTION_MODULES.get(key)
+        if name is not None and name not in self.loaded:
+            self.load(name)
+        return dict.__contains__(self, key)
+
+    def __missing__(self, key):
+        if self._load_key(key):
+            return dict.__getitem__(self, key)
+        return super(Functions, self).__missing__(key)
+
+    def __contains__(self, key):
+        return dict.__contains__(self, key) or self._load_key(key)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def __iter__(self):
+        return iter(self.load().keys())
+
+    def __len__(self):
+        return dict.__len__(self.load())
+
+    def keys(self):
+        return dict.keys(self.load())
+
+    def values(self):
+        return dict.values(self.load())
+
+    def items(self):
+        return dict.items(self.load())
 
 
 @functools.lru_cache()
 def get_functions():
-    functions = collections.defaultdict(lambda: not_implemented)
-    for name in SUBMODULES:
-        functions.update(importlib.import_module(name, __name__).FUNCTIONS)
+    functions = Functions(lambda: not_implemented)
     functions.update(FUNCTIONS)
     return functions
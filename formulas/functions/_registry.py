@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+#
+# Copyright 2016-2022 European Commission (JRC);
+# Licensed under the EUPL (the 'Licence');
+# You may not use this work except in compliance with the Licence.
+# You may obtain a copy of the Licence at: http://ec.europa.eu/idabc/eupl
+
+"""
+It provides the submodule of each Excel function, to import it on demand.
+
+It is generated by :func:`formulas.functions.function_modules`.
+"""
+
+#: Submodule (of `formulas.functions`) that implements each function.
+FUNCTION_MODULES = {
+    'ABS': '.math',
+    'ACOS': '.math',
+    'ACOSH': '.math',
+    'ACOT': '.math',
+    'ACOTH': '.math',
+    'ADDRESS': '.look',
+    'AND': '.logic',
+    'ARABIC': '.math',
+    'ASIN': '.math',
+    'ASINH': '.math',
+    'ATAN': '.math',
+    'ATAN2': '.math',
+    'ATANH': '.math',
+    'AVERAGE': '.stat',
+    'AVERAGEA': '.stat',
+    'AVERAGEIF': '.stat',
+    'AVERAGEIFS': '.stat',
+    'BIN2DEC': '.eng',
+    'BIN2HEX': '.eng',
+    'BIN2OCT': '.eng',
+    'CEILING': '.math',
+    'CEILING.MATH': '.math',
+    'CEILING.PRECISE': '.math',
+    'CHOOSE': '.look',
+    'COLUMN': '.look',
+    'CONCAT': '.text',
+    'CONCATENATE': '.text',
+    'CORREL': '.stat',
+    'COS': '.math',
+    'COSH': '.math',
+    'COT': '.math',
+    'COTH': '.math',
+    'COUNT': '.stat',
+    'COUNTA': '.stat',
+    'COUNTBLANK': '.stat',
+    'COUNTIF': '.stat',
+    'COUNTIFS': '.stat',
+    'CSC': '.math',
+    'CSCH': '.math',
+    'CUMIPMT': '.financial',
+    'DATE': '.date',
+    'DATEDIF': '.date',
+    'DATEVALUE': '.date',
+    'DAY': '.date',
+    'DEC2BIN': '.eng',
+    'DEC2HEX': '.eng',
+    'DEC2OCT': '.eng',
+    'DECIMAL': '.math',
+    'DEGREES': '.math',
+    'DUMMYFUNCTION': '.google',
+    'EDATE': '.date',
+    'EVEN': '.math',
+    'EXP': '.math',
+    'FACT': '.math',
+    'FACTDOUBLE': '.math',
+    'FALSE': '.logic',
+    'FIND': '.text',
+    'FLOOR': '.math',
+    'FLOOR.MATH': '.math',
+    'FLOOR.PRECISE': '.math',
+    'FORECAST': '.stat',
+    'FORECAST.LINEAR': '.stat',
+    'FV': '.financial',
+    'GCD': '.math',
+    'HEX2BIN': '.eng',
+    'HEX2DEC': '.eng',
+    'HEX2OCT': '.eng',
+    'HLOOKUP': '.look',
+    'HOUR': '.date',
+    'IF': '.logic',
+    'IFERROR': '.logic',
+    'IFNA': '.logic',
+    'IFS': '.logic',
+    'INDEX': '.look',
+    'INT': '.math',
+    'IPMT': '.financial',
+    'IRR': '.financial',
+    'ISBLANK': '.info',
+    'ISERR': '.info',
+    'ISERROR': '.info',
+    'ISEVEN': '.info',
+    'ISLOGICAL': '.info',
+    'ISNA': '.info',
+    'ISNONTEXT': '.info',
+    'ISNUMBER': '.info',
+    'ISO.CEILING': '.math',
+    'ISODD': '.info',
+    'ISOWEEKNUM': '.date',
+    'ISTEXT': '.info',
+    'LARGE': '.stat',
+    'LCM': '.math',
+    'LEFT': '.text',
+    'LEN': '.text',
+    'LN': '.math',
+    'LOG': '.math',
+    'LOG10': '.math',
+    'LOOKUP': '.look',
+    'LOWER': '.text',
+    'MATCH': '.look',
+    'MAX': '.stat',
+    'MAXA': '.stat',
+    'MAXIFS': '.stat',
+    'MEDIAN': '.stat',
+    'MID': '.text',
+    'MIN': '.stat',
+    'MINA': '.stat',
+    'MINIFS': '.stat',
+    'MINUTE': '.date',
+    'MOD': '.math',
+    'MONTH': '.date',
+    'MROUND': '.math',
+    'NA': '.info',
+    'NOT': '.logic',
+    'NOW': '.date',
+    'NPER': '.financial',
+    'NPV': '.financial',
+    'OCT2BIN': '.eng',
+    'OCT2DEC': '.eng',
+    'OCT2HEX': '.eng',
+    'ODD': '.math',
+    'OR': '.logic',
+    'PI': '.math',
+    'PMT': '.financial',
+    'POWER': '.math',
+    'PPMT': '.financial',
+    'PRODUCT': '.math',
+    'PV': '.financial',
+    'RADIANS': '.math',
+    'RAND': '.math',
+    'RANDBETWEEN': '.math',
+    'RATE': '.financial',
+    'REPLACE': '.text',
+    'RIGHT': '.text',
+    'ROMAN': '.math',
+    'ROUND': '.math',
+    'ROUNDDOWN': '.math',
+    'ROUNDUP': '.math',
+    'ROW': '.look',
+    'SEARCH': '.text',
+    'SEC': '.math',
+    'SECH': '.math',
+    'SECOND': '.date',
+    'SIGN': '.math',
+    'SIN': '.math',
+    'SINGLE': '.look',
+    'SINH': '.math',
+    'SLOPE': '.stat',
+    'SMALL': '.stat',
+    'SQRT': '.math',
+    'SQRTPI': '.math',
+    'STDEV': '.comp',
+    'STDEV.P': '.stat',
+    'STDEV.S': '.stat',
+    'STDEVA': '.stat',
+    'STDEVP': '.comp',
+    'STDEVPA': '.stat',
+    'SUM': '.math',
+    'SUMIF': '.math',
+    'SUMIFS': '.math',
+    'SUMPRODUCT': '.math',
+    'SWITCH': '.logic',
+    'TAN': '.math',
+    'TANH': '.math',
+    'TIME': '.date',
+    'TIMEVALUE': '.date',
+    'TODAY': '.date',
+    'TRIM': '.text',
+    'TRUE': '.logic',
+    'TRUNC': '.math',
+    'UPPER': '.text',
+    'VAR': '.comp',
+    'VAR.P': '.stat',
+    'VAR.S': '.stat',
+    'VARA': '.stat',
+    'VARP': '.comp',
+    'VARPA': '.stat',
+    'VLOOKUP': '.look',
+    'WEEKDAY': '.date',
+    'WEEKNUM': '.date',
+    'XIRR': '.financial',
+    'XNPV': '.financial',
+    'XOR': '.logic',
+    'YEAR': '.date',
+    'YEARFRAC': '.date',
+    '_XLFN.ACOT': '.math',
+    '_XLFN.ACOTH': '.math',
+    '_XLFN.ARABIC': '.math',
+    '_XLFN.CEILING.MATH': '.math',
+    '_XLFN.CEILING.PRECISE': '.math',
+    '_XLFN.CONCAT': '.text',
+    '_XLFN.COT': '.math',
+    '_XLFN.COTH': '.math',
+    '_XLFN.CSC': '.math',
+    '_XLFN.CSCH': '.math',
+    '_XLFN.DECIMAL': '.math',
+    '_XLFN.FLOOR.MATH': '.math',
+    '_XLFN.FLOOR.PRECISE': '.math',
+    '_XLFN.FORECAST.LINEAR': '.stat',
+    '_XLFN.IFNA': '.logic',
+    '_XLFN.IFS': '.logic',
+    '_XLFN.ISOWEEKNUM': '.date',
+    '_XLFN.MAXIFS': '.stat',
+    '_XLFN.MINIFS': '.stat',
+    '_XLFN.SEC': '.math',
+    '_XLFN.SECH': '.math',
+    '_XLFN.SINGLE': '.look',
+    '_XLFN.STDEV.P': '.stat',
+    '_XLFN.STDEV.S': '.stat',
+    '_XLFN.SWITCH': '.logic',
+    '_XLFN.VAR.P': '.stat',
+    '_XLFN.VAR.S': '.stat',
+    '_XLFN.XOR': '.logic',
+    '__XLUDF.DUMMYFUNCTION': '.google',
+}
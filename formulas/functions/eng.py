@@ -134,6 +134,7 @@ def hex2dec2bin2oct(function_id, memo):
     def func(x, places=None):
         return _func.register(memo=memo)(x, places)
 
+    func.reentrant = False  # The shared pipe stores the last solution.
     return func
 
 _memo = {}
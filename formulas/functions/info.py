@@ -25,12 +25,18 @@ class IsErrArray(Array):
     _collapse_value = True
 
 
+def _is_tail(res, val, check):
+    if getattr(val, '_full_shape', None):  # Implicit empty tail.
+        res._full_shape, res._tail = val._full_shape, check(sh.EMPTY)
+    return res
+
+
 def iserr(val):
     try:
         b = np.asarray([isinstance(v, XlError) and v is not Error.errors['#N/A']
                         for v in val.ravel().tolist()], bool)
         b.resize(val.shape)
-        return b.view(IsErrArray)
+        return _is_tail(b.view(IsErrArray), val, lambda v: False)
     except AttributeError:  # val is not an array.
         return iserr(np.asarray([[val]], object))[0][0].view(IsErrArray)
 
@@ -46,7 +52,7 @@ def iserror(val, check=lambda x: isinstance(x, XlError), array=IsErrorArray):
     try:
         b = np.asarray([check(v) for v in val.ravel().tolist()], bool)
         b.resize(val.shape)
-        return b.view(array)
+        return _is_tail(b.view(array), val, check)
     except AttributeError:  # val is not an array.
         return iserror(
             np.asarray([[val]], object), check, array
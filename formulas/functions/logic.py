@@ -11,9 +11,10 @@ Python equivalents of logical Excel functions.
 """
 import functools
 import numpy as np
+import schedula as sh
 from . import (
     wrap_ufunc, Error, flatten, get_error, value_return, wrap_func, XlError,
-    raise_errors
+    raise_errors, static_value
 )
 
 FUNCTIONS = {}
@@ -29,12 +30,23 @@ def solve_cycle(*args):
     return not args[0]
 
 
+def prune_if(func, condition=sh.NONE, *values):
+    condition = static_value(condition)
+    if condition is sh.NONE or isinstance(condition, str):
+        return None
+    i = xif(condition, 1, 2)
+    if i > len(values):  # Default value.
+        return func, (0,)
+    return func, (0, i, i)
+
+
 FUNCTIONS['IF'] = {
     'function': wrap_ufunc(
         xif, input_parser=lambda *a: a, return_func=value_return,
         check_error=lambda cond, *a: get_error(cond)
     ),
-    'solve_cycle': solve_cycle
+    'solve_cycle': solve_cycle,
+    'prune': prune_if
 }
 
 
@@ -52,12 +64,28 @@ def xifs(*cond_vals):
     return Error.errors['#N/A']
 
 
+def prune_ifs(func, *cond_vals):
+    n = len(cond_vals) - len(cond_vals) % 2
+    for i in range(0, n, 2):
+        b = static_value(cond_vals[i])
+        if b is sh.NONE or isinstance(b, str):
+            break
+        if b:
+            return func, (i, i + 1)
+    else:  # All conditions are false.
+        i = n - 2 if n == len(cond_vals) else n
+    if i:
+        return func, tuple(range(i, len(cond_vals)))
+    return None
+
+
 FUNCTIONS['_XLFN.IFS'] = FUNCTIONS['IFS'] = {
     'function': wrap_ufunc(
         xifs, input_parser=lambda *a: a, return_func=value_return,
         check_error=lambda *a: None
     ),
-    'solve_cycle': lambda *a: not any(a[::2])
+    'solve_cycle': lambda *a: not any(a[::2]),
+    'prune': prune_ifs
 }
 
 
@@ -109,11 +137,29 @@ def xswitch(val, *args):
         return args[-1] if len(args) % 2 else Error.errors['#N/A']
 
 
+def prune_switch(func, val=sh.NONE, *args):
+    keys = list(map(static_value, args[:len(args) - len(args) % 2:2]))
+    val = static_value(val)
+    if val is sh.NONE or isinstance(val, XlError) or sh.NONE in keys:
+        return None
+    args = list(range(1, len(args) + 1))
+    args[:len(keys) * 2:2] = keys
+    i = xswitch(val, *args)
+    if isinstance(i, XlError):
+        if i is not Error.errors['#N/A'] or len(args) % 2:
+            return None
+        return func, (0,)  # No match.
+    elif i == len(args):  # Default value.
+        return func, (0, i)
+    return func, (0, i - 1, i)
+
+
 FUNCTIONS["_XLFN.SWITCH"] = FUNCTIONS["SWITCH"] = {
     'function': wrap_ufunc(
         xswitch, input_parser=lambda *a: a, return_func=value_return,
         check_error=lambda first, *a: get_error(first),
-    )
+    ),
+    'prune': prune_switch
 }
 
 
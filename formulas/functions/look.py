@@ -10,15 +10,18 @@
 Python equivalents of lookup and reference Excel functions.
 """
 import regex
+import bisect
+import itertools
 import functools
 import collections
 import numpy as np
 import schedula as sh
 from . import (
     wrap_func, wrap_ufunc, Error, get_error, XlError, FoundError, Array,
-    parse_ranges, value_return, _text2num
+    parse_ranges, value_return, _text2num, replace_empty, get_index,
+    full_shape, static_value
 )
-from ..ranges import Ranges
+from ..ranges import Ranges, RangeRecord
 from ..cell import CELL
 
 FUNCTIONS = {}
@@ -47,12 +50,12 @@ def _xref(func, cell=None, ref=None):
 
 def xrow(cell=None, ref=None):
     return _xref(
-        lambda r: np.arange(int(r['r1']), int(r['r2']) + 1)[:, None], cell, ref
+        lambda r: np.arange(r.r1, r.r2 + 1)[:, None], cell, ref
     )
 
 
 def xcolumn(cell=None, ref=None):
-    return _xref(lambda r: np.arange(r['n1'], r['n2'] + 1)[None, :], cell, ref)
+    return _xref(lambda r: np.arange(r.n1, r.n2 + 1)[None, :], cell, ref)
 
 
 FUNCTIONS['COLUMN'] = {
@@ -89,11 +92,70 @@ FUNCTIONS['ADDRESS'] = wrap_ufunc(
 )
 
 
+def _choose_index(index_num, n):
+    index_num = _text2num(index_num)
+    if isinstance(index_num, XlError):
+        return index_num
+    if isinstance(index_num, str) or index_num is sh.EMPTY:
+        return Error.errors['#VALUE!']
+    index_num = int(index_num)  # TRUE is 1.
+    if not 1 <= index_num <= n:
+        return Error.errors['#VALUE!']
+    return index_num
+
+
+def _choose(values, index_num, i, j):
+    index_num = _choose_index(index_num, len(values))
+    if isinstance(index_num, XlError):
+        return index_num
+    value = values[index_num - 1]
+    shape = value.shape
+    try:
+        value = value[0 if shape[0] == 1 else i, 0 if shape[1] == 1 else j]
+    except IndexError:
+        return Error.errors['#N/A']
+    return 0 if value is sh.EMPTY else value
+
+
+def xchoose(index_num, *values):
+    index_num = parse_ranges(index_num)[0][0]
+    if np.size(index_num) == 1:  # The selected argument is returned as is.
+        if isinstance(index_num, np.ndarray):
+            index_num = index_num.ravel()[0]
+        index_num = _choose_index(index_num, len(values))
+        if isinstance(index_num, XlError):
+            return index_num
+        value = values[index_num - 1]
+        return 0 if value is sh.EMPTY else value
+    values = [
+        np.atleast_2d(np.asarray(v, object)) for v in parse_ranges(*values)[0]
+    ]
+    i, j = np.indices(index_num.shape)
+    return np.vectorize(_choose, excluded={0}, otypes=[object])(
+        values, index_num, i, j
+    ).view(Array)
+
+
+def prune_choose(func, index_num=sh.NONE, *values):
+    index_num = static_value(index_num)
+    if index_num is sh.NONE or isinstance(index_num, XlError):
+        return None
+    i = _choose_index(index_num, len(values))
+    if isinstance(i, XlError):
+        return None
+    return functools.partial(func, 1), (i,)
+
+
+FUNCTIONS['CHOOSE'] = {
+    'function': wrap_func(xchoose, ranges=True),
+    'prune': prune_choose
+}
+
+
 def xsingle(cell, rng):
     if len(rng.ranges) == 1 and not rng.is_set and rng.value.shape[1] == 1:
-        rng = rng & Ranges((sh.combine_dicts(
-            rng.ranges[0], sh.selector(('r1', 'r2'), cell.ranges[0])
-        ),))
+        r, c = rng.ranges[0], cell.ranges[0]
+        rng = rng & Ranges((RangeRecord(r.sheet_id, r.n1, c.r1, r.n2, c.r2),))
         if rng.ranges:
             return rng
     return Error.errors['#VALUE!']
@@ -114,11 +176,12 @@ def _index(arrays, row_num, col_num, area_num, is_reference, is_array):
         return Error.errors['#VALUE!']
     try:
         array = arrays[area_num]
+        shape = full_shape(array)
 
         if col_num is None:
             col_num = 1
-            if 1 in array.shape:
-                if array.shape[0] == 1:
+            if 1 in shape:
+                if shape[0] == 1:
                     row_num, col_num = col_num, row_num
             elif is_reference:
                 array = None
@@ -137,6 +200,13 @@ def _index(arrays, row_num, col_num, area_num, is_reference, is_array):
                 return Error.errors['#VALUE!']
             col_num = max(0, col_num)
 
+        bounds = np.shape(array)
+        if shape != bounds and row_num is not None and \
+                col_num is not None and row_num < shape[0] and \
+                col_num < shape[1] and (row_num >= bounds[0] or
+                                        col_num >= bounds[1]):
+            val = getattr(array, '_tail', sh.EMPTY)  # Implicit tail.
+            return 0 if val is sh.EMPTY else val
         val = array[row_num, col_num]
         return 0 if val is sh.EMPTY else val
     except (IndexError, TypeError):
@@ -164,7 +234,133 @@ def xindex(array, row_num, col_num=None, area_num=1):
 FUNCTIONS['INDEX'] = wrap_func(xindex, ranges=True)
 
 
+def _isascii(s):
+    try:
+        s.encode('ascii')
+        return True
+    except UnicodeEncodeError:
+        return False
+
+
+def _is_number(v):
+    return isinstance(v, (int, float, np.integer, np.floating)) and \
+           not isinstance(v, bool) and v == v
+
+
+class LookupIndex:
+    """
+    Lookup index of a vector, shared by all the lookups on the same vector.
+
+    It uses hash maps for exact matches and the prefix extremes with bisection
+    for approximate matches, replicating the linear scan of `xmatch`.
+    """
+
+    def __init__(self, values):
+        # A copy, to not keep alive the memory of the range (see get_index).
+        self.values = np.ravel(replace_empty(values)).copy()
+        self._cache = {}
+
+    def _get(self, key, func, *args):
+        try:
+            return self._cache[key]
+        except KeyError:
+            res = self._cache[key] = func(*args)
+            return res
+
+    def _group(self, t_id):
+        pos, raw = [], []
+        for i, v in _yield_vals(t_id, self.values):
+            pos.append(i)
+            raw.append(v)
+        conv = [v.upper() for v in raw] if t_id == 1 else raw
+        sortable = t_id != 0 or all(map(_is_number, conv))
+        return pos, raw, conv, sortable
+
+    def _hash(self, t_id, raw=False):
+        res, (_, r, c, _) = {}, self._get(t_id, self._group, t_id)
+        if t_id == 1 and not (raw or all(map(_isascii, c))):
+            return None  # Case folding of `regex.IGNORECASE`.
+        try:
+            for k, v in enumerate(r if raw else c):
+                res.setdefault(v, k)
+                if t_id == 1 and not raw and v.endswith('\n'):
+                    res.setdefault(v[:-1], k)  # Same as regex `$`.
+        except TypeError:  # Unhashable values.
+            return None
+        return res
+
+    def _extremes(self, t_id, descending):
+        pos, _, conv, _ = self._get(t_id, self._group, t_id)
+        if descending:
+            return 0, list(itertools.accumulate(conv, min))[::-1]
+        start = int(pos[:1] == [1])  # The first cell never stops the scan.
+        return start, list(itertools.accumulate(conv[start:], max))
+
+    def match(self, lookup_value, match_type=1):
+        """
+        Returns the position of the lookup value.
+
+        :return:
+            Position (1-based), #N/A, or None when the index cannot replicate
+            the linear scan.
+        :rtype: int | XlError | None
+        """
+        na, t_id = Error.errors['#N/A'], _get_type_id(lookup_value)
+        if t_id == 0 and not _is_number(lookup_value):
+            return None
+        pos, _, conv, sortable = self._get(t_id, self._group, t_id)
+        val = lookup_value.upper() if t_id == 1 else lookup_value
+        if not match_type:
+            if t_id == 1 and (not _isascii(val) or any(
+                    c in val for c in '*?~')):
+                return None
+            index = self._get((t_id, 'exact'), self._hash, t_id)
+            if index is None:
+                return None
+            k = index.get(val)
+            return na if k is None else pos[k]
+        elif not sortable:
+            return None
+        elif match_type > 0:
+            start, acc = self._get((t_id, 'asc'), self._extremes, t_id, False)
+            r = pos[0] if start and conv[0] <= val else na
+            b = bisect.bisect_left(acc, val) + start  # First `x >= val`.
+            if b < len(pos):
+                if conv[b] == val:
+                    return pos[b]
+                return pos[b - 1] if b > start else r
+            return pos[-1] if len(pos) > start else r
+        _, acc = self._get((t_id, 'desc'), self._extremes, t_id, True)
+        index = self._get((t_id, 'raw'), self._hash, t_id, True)
+        b = len(acc) - bisect.bisect_left(acc, val)  # First `x < val`.
+        e = index.get(val, b)  # First raw value equal to `val`.
+        if e < b:
+            return pos[e]
+        return pos[b - 1] if b else na
+
+
+def get_lookup_index(vector):
+    """
+    Returns the lookup index of a vector, shared by all the lookups on the
+    same range.
+
+    :param vector:
+        Lookup vector.
+    :type vector: numpy.ndarray | list
+
+    :return:
+        Lookup index.
+    :rtype: LookupIndex
+    """
+    return get_index(LookupIndex, vector)
+
+
 def xmatch(lookup_value, lookup_array, match_type=1):
+    if isinstance(lookup_array, LookupIndex):
+        res = lookup_array.match(lookup_value, match_type)
+        if res is not None:
+            return res
+        lookup_array = lookup_array.values
     res = [Error.errors['#N/A']]
     t_id = _get_type_id(lookup_value)
     if match_type > 0:
@@ -211,24 +407,37 @@ def xmatch(lookup_value, lookup_array, match_type=1):
     return res[0]
 
 
+def _lookup_args_parser(val, vec, *args):
+    # The lookup vector is not copied to share its index.
+    return (replace_empty(val), vec) + tuple(map(replace_empty, args))
+
+
 FUNCTIONS['MATCH'] = wrap_ufunc(
     xmatch, check_error=lambda *a: get_error(a[:1]), excluded={1, 2},
-    input_parser=lambda val, vec, match_type=1: (val, np.ravel(vec), match_type)
+    args_parser=_lookup_args_parser,
+    input_parser=lambda val, vec, match_type=1: (
+        val, get_lookup_index(vec), match_type
+    )
 )
 
 
 def xlookup(lookup_val, lookup_vec, result_vec=None, match_type=1):
-    result_vec = lookup_vec if result_vec is None else result_vec
+    if result_vec is None:
+        result_vec = lookup_vec
+        if isinstance(lookup_vec, LookupIndex):
+            result_vec = lookup_vec.values
     r = xmatch(lookup_val, lookup_vec, match_type)
     if not isinstance(r, XlError):
         r = np.asarray(result_vec[r - 1], object).ravel()[0]
+        if r is sh.EMPTY:
+            r = 0
     return r
 
 
 FUNCTIONS['LOOKUP'] = wrap_ufunc(
-    xlookup,
+    xlookup, args_parser=_lookup_args_parser,
     input_parser=lambda val, vec, res=None: (
-        val, np.ravel(vec), res if res is None else np.ravel(res)
+        val, get_lookup_index(vec), res if res is None else np.ravel(res)
     ),
     check_error=lambda *a: get_error(a[:1]), excluded={1, 2}
 )
@@ -236,22 +445,24 @@ FUNCTIONS['LOOKUP'] = wrap_ufunc(
 
 def _hlookup_parser(val, vec, index, match_type=1, transpose=False):
     index = int(_text2num(np.ravel(index)[0]) - 1)
-    vec = np.matrix(vec)
+    vec = np.asarray(vec)
+    if vec.ndim < 2:
+        vec = vec.reshape(1, -1)
     if transpose:
         vec = vec.T
     try:
-        ref = vec[index].A1.ravel()
+        ref = vec[index]
     except IndexError:
         raise FoundError(err=Error.errors['#REF!'])
-    vec = vec[0].A1.ravel()
-    return val, vec, ref, bool(match_type)
+    return val, get_lookup_index(vec[0]), ref, bool(match_type)
 
 
 FUNCTIONS['HLOOKUP'] = wrap_ufunc(
-    xlookup, input_parser=_hlookup_parser,
+    xlookup, input_parser=_hlookup_parser, args_parser=_lookup_args_parser,
     check_error=lambda *a: get_error(a[:1]), excluded={1, 2, 3}
 )
 FUNCTIONS['VLOOKUP'] = wrap_ufunc(
     xlookup, input_parser=functools.partial(_hlookup_parser, transpose=True),
+    args_parser=_lookup_args_parser,
     check_error=lambda *a: get_error(a[:1]), excluded={1, 2, 3}
 )
@@ -16,7 +16,7 @@ import numpy as np
 from decimal import Decimal, ROUND_HALF_UP
 from . import (
     get_error, raise_errors, is_number, flatten, wrap_ufunc, wrap_func,
-    replace_empty, Error, xfilter, wrap_impure_func, COMPILING
+    replace_empty, Error, xfilter, wrap_impure_func, COMPILING, xfilters
 )
 
 # noinspection PyDictCreation
@@ -307,9 +307,27 @@ def xround(x, d, func=round_up):
     return -v if x < 0 else v
 
 
-FUNCTIONS['ROUND'] = wrap_ufunc(xround)
-FUNCTIONS['ROUNDDOWN'] = wrap_ufunc(functools.partial(xround, func=math.floor))
-FUNCTIONS['ROUNDUP'] = wrap_ufunc(functools.partial(xround, func=math.ceil))
+def _round_up(x):
+    r = np.floor(x)
+    return np.where(x < 1e28, r + (x - r >= .5), np.nan)
+
+
+def _xround(x, d, func=_round_up):
+    d = np.where(np.abs(d) < 23, np.trunc(d), np.nan)
+    d = np.power(10.0, d)
+    v = func(np.abs(x * d)) / d
+    return np.where(x < 0, -v, v)
+
+
+FUNCTIONS['ROUND'] = wrap_ufunc(xround, ufunc=_xround)
+FUNCTIONS['ROUNDDOWN'] = wrap_ufunc(
+    functools.partial(xround, func=math.floor),
+    ufunc=functools.partial(_xround, func=np.floor)
+)
+FUNCTIONS['ROUNDUP'] = wrap_ufunc(
+    functools.partial(xround, func=math.ceil),
+    ufunc=functools.partial(_xround, func=np.ceil)
+)
 FUNCTIONS['SEC'] = FUNCTIONS['_XLFN.SEC'] = wrap_ufunc(
     functools.partial(xcot, func=np.cos)
 )
@@ -370,6 +388,7 @@ def xsum(*args, func=sum):
 FUNCTIONS['PRODUCT'] = wrap_func(functools.partial(xsum, func=np.prod))
 FUNCTIONS['SUM'] = wrap_func(xsum)
 FUNCTIONS['SUMIF'] = wrap_func(functools.partial(xfilter, xsum))
+FUNCTIONS['SUMIFS'] = wrap_func(functools.partial(xfilters, xsum))
 FUNCTIONS['TAN'] = wrap_ufunc(np.tan)
 FUNCTIONS['TANH'] = wrap_ufunc(np.tanh)
 FUNCTIONS['TRUNC'] = wrap_ufunc(functools.partial(xround, func=math.trunc))
@@ -9,8 +9,9 @@
 """
 Python equivalents of Excel operators.
 """
-import schedula as sh
 import functools
+import numpy as np
+import schedula as sh
 import collections
 from . import (
     replace_empty, not_implemented, wrap_func, wrap_ufunc, Error, value_return
@@ -23,14 +24,14 @@ OPERATORS = collections.defaultdict(lambda: not_implemented)
 numeric_wrap = functools.partial(wrap_ufunc, return_func=value_return)
 
 # noinspection PyTypeChecker
-OPERATORS.update({k: numeric_wrap(v) for k, v in {
-    '+': lambda x, y: x + y,
-    '-': lambda x, y: x - y,
-    'U-': lambda x: -x,
-    '*': lambda x, y: x * y,
-    '/': lambda x, y: (x / y) if y else Error.errors['#DIV/0!'],
-    '^': lambda x, y: x ** y,
-    '%': lambda x: x / 100.0,
+OPERATORS.update({k: numeric_wrap(v, ufunc=u) for k, (v, u) in {
+    '+': (lambda x, y: x + y, np.add),
+    '-': (lambda x, y: x - y, np.subtract),
+    'U-': (lambda x: -x, np.negative),
+    '*': (lambda x, y: x * y, np.multiply),
+    '/': (lambda x, y: (x / y) if y else Error.errors['#DIV/0!'], np.divide),
+    '^': (lambda x, y: x ** y, np.power),
+    '%': (lambda x: x / 100.0, lambda x: x / 100.0),
 }.items()})
 OPERATORS['U+'] = wrap_ufunc(
     lambda x: x, input_parser=lambda *a: a, return_func=value_return
@@ -16,7 +16,7 @@ import schedula as sh
 from . import (
     raise_errors, flatten, wrap_func, Error, is_number, _text2num, xfilter,
     XlError, wrap_ufunc, replace_empty, get_error, is_not_empty, _convert_args,
-    convert_nan, FoundError, value_return
+    convert_nan, FoundError, value_return, xfilters, empty_tail
 )
 
 FUNCTIONS = {}
@@ -50,6 +50,7 @@ FUNCTIONS['AVERAGEA'] = wrap_func(functools.partial(
     xfunc, convert=_convert, check=is_not_empty, func=_xaverage, default=None
 ))
 FUNCTIONS['AVERAGEIF'] = wrap_func(functools.partial(xfilter, xaverage))
+FUNCTIONS['AVERAGEIFS'] = wrap_func(functools.partial(xfilters, xaverage))
 
 
 def xcorrel(arr1, arr2):
@@ -68,15 +69,28 @@ FUNCTIONS['COUNT'] = wrap_func(functools.partial(
 FUNCTIONS['COUNTA'] = wrap_func(functools.partial(
     xfunc, check=is_not_empty, func=len, _raise=False, default=None
 ))
-FUNCTIONS['COUNTBLANK'] = wrap_func(functools.partial(
-    xfunc, check=lambda x: (x == '' or x is sh.EMPTY), func=len,
-    _raise=False, default=None
-))
+
+
+def xcountblank(*args):
+    return xfunc(
+        *args, check=lambda x: (x == '' or x is sh.EMPTY), func=len,
+        _raise=False, default=None
+    ) + sum(map(empty_tail, args))
+
+
+FUNCTIONS['COUNTBLANK'] = wrap_func(xcountblank)
 FUNCTIONS['COUNTIF'] = wrap_func(functools.partial(
     xfilter, len, operating_range=None
 ))
 
 
+def xcountifs(test_range, condition, *args):
+    return xfilters(len, test_range, test_range, condition, *args)
+
+
+FUNCTIONS['COUNTIFS'] = wrap_func(xcountifs)
+
+
 def xsort(values, k, large=True):
     err = get_error(k)
     if err:
@@ -116,6 +130,9 @@ FUNCTIONS['SMALL'] = wrap_ufunc(
     input_parser=lambda values, k: (values, k, False), return_func=value_return
 )
 FUNCTIONS['MAX'] = wrap_func(xfunc)
+FUNCTIONS['_XLFN.MAXIFS'] = FUNCTIONS['MAXIFS'] = wrap_func(
+    functools.partial(xfilters, xfunc)
+)
 FUNCTIONS['MAXA'] = wrap_func(functools.partial(
     xfunc, convert=_convert, check=is_not_empty
 ))
@@ -125,6 +142,9 @@ FUNCTIONS['MEDIAN'] = wrap_func(functools.partial(
     default=None
 ))
 FUNCTIONS['MIN'] = wrap_func(functools.partial(xfunc, func=min))
+FUNCTIONS['_XLFN.MINIFS'] = FUNCTIONS['MINIFS'] = wrap_func(
+    functools.partial(xfilters, functools.partial(xfunc, func=min))
+)
 FUNCTIONS['MINA'] = wrap_func(functools.partial(
     xfunc, convert=_convert, check=is_not_empty, func=min
 ))
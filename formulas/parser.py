@@ -12,6 +12,7 @@ It provides formula parser class.
 
 # noinspection PyCompatibility
 import regex
+import functools
 from .errors import TokenError, FormulaError, ParenthesesError
 from .tokens.operand import String, Error, Number, Range
 from .tokens.operator import OperatorToken, Separator, Intersect
@@ -20,6 +21,27 @@ from .tokens.parenthesis import Parenthesis
 from .builder import AstBuilder
 
 
+_spaces = ' \t\n\r\f\v'
+
+
+@functools.lru_cache(None)
+def _lexer_table(filters):
+    # Candidate token classes for each starting ASCII character.
+    table = {}
+    for c in map(chr, range(128)):
+        if c in _spaces:
+            continue
+        table[c] = tuple(
+            f for f in filters if f._first is None or c in f._first
+        )
+        table[' ' + c] = tuple(
+            f for f in filters if f._first is None or f._space or
+            f._lstrip and c in f._first
+        )
+    table[' '] = tuple(f for f in filters if f._first is None or f._space)
+    return table
+
+
 class Parser:
     formula_check = regex.compile(
         r"""
@@ -45,9 +67,13 @@ class Parser:
             raise FormulaError(expression)
         builder = self.ast_builder(match=match)
         filters, tokens, stack = self.filters, [], []
+        table = _lexer_table(tuple(filters))
         Parenthesis('(').ast(tokens, stack, builder)
         while expr:
-            for f in filters:
+            key = expr[0]
+            if key in _spaces:
+                key = ' ' + expr.lstrip(_spaces)[:1]
+            for f in table.get(key, filters):
                 try:
                     token = f(expr, context)
                     token.ast(tokens, stack, builder)
@@ -9,102 +9,276 @@
 """
 It provides Ranges class.
 """
+import sys
 import itertools
 import numpy as np
 from .tokens.operand import (
-    _re_range, range2parts, _index2col, maxrow, maxcol, Error
+    _re_range, range2parts, _index2col, maxrow, maxcol, Error, _build_ref,
+    _build_id
 )
 from .errors import RangeValueError, InvalidRangeError, InvalidRangeName
-from .functions import Array, _init_reshape
+from .functions import (
+    Array, _init_reshape, pad_empty, share_indexes, expand_tail
+)
 import schedula as sh
 
 
-def _has_same_sheet(x, y):
-    return x.get('sheet_id', True) == y.get('sheet_id', False)
+class RangeRecord:
+    """
+    Immutable range descriptor with integer coordinates.
+
+    It is a read-only mapping with the keys of :func:`range2parts` (i.e.,
+    `sheet_id`, `n1`, `n2`, `r1`, `r2`, `c1`, `c2`, `ref`, and `name`), where
+    `c1`, `c2`, `ref`, and `name` are computed lazily. As in
+    :func:`range2parts`, the mapping returns the rows as strings, while the
+    attributes `r1` and `r2` are integers.
+    """
+    __slots__ = 'sheet_id', 'n1', 'r1', 'n2', 'r2', '_ref', '_name'
+    _keys = 'sheet_id', 'n1', 'n2', 'r1', 'r2', 'c1', 'c2', 'ref', 'name'
+
+    def __init__(self, sheet_id, n1, r1, n2, r2, ref=None, name=None):
+        self.sheet_id = sys.intern(sheet_id)
+        self.n1, self.r1, self.n2, self.r2 = n1, r1, n2, r2
+        self._ref, self._name = ref, name
+
+    @classmethod
+    def from_dict(cls, rng):
+        return cls(
+            rng['sheet_id'], int(rng['n1']), int(rng['r1']), int(rng['n2']),
+            int(rng['r2']), rng.get('ref'), rng.get('name')
+        )
+
+    @property
+    def c1(self):
+        return _index2col(self.n1)
+
+    @property
+    def c2(self):
+        return _index2col(self.n2)
+
+    @property
+    def ref(self):
+        if self._ref is None:
+            self._ref = _build_ref(
+                self.c1, self.r1, self.c2, self.r2
+            ).upper()
+        return self._ref
+
+    @property
+    def name(self):
+        if self._name is None:
+            self._name = _build_id(self.ref, self.sheet_id)
+        return self._name
+
+    @property
+    def bounds(self):
+        return self.sheet_id, self.n1, self.r1, self.n2, self.r2
+
+    def _item(self, key):
+        value = getattr(self, key)
+        return str(value) if key in ('r1', 'r2') else value
+
+    def __getitem__(self, key):
+        if key in self._keys:
+            return self._item(key)
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        return self._item(key) if key in self._keys else default
+
+    def keys(self):
+        return self._keys
+
+    def values(self):
+        return tuple(map(self._item, self._keys))
+
+    def items(self):
+        return tuple(zip(self._keys, self.values()))
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __eq__(self, other):
+        if isinstance(other, RangeRecord):
+            return self.bounds == other.bounds
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.bounds)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return self.__class__, self.bounds
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.name)
+
+
+def _range_record(rng):
+    if rng.__class__ is RangeRecord:
+        return rng
+    return RangeRecord.from_dict(rng)
 
 
 def _intersect(x, y):
-    if _has_same_sheet(x, y):
-        n1, n2 = max(y['n1'], x['n1']), min(y['n2'], x['n2'])
+    if x.sheet_id == y.sheet_id:
+        n1, n2 = max(y.n1, x.n1), min(y.n2, x.n2)
         if n1 <= n2:
-            r1 = max(int(y['r1']), int(x['r1']))
-            r2 = min(int(y['r2']), int(x['r2']))
+            r1, r2 = max(y.r1, x.r1), min(y.r2, x.r2)
             if r1 <= r2:
-                return {
-                    'sheet_id': x['sheet_id'], 'n1': n1, 'r1': str(r1),
-                    'n2': n2, 'r2': str(r2)
-                }
-    return {}
+                return RangeRecord(x.sheet_id, n1, r1, n2, r2)
+    return None
 
 
-def _split(base, rng, intersect=None, format_range=range2parts):
+def _split(base, rng, intersect=None):
     z = _intersect(base, rng)
-    if not z:
+    if z is None:
         return rng,
 
     if intersect is not None:
-        intersect.update(z)
-
-    ranges = []
-    rng = {
-        'sheet_id': rng['sheet_id'], 'n1': rng['n1'], 'n2': rng['n2'],
-        'r1': rng['r1'], 'r2': rng['r2']
-    }
-    it = ('n1', 'n2', 1), ('n2', 'n1', -1), ('r1', 'r2', 1), ('r2', 'r1', -1)
-    for i, j, n in it:
-        if z[i] != rng[i]:
-            r = rng.copy()
-            r[j] = str(int(z[i]) - n) if j[0] == 'r' else z[i] - n
-            r = dict(format_range(('name', 'n1', 'n2'), **r))
-            ranges.append(r)
-            rng[i] = z[i]
-
+        intersect.append(z)
+
+    ranges, (s, n1, r1, n2, r2) = [], rng.bounds
+    if z.n1 != n1:
+        ranges.append(RangeRecord(s, n1, r1, z.n1 - 1, r2))
+        n1 = z.n1
+    if z.n2 != n2:
+        ranges.append(RangeRecord(s, z.n2 + 1, r1, n2, r2))
+        n2 = z.n2
+    if z.r1 != r1:
+        ranges.append(RangeRecord(s, n1, r1, n2, z.r1 - 1))
+        r1 = z.r1
+    if z.r2 != r2:
+        ranges.append(RangeRecord(s, n1, z.r2 + 1, n2, r2))
     return tuple(ranges)
 
 
+# Merge helpers work on mutable `[sheet_id, n1, r1, n2, r2]` lists.
 def _merge_raw_update(base, rng):
-    if _has_same_sheet(base, rng):
-        if base['n1'] == rng['n2'] and int(base['r2']) + 1 >= int(rng['r1']):
-            base['r2'] = rng['r2']
+    if base[0] == rng[0]:
+        if base[1] == rng[3] and base[4] + 1 >= rng[2]:
+            base[4] = rng[4]
             return True
 
 
 def _merge_col_update(base, rng):
-    if _has_same_sheet(base, rng):
-        if (base['n2'] + 1) == rng['n1']:
-            if base['r1'] == rng['r1'] and base['r2'] == rng['r2']:
-                base['n2'] = rng['n2']
+    if base[0] == rng[0]:
+        if (base[3] + 1) == rng[1]:
+            if base[2] == rng[2] and base[4] == rng[4]:
+                base[3] = rng[3]
                 return True
 
 
+class _ValuesIndex:
+    """
+    Spatial index of the stored values of a :class:`Ranges`.
+
+    The values are kept in the order of their names. Small sets are scanned,
+    large ones are indexed by sheet with vectorized bounds.
+    """
+    __slots__ = 'items', 'sheets'
+    threshold = 16
+
+    def __init__(self, values):
+        self.items = [v for k, v in sorted(values.items())]
+        self.sheets = None
+        if len(self.items) > self.threshold:
+            sheets = {}
+            for i, (rng, _) in enumerate(self.items):
+                sheets.setdefault(rng.sheet_id, []).append((i,) + tuple(
+                    rng.bounds[1:]
+                ))
+            self.sheets = {
+                k: np.asarray(v, np.int64).T for k, v in sheets.items()
+            }
+
+    def find(self, rng, start=0):
+        """
+        Returns the first position from `start` of a value that intersects
+        the range, or None.
+        """
+        if self.sheets is None:
+            for i in range(start, len(self.items)):
+                r = self.items[i][0]
+                if r.sheet_id == rng.sheet_id and r.n1 <= rng.n2 and \
+                        rng.n1 <= r.n2 and r.r1 <= rng.r2 and rng.r1 <= r.r2:
+                    return i
+            return None
+        try:
+            pos, n1, r1, n2, r2 = self.sheets[rng.sheet_id]
+        except KeyError:
+            return None
+        j = np.searchsorted(pos, start)
+        mask = (n1[j:] <= rng.n2) & (n2[j:] >= rng.n1)
+        mask &= (r1[j:] <= rng.r2) & (r2[j:] >= rng.r1)
+        k = mask.argmax() if mask.size else 0
+        return int(pos[j + k]) if mask.size and mask[k] else None
+
+
 def _get_indices_intersection(base, i):
-    r, c = int(base['r1']) or 1, base['n1'] or 1
-    r = slice((int(i['r1']) or 1) - r, (int(i['r2']) or 1) - r + 1)
-    c = slice((i['n1'] or 1) - c, (i['n2'] or 1) - c + 1)
+    r, c = base.r1 or 1, base.n1 or 1
+    r = slice((i.r1 or 1) - r, (i.r2 or 1) - r + 1)
+    c = slice((i.n1 or 1) - c, (i.n2 or 1) - c + 1)
     return r, c
 
 
 def _assemble_values(base, values, out=None):
     if out is None:
-        out = np.empty(_shape(**base), object)
+        out = np.empty(_shape(base), object)
         out[:, :] = ''
     for rng, value in values.values():
         ist = _intersect(base, rng)
-        if ist:
+        if ist is not None:
             br, bc = _get_indices_intersection(base, ist)
             rr, rc = _get_indices_intersection(rng, ist)
             out[br, bc] = value[rr, rc]
     return out
 
 
-# noinspection PyUnusedLocal
-def _shape(n1, n2, r1, r2, **kw):
-    r1, r2 = int(r1), int(r2)
+def _shape(rng):
+    r1, r2, n1, n2 = rng.r1, rng.r2, rng.n1, rng.n2
     r = maxrow if r1 == 0 and r2 == maxrow else (r2 - r1 + 1)
     c = maxcol if n1 == 0 and n2 == maxcol else (n2 - n1 + 1)
     return r, c
 
 
+def _is_open(rng):
+    return rng.r2 == maxrow or rng.n2 == maxcol
+
+
+def _bound_range(rng, max_row=maxrow, max_col=maxcol):
+    s, n1, r1, n2, r2 = rng.bounds
+    if r2 == maxrow and max_row < maxrow:
+        r1 = r1 or 1
+        r2 = max(r1, max_row)
+    if n2 == maxcol and max_col < maxcol:
+        n1 = n1 or 1
+        n2 = max(n1, max_col)
+    return RangeRecord(s, n1, r1, n2, r2)
+
+
+def _bounded_value(value, rng):
+    shape = _shape(rng)
+    if value.shape == shape:
+        return value
+    elif _is_open(rng) and value.size:
+        value = value.view(Array)
+        value._full_shape = shape
+        return value
+    return pad_empty(value, shape)
+
+
 def _reshape_array_as_excel(value, base_shape):
     try:
         return np.reshape(value, base_shape)
@@ -121,10 +295,17 @@ class Ranges:
     __slots__ = 'ranges', 'values', '_value'
 
     def __init__(self, ranges=(), values=None):
-        self.ranges = ranges
+        self.ranges = tuple(map(_range_record, ranges))
         self.values = values or {}
         self._value = sh.NONE
 
+    def __copy__(self):
+        # Shares the immutable records, the values are rebound per copy.
+        new = type(self).__new__(type(self))
+        new.ranges, new.values = self.ranges, dict(self.values)
+        new._value = sh.NONE
+        return new
+
     def pushes(self, refs, values=(), context=None):
         for r, v in itertools.zip_longest(refs, values, fillvalue=sh.EMPTY):
             self.push(r, value=v, context=context)
@@ -136,6 +317,7 @@ class Ranges:
 
     def set_value(self, rng, value=sh.EMPTY):
         self._value = sh.NONE
+        rng = _range_record(rng)
         self.ranges += rng,
         if value is not sh.EMPTY:
             if isinstance(value, Ranges):
@@ -144,9 +326,16 @@ class Ranges:
                 if not np.ndim(value):
                     value = [[value]]
                 value = np.asarray(value, object)
-            shape = _shape(**rng)
-            value = _reshape_array_as_excel(value, shape)
-            self.values[rng['name']] = (rng, value)
+            shape = _shape(rng)
+            if getattr(value, '_tail', sh.EMPTY) is not sh.EMPTY and (
+                    value._full_shape == shape or
+                    value.shape[0] < shape[0] or value.shape[1] < shape[1]):
+                value = expand_tail(value)  # Only empty tails are implicit.
+            if getattr(value, '_full_shape', None) != shape:
+                value = _reshape_array_as_excel(value, shape)
+            if value.size > 1:  # Single cells are never indexed.
+                share_indexes(value)
+            self.values[rng.name] = (rng, value)
 
         return self
 
@@ -155,7 +344,7 @@ class Ranges:
         return len(self.ranges) > 1
 
     @staticmethod
-    def get_range(ref, context):
+    def get_parts(ref, context):
         ctx = context.copy()
         for k, v in _re_range.match(ref).groupdict().items():
             if v is not None:
@@ -164,34 +353,27 @@ class Ranges:
                 ctx[k] = v
         return Ranges.format_range(('name', 'n1', 'n2'), **ctx)
 
+    @staticmethod
+    def get_range(ref, context):
+        return RangeRecord.from_dict(Ranges.get_parts(ref, context))
+
     def push(self, ref, value=sh.EMPTY, context=None):
         return self.set_value(self.get_range(ref, context or {}), value)
 
     def __add__(self, other):  # Expand.
-        ranges = self.ranges[1:] + other.ranges
-        rng = self.ranges[0]
-        rng = {
-            'sheet_id': rng['sheet_id'], 'n1': rng['n1'], 'n2': rng['n2'],
-            'r1': rng['r1'], 'r2': rng['r2']
-        }
-        for k in ('r1', 'r2'):
-            rng[k] = int(rng[k])
-
-        for r in ranges:
-            if not _has_same_sheet(rng, r):
+        s, n1, r1, n2, r2 = self.ranges[0].bounds
+        for r in self.ranges[1:] + other.ranges:
+            if r.sheet_id != s:
                 raise InvalidRangeError('{}:{}'.format(self, other))
-            else:
-                rng['r1'] = min(rng['r1'], int(r['r1']))
-                rng['n1'] = min(rng['n1'], r['n1'])
-                rng['r2'] = max(rng['r2'], int(r['r2']))
-                rng['n2'] = max(rng['n2'], r['n2'])
+            n1, r1 = min(n1, r.n1), min(r1, r.r1)
+            n2, r2 = max(n2, r.n2), max(r2, r.r2)
 
-        rng = self.format_range(('name', 'n1', 'n2'), **rng)
+        rng = RangeRecord(s, n1, r1, n2, r2)
         if self.values and other.values:
             values = self.values.copy()
             values.update(other.values)
             value = _assemble_values(rng, values)
-            return Ranges().push(rng['name'], value)
+            return Ranges().set_value(rng, value)
         return Ranges((rng,))
 
     def __or__(self, other):  # Union.
@@ -203,12 +385,11 @@ class Ranges:
         for rng in other.ranges:
             for r in self.ranges:
                 z = _intersect(rng, r)
-                if z:
+                if z is not None:
                     yield z
 
     def __and__(self, other):  # Intersection.
-        r = tuple(self.format_range(('name', 'n1', 'n2'), **i)
-                  for i in self.intersect(other))
+        r = tuple(self.intersect(other))
         values = self.values.copy()
         values.update(other.values)
         return Ranges(r, values)
@@ -221,7 +402,7 @@ class Ranges:
                 s = stack.copy()
                 stack = []
                 for r in s:
-                    stack.extend(_split(b, r, format_range=self.format_range))
+                    stack.extend(_split(b, r))
             base += tuple(stack)
         base, values = base[len(other.ranges):], self.values
         return Ranges(base, values)
@@ -230,32 +411,24 @@ class Ranges:
         rng = self.ranges
         if len(rng) <= 1:
             return self
-        it = range(min(r['n1'] for r in rng), max(r['n2'] for r in rng) + 1)
+        it = range(min(r.n1 for r in rng), max(r.n2 for r in rng) + 1)
         it = ['{0}:{0}'.format(_index2col(c)) for c in it]
         spl = (self & Ranges().pushes(it))._merge()
         return spl
 
     def _merge(self):
         # noinspection PyPep8
-        key = lambda x: (x['n1'], int(x['r1']), -x['n2'], -int(x['r2']))
-        rng = self.ranges
-        for merge, select in ((_merge_raw_update, 1), (_merge_col_update, 0)):
+        key = lambda x: (x[1], x[2], -x[3], -x[4])
+        rng = [list(r.bounds) for r in self.ranges]
+        for merge in (_merge_raw_update, _merge_col_update):
             it, rng = sorted(rng, key=key), []
             for r in it:
                 if not (rng and merge(rng[-1], r)):
-                    if rng:
-                        rng.append(rng.pop())
-                    if select:
-                        r = {
-                            'sheet_id': r['sheet_id'], 'n1': r['n1'],
-                            'n2': r['n2'], 'r1': r['r1'], 'r2': r['r2']
-                        }
                     rng.append(r)
-        rng = [self.format_range(['name'], **r) for r in rng]
-        return Ranges(tuple(rng), self.values)
+        return Ranges(tuple(RangeRecord(*r) for r in rng), self.values)
 
     def __repr__(self):
-        ranges = ', '.join(r['name'] for r in self.ranges)
+        ranges = ', '.join(r.name for r in self.ranges)
         value = '={}'.format(self.value) if ranges and self.values else ''
         return '<%s>(%s)%s' % (self.__class__.__name__, ranges, value)
 
@@ -265,30 +438,29 @@ class Ranges:
             return self._value
         if self.ranges and not self.values:
             raise RangeValueError(str(self))
-        stack, values = list(self.ranges), []
+        stack, values, bounded = list(self.ranges), [], False
+        index, start, update = _ValuesIndex(self.values), 0, False
         while stack:
-            update = False
-            for k, (rng, value) in sorted(self.values.items()):
-                if not stack:
-                    break
-                i = {}
-                new_rng = _split(
-                    rng, stack[-1], intersect=i, format_range=self.format_range
-                )
-                if i:
-                    update = True
-                    stack.pop()
-                    stack.extend(new_rng)
-                    r, c = _get_indices_intersection(rng, i)
-                    values.append(value[:, c][r])
-            else:
+            i = index.find(stack[-1], start)
+            if i is None:  # End of the pass.
                 if not update:
                     break
+                start, update = 0, False
+                continue
+            rng, value = index.items[i]
+            ist = []
+            stack.extend(_split(rng, stack.pop(), intersect=ist))
+            r, c = _get_indices_intersection(rng, ist[0])
+            values.append(value[:, c][r])
+            bounded |= getattr(value, '_full_shape', None) is not None
+            start, update = i + 1, True
 
         if self.is_set:
             self._value = np.concatenate([v.ravel() for v in values])
         elif values:
             self._value = values[0]
+            if bounded:
+                self._value = _bounded_value(values[0], self.ranges[0])
         else:
             self._value = np.asarray([[Error.errors['#NULL!']]], object)
         return self._value
@@ -27,6 +27,13 @@ from ..errors import TokenError
 
 class Token:
     _re = None
+    #: First characters of the matches, after the leading spaces if `_lstrip`
+    #: (None means any character).
+    _first = None
+    #: Can the match start with spaces?
+    _lstrip = True
+    #: Can the match be just spaces?
+    _space = False
 
     def __init__(self, s, context=None):
         self.source, self.attr = s, {}
@@ -46,6 +46,7 @@ class Operand(Token):
 
 class String(Operand):
     _re = regex.compile(r'^\s*"(?P<name>(?>""|[^"])*)"\s*')
+    _first = '"'
 
     def compile(self):
         return self.name.replace('""', '"')
@@ -80,8 +81,12 @@ _re_error = regex.compile(r'''
 ''', regex.IGNORECASE | regex.X | regex.DOTALL)
 
 
+_letters = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz_'
+
+
 class Error(Operand):
     _re = _re_error
+    _first = _letters + "'[#"
     errors = {str(k): k for k in (NULL, DIV, VALUE, REF, NUM, NAME, NA)}
 
     def compile(self):
@@ -94,6 +99,7 @@ class Number(Operand):
         r'TRUE(?!\(\))|FALSE(?!\(\)))(?!([a-z]|[0-9]|\.|\s*\:))\s*',
         regex.IGNORECASE
     )
+    _first = '0123456789TFtf'
 
     def compile(self):
         return eval(self.name.capitalize())
@@ -350,6 +356,7 @@ def range2parts(outputs, **inputs):
 
 class Range(Operand):
     _re = _re_range
+    _first, _lstrip = _letters + "0123456789'[$:\\", False
 
     def process(self, match, context=None):
         d = super(Range, self).process(match)
@@ -102,10 +102,12 @@ class Operator(Token):
 
 class Intersect(Operator):
     _re = regex.compile(r'^(?P<name>\s)\s*')
+    _first, _space = '', True
 
 
 class Separator(Operator):
     _re = regex.compile(r'^(\s*,\s*)')
+    _first = ','
     _re_process = regex.compile(r'^\s*(?P<name>,)$')
 
     def ast(self, tokens, stack, builder):
@@ -123,6 +125,7 @@ class OperatorToken(Operator):
     _re = regex.compile(
         r'^(\s*([<>]=|<>|[\*\/\^&<>=])(?=\s*[\+\-])|\s*%+|[\+\-\*\/\^&<>=\s:]+)'
     )
+    _first, _space = '+-*/^&<>=:%', True
     _re_process = regex.compile(
         r'^\s*(?P<name>(?P<sum_minus>[\+\s\-]+)|[<>]?=|<>|[\*\/\^&\%:<>])$'
     )
@@ -20,6 +20,7 @@ class Parenthesis(Token):
     _re = regex.compile(
         r'^\s*(?>(?P<name>(?P<start>\())\s*|(?P<name>(?P<end>\))))'
     )
+    _first = '()'
     opens = {')': '('}
     n_args = 0
 
@@ -82,8 +82,10 @@ if __name__ == '__main__':
 
     extras = {
         'excel': ['openpyxl'],
+        'cache': ['openpyxl', 'dill'],
         'plot': ['graphviz', 'regex', 'flask', 'Pygments', 'jinja2', 'docutils']
     }
+    extras['parallel'] = extras['cache']  # Both need `dill`.
     # noinspection PyTypeChecker
     extras['all'] = sorted(functools.reduce(set.union, extras.values(), set()))
     extras['dev'] = extras['all'] + [
@@ -97,7 +99,7 @@ if __name__ == '__main__':
         version=proj_ver,
         packages=find_packages(exclude=[
             'test', 'test.*', 'doc', 'doc.*', 'appveyor', 'binder',
-            'requirements'
+            'requirements', 'benchmarks', 'benchmarks.*'
         ]),
         url=url,
         project_urls=project_urls,
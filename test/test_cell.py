@@ -5,13 +5,20 @@
 # Licensed under the EUPL (the 'Licence');
 # You may not use this work except in compliance with the Licence.
 # You may obtain a copy of the Licence at: http://ec.europa.eu/idabc/eupl
+import gc
+import copy
 import time
+import weakref
 import unittest
 import ddt
+import numpy as np
 import schedula as sh
 from formulas.cell import Cell
-from formulas.functions import Error
+from formulas.ranges import Ranges
+from formulas.functions import Error, Array, get_index, _INDEXES
+from formulas.functions.look import LookupIndex
 from formulas.functions.date import DEFAULT_DATE
+from formulas.tokens.operand import maxrow
 
 DEFAULT_DATE[0] = 2019
 
@@ -499,6 +506,23 @@ class TestCell(unittest.TestCase):
         ('A1:D1', '=SWITCH({0,1,TRUE},1,0,,,TRUE,1,7)', {},
          '<Ranges>(A1:D1)=[[0 0 1 #N/A]]'),
         ('A1', '=SWITCH(1,2,0,1,4,,4,5)', {}, '<Ranges>(A1)=[[4]]'),
+        ('A1', '=CHOOSE(2,"a",B1,"c")', {'B1': 3}, '<Ranges>(A1)=[[3]]'),
+        ('A1:C1', '=CHOOSE({1,"3",4},"a","b",D1)', {'D1': 5},
+         "<Ranges>(A1:C1)=[['a' 5 #VALUE!]]"),
+        ('A1', '=CHOOSE(TRUE,"a","b")', {}, "<Ranges>(A1)=[['a']]"),
+        ('A1', '=CHOOSE(#REF!,"a","b")', {}, '<Ranges>(A1)=[[#REF!]]'),
+        ('A1', '=SUM(CHOOSE(2,B1:B3,C1:C5))',
+         {'B1:B3': [[1], [1], [1]], 'C1:C5': [[1], [2], [3], [4], [5]]},
+         '<Ranges>(A1)=[[15.0]]'),
+        ('A1', '=SUM(CHOOSE(D1,B1:B3,C1:C5))', {
+            'D1': 2, 'B1:B3': [[1], [1], [1]],
+            'C1:C5': [[1], [2], [3], [4], [5]]
+        }, '<Ranges>(A1)=[[15.0]]'),
+        ('A1:B1', '=CHOOSE({1,2},#N/A,C1)', {'C1': 3},
+         '<Ranges>(A1:B1)=[[#N/A 3]]'),
+        ('A1:A3', '=CHOOSE({1;2;2},B1:B3,C1:C2)',
+         {'B1:B3': [[7], [7], [7]], 'C1:C2': [[1], [2]]},
+         '<Ranges>(A1:A3)=[[7]\n [2]\n [#N/A]]'),
         ('A1', '=GCD(5.2, -1, TRUE)', {}, '<Ranges>(A1)=[[#VALUE!]]'),
         ('A1', '=GCD(5.2, -1)', {}, '<Ranges>(A1)=[[#NUM!]]'),
         ('A1', '=GCD(5.2, 10)', {}, '<Ranges>(A1)=[[5]]'),
@@ -625,6 +649,48 @@ class TestCell(unittest.TestCase):
             'A2:E2': [["h", "e", "l", "l", "o"]],
             'A3:E3': [["h", "e", "l", "l", "o"]]
         }, '<Ranges>(A1)=[[\'hellohellocurl\']]'),
+        ('A1:C1', '={1,2,3}/{0,1,2}', {},
+         '<Ranges>(A1:C1)=[[#DIV/0! 2.0 1.5]]'),
+        ('A1:B1', '=SQRT({4,-1})', {}, '<Ranges>(A1:B1)=[[2.0 #NUM!]]'),
+        ('A1:C1', '=ROUND({2.5,-2.5,0.125},{0,0,2})', {},
+         '<Ranges>(A1:C1)=[[3.0 -3.0 0.13]]'),
+        ('A1:C1', '=-{1,2,3}%^2', {},
+         '<Ranges>(A1:C1)=[[0.0001 0.0004 0.0009]]'),
+        ('A1:D1', '=VLOOKUP({"b","B\n",3,"d"},B1:C4,2,0)',
+         {'B1:C4': [['a', 1], ['B', 2], [3, sh.EMPTY], ['b', 4]]},
+         '<Ranges>(A1:D1)=[[2 2 0 #N/A]]'),
+        ('A1:D1', '=MATCH({0,2,2.5,9},B1:B5)',
+         {'B1:B5': [[3], [1], [2], [sh.EMPTY], [4]]},
+         '<Ranges>(A1:D1)=[[#N/A 3 4 5]]'),
+        ('A1:D1', '=MATCH({9,3,2.5,0},B1:B5,-1)',
+         {'B1:B5': [[5], [3], ["a"], [sh.EMPTY], [1]]},
+         '<Ranges>(A1:D1)=[[#N/A 2 2 4]]'),
+        ('A1:C1', '=HLOOKUP({"B","c","z"},B1:D2,2)',
+         {'B1:D2': [['a', 'b', 'c'], [1, 2, 3]]},
+         '<Ranges>(A1:C1)=[[2 3 3]]'),
+        ('A1', '=SUMIFS(A2:E2,A3:E3,">1",A4:E4,"a*")',
+         {'A2:E2': [[1, 2, 3, 4, 5]], 'A3:E3': [[1, 2, 3, 4, 5]],
+          'A4:E4': [['ab', 'b', 'ac', 'a', sh.EMPTY]]},
+         '<Ranges>(A1)=[[7.0]]'),
+        ('A1:B1', '=COUNTIFS(A3:E3,{">1","<3"},A4:E4,"a*")',
+         {'A3:E3': [[1, 2, 3, 4, 5]],
+          'A4:E4': [['ab', 'b', 'ac', 'a', sh.EMPTY]]},
+         '<Ranges>(A1:B1)=[[2 1]]'),
+        ('A1:C1', '=AVERAGEIFS(A2:E2,A4:E4,{"a*","z","<>a"})',
+         {'A2:E2': [[1, 2, 3, 4, 5]],
+          'A4:E4': [['ab', 'b', 'ac', 'a', sh.EMPTY]]},
+         '<Ranges>(A1:C1)=[[2.6666666666666665 #DIV/0! 2.75]]'),
+        ('A1:C1', '=MAXIFS(A2:E2,A4:E4,{"<>a","z",""})',
+         {'A2:E2': [[1, 2, 3, 4, 5]],
+          'A4:E4': [['ab', 'b', 'ac', 'a', sh.EMPTY]]},
+         '<Ranges>(A1:C1)=[[5 0 5]]'),
+        ('A1', '=_xlfn.MINIFS(A2:E2,A4:E4,"?c")',
+         {'A2:E2': [[1, 2, 3, 4, 5]],
+          'A4:E4': [['ab', 'b', 'ac', 'a', sh.EMPTY]]},
+         '<Ranges>(A1)=[[3]]'),
+        ('A1', '=SUMIFS(A2:E2,A4:D4,"a")',
+         {'A2:E2': [[1, 2, 3, 4, 5]], 'A4:D4': [['ab', 'b', 'ac', 'a']]},
+         '<Ranges>(A1)=[[#VALUE!]]'),
         # ('A1:D1', '=IF({0,-0.2,0},{2,3},{1})', {},
         #  '<Ranges>(A1:D1)=[[1 2 1 #N/A]]'),
         # ('A1:D1', '=IF({0,-2,0},{2,3},{1,4})', {},
@@ -666,3 +732,133 @@ class TestCell(unittest.TestCase):
         out = str(dsp()[cell.output])
         time.sleep(dt)
         self.assertNotEqual(out, str(dsp()[cell.output]))
+
+    @ddt.idata([
+        ('B2', '=IF("A1"="",0,A1+$A$5*SUM(A1:A2))', 'B3',
+         '=IF("A1"="",0,A2+$A$5*SUM(A2:A3))',
+         {'A2': 1, 'A2:A3': [[1], [2]], 'A5': 3}, 10),
+        ('B2', '=SUM(A1:A2)+A$5', 'C3', '=SUM(B2:B3)+B$5',
+         {'B2:B3': [[1], [2]], 'B5': 4}, 7),
+        ('B2', '=SUM(A:A)+A$5', 'C3', '=SUM(B:B)+B$5',
+         {}, None),
+        ('B2', '=A1+C1', 'B3', '=A2+C2', {'A2': 1, 'C2': 2}, 3),
+    ])
+    def test_template(self, case):
+        ref, formula, ref2, formula2, inputs, result = case
+        templates = {}
+        func = Cell(ref, formula, templates=templates).compile().func
+        self.assertEqual(len(templates), 1)
+        cell = Cell(ref2, formula2, templates=templates).compile()
+        self.assertIs(cell.func.__wrapped__, func.__wrapped__)
+        self.assertEqual(
+            cell.func.__name__, Cell(ref2, formula2).compile().func.__name__
+        )
+        if result is not None:
+            dsp = sh.Dispatcher()
+            assert cell.add(dsp)
+            inputs = {k: Ranges().push(k, v) for k, v in inputs.items()}
+            self.assertEqual(dsp(inputs)[cell.output].value[0, 0], result)
+
+    def test_args_isolation(self):
+        cell = Cell('C1', '=SUM(A1:A2)+SUM(A1:A2,B1)').compile()
+        template = cell.func.inputs['A1:A2']
+        a = Ranges().push('A1:A2', [[1], [2]])
+        b = Ranges().push('A1:A2', [[3], [4]])
+        args_a = list(cell._args(a, Ranges().push('B1', 1)))
+        args_b = list(cell._args(b, Ranges().push('B1', 2)))
+        self.assertEqual(template.values, {})
+        self.assertIsNot(args_a[0], template)
+        self.assertIsNot(args_a[0], args_b[0])
+        self.assertEqual(args_a[0].value.tolist(), [[1], [2]])
+        self.assertEqual(args_b[0].value.tolist(), [[3], [4]])
+
+        dsp = sh.Dispatcher()
+        assert cell.add(dsp)
+        for (x, y), res in (((1, 2), 7), ((5, 6), 23), ((1, 2), 7)):
+            sol = dsp({'A1:A2': [[x], [y]], 'B1': 1})
+            self.assertEqual(sol[cell.output].value[0, 0], res)
+        self.assertEqual(template.values, {})
+
+    def test_template_mismatch(self):
+        templates = {}
+        func = Cell('B2', '=A2+A3', templates=templates).compile().func
+        cell = Cell('B3', '=A3+A3', templates=templates).compile()
+        self.assertIsNot(cell.func.__wrapped__, func.__wrapped__)
+        Cell('B2', '=ROW()', templates=templates).compile()
+        self.assertEqual(len(templates), 2)
+
+    @ddt.idata([
+        ('=MATCH(2,A1:A3,0)', 2, 1), ('=VLOOKUP(9,A1:A3,1,0)', '#N/A', 9)
+    ])
+    def test_shared_index(self, case):
+        formula, *results = case
+        dsp = sh.Dispatcher()
+        cells = [Cell(ref, formula).compile() for ref in ('B1', 'B2')]
+        for cell in cells:
+            assert cell.add(dsp)
+        value = np.asarray([[1], [2], [3]], object)
+        for res in results:
+            sol = dsp({'A1:A3': Ranges().push('A1:A3', value)})
+            for cell in cells:
+                self.assertEqual(str(sol[cell.output].value[0, 0]), str(res))
+            value[:2] = [[2], [9]]  # Mutate in place and recalculate.
+
+        rng = Ranges().push('A1:A3', value)
+        index = get_index(LookupIndex, rng.value)
+        self.assertIs(get_index(LookupIndex, copy.copy(rng).value), index)
+        rng = Ranges().push('A1:A3', value)  # New version of the memory.
+        self.assertIsNot(get_index(LookupIndex, rng.value), index)
+        self.assertIn(id(value), _INDEXES)
+        cell = np.asarray([[1]], object)  # Single cells are not shared.
+        Ranges().push('A1', cell)
+        self.assertNotIn(id(cell), _INDEXES)
+
+        ref = weakref.ref(value)  # The indexes do not keep the memory alive.
+        del dsp, cells, cell, sol, rng, index, value
+        gc.collect()
+        self.assertIsNone(ref())
+
+    @ddt.idata([
+        ('=COUNTIF(A1:A3,2)', 1, 3), ('=SUMIF(A1:A3,2,B1:B3)', 20, 60),
+        ('=AVERAGEIF(A1:A3,">1")', 2.5, 2),
+        ('=COUNTIFS(A1:A3,2,B1:B3,">10")', 1, 2)
+    ])
+    def test_shared_criteria_index(self, case):
+        formula, *results = case
+        dsp = sh.Dispatcher()
+        cell = Cell('C1', formula).compile()
+        assert cell.add(dsp)
+        value = np.asarray([[1], [2], [3]], object)
+        for res in results:
+            sol = dsp({
+                'A1:A3': Ranges().push('A1:A3', value),
+                'B1:B3': Ranges().push('B1:B3', [[10], [20], [30]])
+            })
+            self.assertEqual(sol[cell.output].value[0, 0], res)
+            value[:] = 2  # Mutate in place and recalculate.
+
+    @ddt.idata([
+        ('=SUM(A:A)', 3.0), ('=COUNTBLANK(A:A)', maxrow - 3),
+        ('=COUNTIF(A:A,"<>b")', maxrow - 2), ('=COUNTIF(A:A,"")', maxrow - 3),
+        ('=SUMIFS(A:A,A:A,">0",B:B,"")', 1.0), ('=INDEX(A:A,10)', 0),
+        ('=INDEX(A:A,3)', 'a'), ('=MATCH(5,A:A)', 4),
+        ('=SUMPRODUCT(A:A,S2!A:A)', 10.0),
+        ('=SUM(IF(A:A=S2!A:A,1,0))', maxrow - 6),
+        ('=COUNTIF(A:A=S2!A:A,FALSE)', 6), ('=INDEX(A:A=S2!A:A,10)', True),
+        ('=SUM(IFERROR(A:A+S2!A:A,0))', 22.0),
+        ('=SUMPRODUCT(ISBLANK(S2!A:A)*1)', maxrow - 6)
+    ])
+    def test_full_range(self, case):
+        formula, result = case
+        dsp = sh.Dispatcher()
+        cell = Cell('C1', formula).compile()
+        assert cell.add(dsp)
+        inputs = {}
+        for ref, value in (('A:A', [[1], [sh.EMPTY], ['a'], [2]]),
+                           ('B:B', [[sh.EMPTY], [1], ['a'], ['b'], [0]]),
+                           ('S2!A:A', [[2], [2], [3], [4], [5], [6]])):
+            value = np.asarray(value, object).view(Array)
+            value._full_shape = maxrow, 1
+            inputs[ref] = Ranges().push(ref, value)
+            self.assertEqual(inputs[ref].value.shape, value.shape)
+        self.assertEqual(dsp(inputs)[cell.output].value[0, 0], result)
@@ -6,6 +6,7 @@
 # You may not use this work except in compliance with the Licence.
 # You may obtain a copy of the Licence at: http://ec.europa.eu/idabc/eupl
 import os
+import sys
 import copy
 import dill
 import time
@@ -17,6 +18,7 @@ import os.path as osp
 import schedula as sh
 from formulas.excel import ExcelModel, BOOK, ERR_CIRCULAR
 from formulas.excel.xlreader import load_workbook
+from formulas.excel.plan import ExecutionPlan
 from formulas.functions import is_number
 from formulas.ranges import Ranges
 
@@ -237,6 +239,56 @@ class TestExcelModel(unittest.TestCase):
         self.assertIsNot(xl_model, copy.deepcopy(xl_model))
         self.assertIsNot(func, copy.deepcopy(func))
 
+    def test_excel_model_compile_plan(self):
+        cases = (
+            (self.filename_compile, False,
+             ["'[excel.xlsx]DATA'!A%d" % i for i in range(2, 5)],
+             ["'[excel.xlsx]DATA'!C%d" % i for i in range(2, 5)]),
+            (self.filename_circular, 1, ["'[circular.xlsx]DATA'!A10"],
+             ["'[circular.xlsx]DATA'!E10"])
+        )
+        for fpath, circular, inputs, outputs in cases:
+            xl_model = ExcelModel().loads(fpath).finish(circular=circular)
+            func = xl_model.compile(inputs, outputs)
+            xl_model.compile_class = ExecutionPlan
+            plan = xl_model.compile(inputs, outputs)
+            self.assertIsInstance(plan, ExecutionPlan)
+            scenarios = (True, False, 1, 2.5, 'a', None)
+            for v in scenarios:
+                args = [v] * len(inputs)
+                self.assertEqual(str(func(*args)), str(plan(*args)))
+            res = plan.batch(*([scenarios] * len(inputs)))
+            for i, v in enumerate(scenarios):
+                sol = func(*[v] * len(inputs))
+                if len(outputs) == 1:
+                    sol = sol.value.tolist(), res[i].tolist()
+                else:
+                    sol = [r.value.tolist() for r in sol], [
+                        r[i].tolist() for r in res
+                    ]
+                self.assertEqual(str(sol[0]), str(sol[1]))
+            self.assertEqual(str(plan(*args)), str(dill.loads(
+                dill.dumps(plan)
+            )(*args)))
+
+    def test_excel_model_recalculate(self):
+        xl_model = ExcelModel().loads(self.filename_compile).finish()
+        xl_model.calculate()
+        inputs, it = {}, (
+            ("'[excel.xlsx]'!INPUT_A", 3), ("'[excel.xlsx]DATA'!B3", 1),
+            ("'[excel.xlsx]DATA'!A4", 'a'), ("'[excel.xlsx]DATA'!B3", 1)
+        )
+        for k, v in it:
+            inputs[k] = v
+            res = xl_model.recalculate({k: v})
+            sol = ExcelModel().loads(self.filename_compile).finish().calculate(
+                inputs
+            )
+            self.assertEqual(
+                {k: str(v) for k, v in res.items()},
+                {k: str(v) for k, v in sol.items()}
+            )
+
     def test_excel_model_cycles(self):
         xl_model = ExcelModel().loads(self.filename_circular).finish(circular=1)
         xl_model.calculate()
@@ -247,6 +299,269 @@ class TestExcelModel(unittest.TestCase):
 
         self._compare(books, self.results_circular)
 
+    def test_cycle_search(self):
+        from formulas.excel.cycle import (
+            simple_cycles, strongly_connected_components, cyclic_components
+        )
+        n = 100000  # A long chain with a loop every 1000 nodes.
+        graph = {i: {i + 1} for i in range(n - 1)}
+        graph[n - 1] = {n - 1}
+        for i in range(0, n - 3, 1000):
+            graph[i + 2].add(i)
+        sccs = list(strongly_connected_components(graph))
+        self.assertEqual(len(sccs), n - 200)
+        cyclic = sorted(map(sorted, cyclic_components(graph)))
+        self.assertEqual(cyclic[:2], [[0, 1, 2], [1000, 1001, 1002]])
+        self.assertEqual(len(cyclic), 101)
+        cycles = sorted(map(sorted, simple_cycles(graph)))
+        self.assertEqual(cycles, cyclic)
+        self.assertEqual(
+            sorted(map(sorted, simple_cycles({0: {1}, 1: {0, 1}}))),
+            [[0, 1], [1]]
+        )
+
+    def test_excel_model_stream(self):
+        from unittest import mock
+        for fpath in (self.filename_compile, self.filename_circular):
+            res = ExcelModel().loads(fpath).finish(circular=1).calculate()
+            res = {k: str(v) for k, v in res.items() if k is not sh.SELF}
+            xl_model = ExcelModel().loads(fpath, stream=True)
+            book = xl_model.books[osp.basename(fpath).upper()][BOOK]
+            self.assertIsNone(book._archive.fp)  # Closed file.
+            sol = xl_model.finish(circular=1).calculate()
+            self.assertEqual(
+                res, {k: str(v) for k, v in sol.items() if k is not sh.SELF}
+            )
+            if fpath != self.filename_compile:
+                continue  # Array formulas are not streamed by `iter_rows`.
+            with mock.patch(  # Changed private API of openpyxl.
+                    'openpyxl.worksheet._reader.WorkSheetParser',
+                    side_effect=TypeError):
+                xl_model = ExcelModel().loads(fpath, stream=True)
+            sol = xl_model.finish(circular=1).calculate()
+            self.assertEqual(
+                res, {k: str(v) for k, v in sol.items() if k is not sh.SELF}
+            )
+
+    def test_excel_model_parallel(self):
+        for fpath in (self.filename_compile, self.filename_circular):
+            res = ExcelModel().loads(fpath).finish(circular=1).calculate()
+            for stream in (False, True):
+                sol = ExcelModel().loads(
+                    fpath, stream=stream, processes=2
+                ).finish(circular=1).calculate()
+                self.assertEqual(
+                    {k: str(v) for k, v in res.items() if k is not sh.SELF},
+                    {k: str(v) for k, v in sol.items() if k is not sh.SELF}
+                )
+
+        import sys
+        from unittest import mock
+        with mock.patch.dict(sys.modules, {'dill': None}):  # Missing dill.
+            with self.assertRaisesRegex(ImportError, r'formulas\[parallel\]'):
+                ExcelModel().loads(self.filename_compile, processes=2)
+
+    def test_excel_model_iterative(self):
+        xl_model = ExcelModel().from_dict({
+            'A1': '=0.5*B1+1', 'B1': '=A1'
+        }).finish(iterative=True)
+        sol = xl_model.calculate()
+        self.assertAlmostEqual(sol['A1'].value[0, 0], 2, places=2)
+        self.assertAlmostEqual(sol['B1'].value[0, 0], 2, places=2)
+
+        xl_model = ExcelModel().from_dict({
+            'A1': '=0.5*B1+C1', 'B1': '=A1', 'C1': 1, 'D1': '=B1+1'
+        }).finish(iterative=True)
+        func = xl_model.compile(['C1'], ['A1', 'D1'])
+        xl_model.compile_class = ExecutionPlan
+        plan = xl_model.compile(['C1'], ['A1', 'D1'])
+        self.assertIsInstance(plan, ExecutionPlan)
+        self.assertFalse(plan._reentrant)
+        for v in (1, 2):
+            self.assertEqual(str(func(v)), str(plan(v)))
+        self.assertAlmostEqual(plan(2)[1].value[0, 0], 5, places=2)
+
+        xl_model = ExcelModel().loads(self.filename_circular)
+        sol = xl_model.finish(iterative=True).calculate()
+        # Converged values of the cycles (cells start from zero).
+        res = {
+            2: (0, None, None, 1.), 3: (0, 0, None, 1.), 4: (0, 0, 0, 1.),
+            5: (0, 0, 0, 1.), 6: (1, 1, 1, 2.), 7: (0, 0, 0, 1.),
+            8: (1, 1, 1, 2.), 9: (1, 1, 1, 2.), 10: (1, 1, 1, 2.),
+            11: (0, 0, 0, 1.), 12: (1, 1, 1, 2.), 13: (True, True, True, 2.),
+            16: (1, 1, 1, 2.), 17: (0, 0, 0, 1.)
+        }
+        for r, values in res.items():
+            for c, v in zip('BCDE', values):
+                k = "'[circular.xlsx]DATA'!%s%d" % (c, r)
+                if v is None:
+                    self.assertNotIn(k, sol)
+                    continue
+                self.assertEqual(str(sol[k].value[0, 0]), str(v), k)
+
+    def test_excel_model_levels(self):
+        import functools
+        from formulas.excel.levels import LevelPlan
+        xl_model = ExcelModel().from_dict({
+            'A1': 1, 'A5': 2, 'A2000': 3, 'B1': '=SUM(A1:A2000)',
+            'B2': '=MAX(A1:A2000) * 2', 'B3': '=B1 + B2', 'B4': '=A1 + 1',
+            'B5': '=SUM(1, 2)'
+        }).finish(complete=False)
+        for kw in ({}, {'inputs': {'A5': 10}},
+                   {'inputs': {'A5': 10}, 'outputs': ['B3']}):
+            sol = xl_model.calculate(**kw)
+            res = xl_model.calculate(threads=2, **kw)
+            self.assertIs(xl_model.dsp.solution, res)
+            self.assertEqual(list(sol), list(res))
+            self.assertEqual(str(sol), str(res))
+        plans = dict(xl_model._level_plans)
+        self.assertEqual(len(plans), 3)
+        self.assertTrue(all(p is not None for _, p in plans.values()))
+        xl_model.calculate({'A5': 3}, threads=2)
+        self.assertEqual(plans, xl_model._level_plans)
+        xl_model.dsp.set_default_value('A1', 5)
+        self.assertEqual(
+            str(xl_model.calculate()), str(xl_model.calculate(threads=2))
+        )
+        self.assertEqual(xl_model.dsp.solution['B4'].value.tolist(), [[6]])
+        xl_model.dsp.set_default_value('A1', 1)
+
+        class _Plan(LevelPlan):
+            min_size = 1
+
+        calls = []
+
+        def _func(name, fail):
+            def func(x):
+                calls.append(name)
+                if fail:
+                    raise ValueError(name)
+                return x
+            return func
+
+        dsp = sh.Dispatcher(raises=True)
+        for name, fail in (('b', False), ('c', True), ('d', True)):
+            dsp.add_function('f' + name, _func(name, fail), ['a'], [name])
+        plan = _Plan(dsp, inputs=['a'], outputs=['b', 'c', 'd'], threads=2)
+        self.assertEqual([len(h) for _, h in plan._levels], [3])
+        with self.assertRaises(sh.DispatcherError) as ctx:
+            plan(1)
+        self.assertEqual(str(ctx.exception.ex), 'c')
+        self.assertEqual(sorted(calls), ['b', 'c', 'd'])
+
+        plan = LevelPlan(xl_model.dsp, inputs=['A5'], outputs=['B3'])
+        self.assertTrue(any(len(h) > 1 for _, h in plan._levels))
+        self.assertEqual(plan(10).value.tolist(), [[34]])
+        self.assertEqual(dill.loads(dill.dumps(plan))(1).value.tolist(), [[
+            11
+        ]])
+        xl_model.compile_class = functools.partial(LevelPlan, threads=2)
+        func = xl_model.compile(['A5'], ['B3'])
+        self.assertIsInstance(func, LevelPlan)
+        self.assertEqual(func(10).value.tolist(), [[34]])
+
+        xl_model = ExcelModel().loads(self.filename_circular).finish(
+            circular=True
+        )
+        self.assertEqual(
+            str(xl_model.calculate()), str(xl_model.calculate(threads=2))
+        )
+
+        # The engineering functions share a pipe that is not re-entrant.
+        inputs = {'A%d' % i: 1 for i in range(1, 1101)}
+        for i in range(1, 33):
+            inputs['B%d' % i] = i * 10
+            inputs['C%d' % i] = '=COUNTIF(A1:A1100,">0")+' \
+                                'HEX2DEC(DEC2HEX(B%d))' % i
+            inputs['D%d' % i] = '=SUM(A1:A1100)+B%d' % i
+        xl_model = ExcelModel().from_dict(inputs).finish(complete=False)
+        plan = LevelPlan(xl_model.dsp, xl_model.dsp.name, threads=8)
+        keys = {i: k for k, i in plan._slots.items()}
+        self.assertEqual({
+            keys[s[2]][0] for _, h in plan._levels for s in h
+        }, {'D'})
+        sol, interval = str(xl_model.calculate()), sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            for _ in range(5):
+                self.assertEqual(sol, str(xl_model.calculate(threads=8)))
+        finally:
+            sys.setswitchinterval(interval)
+
+    def test_excel_model_cse(self):
+        inputs = {
+            'A1': '=SUM(B1:B3) + C1', 'A2': '=SUM(B1:B3) * 2',
+            'A3': '=RAND() * 0 + RAND() * 0', 'A4': '=RAND() * 0',
+            'B1': 1, 'B2': 2, 'B3': 3, 'C1': 1
+        }
+        base = ExcelModel().from_dict(inputs).finish(complete=False)
+        xl_model = ExcelModel().from_dict(inputs).finish(
+            complete=False, cse=True
+        )
+        hoisted = [
+            k for k, d in xl_model.dsp.function_nodes.items()
+            if isinstance(d['outputs'][0], sh.Token)
+        ]
+        self.assertEqual(hoisted, ['=SUM(B1:B3)'])
+        self.assertEqual(xl_model.to_dict(), base.to_dict())
+        for inputs in ({}, {'B1': 5}):
+            sol, res = xl_model.calculate(inputs), base.calculate(inputs)
+            for k in ('A1', 'A2', 'A3'):
+                self.assertEqual(str(sol[k]), str(res[k]))
+
+    def test_excel_model_profiler(self):
+        from formulas.excel.profiler import Profiler
+        xl_model = ExcelModel().from_dict({
+            'A1': '=SUM(B1:B3) + MAX(B1:B3)', 'A2': '=A1 * 2', 'B1': 1,
+            'B2': 2
+        }).finish(complete=False)
+        nodes = {k: v.get('function') for k, v in xl_model.dsp.nodes.items()}
+        with Profiler(xl_model) as profiler:
+            xl_model.calculate()
+            xl_model.calculate({'B3': 3})
+        self.assertEqual(xl_model.calculate()['A2'].value.tolist(), [[10]])
+        self.assertEqual(
+            {k: v.get('function') for k, v in xl_model.dsp.nodes.items()},
+            nodes
+        )
+        report = json.loads(profiler.to_json(top=2))
+        self.assertEqual(
+            [(r['name'], r['calls']) for r in sorted(
+                report['functions'], key=lambda r: r['name']
+            )], [('MAX', 2), ('SUM', 2)]
+        )
+        self.assertEqual(len(report['cells']), 2)
+        self.assertEqual(
+            {r.name: (r.kind, r.calls, r.size)
+             for r in profiler.cells.values()},
+            {'A1': ('cell', 2, 2), 'A2': ('cell', 2, 2),
+             'B1:B3': ('range', 2, 6)}
+        )
+        self.assertEqual(report['sheets']['']['cells'], 3)
+        for r in profiler.cells.values():
+            self.assertLessEqual(r.self_time, r.cumulative)
+        self.assertGreaterEqual(report['total'], sum(
+            r.cumulative for r in profiler.cells.values()
+        ) - 1e-9)
+
+    def test_excel_model_assemble_blocks(self):
+        from formulas.cell import RangesAssembler
+        xl_model = ExcelModel().from_dict({
+            'D1': '=SUM(A1:C100000)', 'A1': 1, 'B5': 2, 'C100000': 3
+        }).finish(complete=False)
+        ra, = (
+            d['function'] for d in xl_model.dsp.function_nodes.values()
+            if isinstance(d['function'], RangesAssembler)
+        )
+        self.assertEqual(
+            sorted(r.ref for r in ra.missing),
+            ['A2:A100000', 'B1:B4', 'B6:B100000', 'C1:C99999']
+        )
+        self.assertEqual(list(ra.inputs)[:3], ['A1', 'B5', 'C100000'])
+        self.assertEqual(xl_model.calculate()['D1'].value.tolist(), [[6]])
+        sol = xl_model.calculate({'B70000': 4, 'D70000': 5})
+        self.assertEqual(sol['D1'].value.tolist(), [[10]])
+
     def test_excel_model_full_range(self):
         fname = osp.basename(self.filename_full_range)
         xl_model = ExcelModel()
@@ -266,6 +581,35 @@ class TestExcelModel(unittest.TestCase):
 
         self._compare(books, self.results_full_range)
 
+    def test_excel_model_full_range_sheets(self):
+        import openpyxl
+        dirpath = osp.join(mydir, 'tmp', 'sheets')
+        os.makedirs(dirpath, exist_ok=True)
+        wb = openpyxl.Workbook()
+        wb.active.title = 'S1'
+        for i, v in enumerate((1, 2, 3), 1):
+            wb['S1']['A%d' % i] = v
+        wb.create_sheet('S2')
+        for i, v in enumerate((1, 5, 6, 7, 8), 1):
+            wb['S2']['A%d' % i] = v
+        wb.create_sheet('S3')
+        formulas = (
+            ('=SUMPRODUCT(S1!A:A,S2!A:A)', 29),
+            ('=SUM(IF(S1!A:A=S2!A:A,1,0))', 1048572),
+            ('=SUM(S1!A:A+S2!A:A)', 33),
+            ('=SUMPRODUCT((S1!A:A>1)*S2!A:A)', 11)
+        )
+        for i, (formula, _) in enumerate(formulas, 1):
+            wb['S3']['A%d' % i] = formula
+        fpath = osp.join(dirpath, 'sheets.xlsx')
+        wb.save(fpath)
+        sol = ExcelModel().loads(fpath).finish().calculate()
+        self.assertEqual([
+            sol["'[sheets.xlsx]S3'!A%d" % i].value[0, 0]
+            for i in range(1, len(formulas) + 1)
+        ], [v for _, v in formulas])
+        shutil.rmtree(dirpath, ignore_errors=True)
+
     def test_excel_from_dict(self):
         xl_model = ExcelModel().from_dict({
             'A1': 1, 'B2': '=R[-1]C[-1]', 'A': 2, 'B': '=2'
@@ -275,5 +619,97 @@ class TestExcelModel(unittest.TestCase):
             for k, v in xl_model.calculate().items()
         }, {'A1': 1, 'B2': 1, 'A': 2, 'B': 2})
 
+    def test_excel_model_synthetic(self):
+        from formulas.excel.synthetic import SyntheticWorkbook
+        kw = dict(rows=15, sheets=2, lookup_rows=5, circular=2,
+                  external_rows=4)
+        wb = SyntheticWorkbook(seed=1, **kw)
+        self.assertEqual(
+            wb.to_dict(), SyntheticWorkbook(seed=1, **kw).to_dict()
+        )
+        self.assertNotEqual(wb.to_dict(), SyntheticWorkbook(**kw).to_dict())
+        self.assertEqual(wb.n_cells, len(wb.to_dict()))
+
+        def _values(sol):
+            return {
+                k.upper(): v.value.tolist() for k, v in sol.items()
+                if isinstance(v, Ranges)
+            }
+
+        res = _values(ExcelModel().from_dict(wb.to_dict()).finish(
+            complete=False, iterative=True
+        ).calculate())
+        dirpath = osp.join(mydir, 'tmp', 'synthetic')
+        os.makedirs(dirpath, exist_ok=True)
+        xl_model = ExcelModel().loads(wb.write(dirpath))
+        self.assertEqual(
+            _values(xl_model.finish(iterative=True).calculate()), res
+        )
+        self.assertEqual(set(xl_model.books), {
+            'SYNTHETIC.XLSX', 'SYNTHETIC-EXT.XLSX'
+        })
+        circular = "'[SYNTHETIC.XLSX]CIRCULAR'!"
+        self.assertAlmostEqual(
+            res[circular + 'A1'][0][0], res[circular + 'B1'][0][0] * 2,
+            places=2
+        )
+        self.assertEqual(res["'[SYNTHETIC.XLSX]SUMMARY'!A2"], [[sum(
+            res["'[SYNTHETIC.XLSX]DATA2'!C%d" % i][0][0] for i in range(1, 16)
+        )]])
+        shutil.rmtree(dirpath, ignore_errors=True)
+
+    def test_excel_model_cache(self):
+        from formulas.excel.cache import load_model, model_key
+        dirpath = osp.join(mydir, 'tmp')
+        fpath = osp.join(dirpath, _filename_circular)
+        os.makedirs(dirpath, exist_ok=True)
+        shutil.copyfile(self.filename_circular, fpath)
+        cache_dir = osp.join(dirpath, 'cache')
+        cached = osp.join(cache_dir, '%s.dill' % model_key(fpath, circular=1))
+
+        res = load_model(fpath, cache_dir=cache_dir, circular=1)
+        self.assertTrue(osp.isfile(cached))
+        mtime = os.stat(cached).st_mtime_ns
+        xl_model = load_model(fpath, cache_dir=cache_dir, circular=1)
+        self.assertEqual(mtime, os.stat(cached).st_mtime_ns)
+        self.assertEqual(
+            {k: str(v) for k, v in res.calculate().items()},
+            {k: str(v) for k, v in xl_model.calculate().items()}
+        )
+
+        import openpyxl
+        wb = openpyxl.load_workbook(fpath)
+        wb['DATA']['B6'] = 5  # Changed workbook.
+        wb.save(fpath)
+        key = model_key(fpath, circular=1)
+        self.assertNotEqual(osp.basename(cached), '%s.dill' % key)
+        xl_model = load_model(fpath, cache_dir=cache_dir, circular=1)
+        self.assertTrue(osp.isfile(osp.join(cache_dir, '%s.dill' % key)))
+        sol = xl_model.calculate()
+        self.assertEqual(sol["'[circular.xlsx]DATA'!B6"].value[0, 0], 5)
+        self.assertEqual(sol["'[circular.xlsx]DATA'!E6"].value[0, 0], 6)
+
+        # Changed external link (same key, the cache is rewritten).
+        ext, fpath = osp.join(dirpath, 'ext.xlsx'), osp.join(dirpath, 'a.xlsx')
+        for path, value in ((ext, 1), (fpath, "='[ext.xlsx]DATA'!A1*2")):
+            wb = openpyxl.Workbook()
+            wb.active.title = 'DATA'
+            wb['DATA']['A1'] = value
+            wb.save(path)
+        cached = osp.join(cache_dir, '%s.dill' % model_key(fpath))
+        sol = load_model(fpath, cache_dir=cache_dir).calculate()
+        self.assertEqual(sol["'[a.xlsx]DATA'!A1"].value[0, 0], 2)
+        with open(cached, 'rb') as f:
+            data = f.read()
+        wb = openpyxl.load_workbook(ext)
+        wb['DATA']['A1'] = 5
+        wb.save(ext)
+        sol = load_model(fpath, cache_dir=cache_dir).calculate()
+        self.assertEqual(sol["'[a.xlsx]DATA'!A1"].value[0, 0], 10)
+        with open(cached, 'rb') as f:
+            self.assertNotEqual(data, f.read())
+        sol = load_model(fpath, cache_dir=cache_dir).calculate()
+        self.assertEqual(sol["'[a.xlsx]DATA'!A1"].value[0, 0], 10)
+
     def tearDown(self) -> None:
         shutil.rmtree(osp.join(mydir, 'tmp'), ignore_errors=True)
@@ -7,6 +7,7 @@
 # You may obtain a copy of the Licence at: http://ec.europa.eu/idabc/eupl
 import os
 import sys
+import subprocess
 import unittest
 import importlib
 
@@ -32,3 +33,24 @@ class TestImport(unittest.TestCase):
         os.environ['IMPORT_ALL'] = 'False'
         mdl = self.reload()
         self.assertTrue(set(mdl.__all__).isdisjoint(mdl.__dict__))
+
+    def test_functions_registry(self):
+        from formulas.functions import function_modules
+        from formulas.functions._registry import FUNCTION_MODULES
+        self.assertEqual(function_modules(), FUNCTION_MODULES)
+
+    def test_lazy_functions(self):
+        code = (
+            "import sys, formulas;"
+            "formulas.Parser().ast('=SUM(1)')[1].compile();"
+            "print(sorted(k for k in sys.modules "
+            "if k.startswith('formulas.functions.')))"
+        )
+        import formulas
+        out = subprocess.check_output(
+            [sys.executable, '-c', code],
+            cwd=os.path.dirname(os.path.dirname(formulas.__file__))
+        )
+        self.assertEqual(eval(out), [
+            'formulas.functions._registry', 'formulas.functions.math'
+        ])
@@ -63,7 +63,11 @@ class TestParser(unittest.TestCase):
         ('=10  ^  -  2', '10^u-2'),
         ('=10^- + -  + + +2', '10^u+2'),
         ('=ATAN2( 10 , 2)', 'ATAN2(10,2)'),
-        ('=DAYS360( 10 , 2)', 'DAYS360(10,2)')
+        ('=DAYS360( 10 , 2)', 'DAYS360(10,2)'),
+        ('=:C', ':C'),
+        ('=\tA1\t+ 1', 'A1+1'),
+        ("='été'!A1", 'ÉTÉ!A1'),
+        ('=@SUM(1)', 'SUM(1)')
     )
     def test_valid_formula(self, case):
         inputs, result = case
@@ -112,7 +116,13 @@ class TestParser(unittest.TestCase):
         ({}, '=10*+2 + 10^--2 + 10/-2', (), '115.0'),
         ({}, '=10>+2', (), 'True'),
         ({}, '=10=+10', (), 'True'),
-        ({}, '=ISERR(#VALUE!)', (), 'True'))
+        ({}, '=ISERR(#VALUE!)', (), 'True'),
+        ({}, '=IF(TRUE, a, b + 1)', (2,), '2'),
+        ({}, '=IF(1 > 2, a, b * 2)', (2,), '4.0'),
+        ({}, '=IFS(FALSE, a, TRUE, b)', (2,), '2'),
+        ({}, '=SWITCH(3, 1, a, 2, b, c)', (2,), '2'),
+        ({}, '=CHOOSE(2, a, b, c)', (2,), '2'),
+        ({}, '=IF(TRUE, IF(FALSE, a, 1 + 1), b)', (), '2.0'))
     def test_compile(self, case):
         references, formula, inputs, result = case
         func = Parser().ast(formula)[1].compile(references)
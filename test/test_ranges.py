@@ -6,11 +6,13 @@
 # You may not use this work except in compliance with the Licence.
 # You may obtain a copy of the Licence at: http://ec.europa.eu/idabc/eupl
 
+import copy
+import pickle
 import unittest
 import ddt
 import numpy as np
 from formulas.tokens.operand import Error
-from formulas.ranges import Ranges
+from formulas.ranges import Ranges, RangeRecord
 from formulas.errors import InvalidRangeError
 
 
@@ -171,3 +173,33 @@ class TestOperators(unittest.TestCase):
     def test_empty_ranges_value(self):
         out = np.asarray([[Error.errors['#NULL!']]], object)
         np.testing.assert_array_equal(Ranges().value, out)
+
+    def test_range_record(self):
+        rng = Ranges().push("'[xl.xls]s1'!b2:c5").ranges[0]
+        self.assertIsInstance(rng, RangeRecord)
+        self.assertEqual(rng.bounds, ("'[xl.xls]S1'", 2, 2, 3, 5))
+        self.assertEqual(rng['name'], "'[xl.xls]S1'!B2:C5")
+        self.assertEqual(dict(rng), {
+            'sheet_id': "'[xl.xls]S1'", 'n1': 2, 'n2': 3, 'r1': '2',
+            'r2': '5', 'c1': 'B', 'c2': 'C', 'ref': 'B2:C5',
+            'name': "'[xl.xls]S1'!B2:C5"
+        })
+        self.assertEqual((rng.r1, rng.get('r2')), (2, '5'))
+        new = RangeRecord(rng.sheet_id, 2, 2, 3, 5)
+        self.assertEqual(
+            (new, hash(new), new.name), (rng, hash(rng), rng.name)
+        )
+        self.assertIs(copy.deepcopy(rng), rng)
+        self.assertEqual(pickle.loads(pickle.dumps(rng)), rng)
+        self.assertEqual(RangeRecord.from_dict(dict(rng)), rng)
+        self.assertEqual(
+            str(Ranges((dict(rng),))), "<Ranges>('[xl.xls]S1'!B2:C5)"
+        )
+
+    def test_value_indexed_ranges(self):
+        values = Ranges()
+        for i in range(1, 41):  # Above the scan threshold of the index.
+            values.push('A%d' % i, [[i]]).push("'[xl.xls]s1'!A%d" % i, [[-i]])
+        rng = Ranges().pushes(('A5', 'A38:A40', "'[xl.xls]s1'!A2:A3", 'A2'))
+        rng.values.update(values.values)
+        np.testing.assert_array_equal(rng.value, [2, -2, -3, 38, 39, 40, 5])